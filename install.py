@@ -6,9 +6,12 @@ This installer replaces the bash-based install.sh with a pure Python implementat
 while maintaining full backward compatibility and feature parity.
 """
 
+import contextlib
 import sys
+import time
 import os
 from pathlib import Path
+from typing import Dict, List, Optional
 
 # Check Python version first
 if sys.version_info < (3, 9):
@@ -19,10 +22,214 @@ if sys.version_info < (3, 9):
     sys.exit(1)
 
 from installer_py import cli, config, console, platform, paths, registry, deps
-from installer_py import selection, collisions, install_ops, report
+from installer_py import selection, collisions, install_ops, report, cache, network
+from installer_py import backup, bundle, compiler, fstree, snapshot
 from installer_py.types import CollisionStrategy
 
 
+def load_registry(
+    cfg: config.InstallerConfig,
+    download_cache: Optional[cache.DownloadCache],
+    refresh: bool,
+    bundle_path: Optional[str] = None,
+    profile: Optional[str] = None,
+) -> Optional[snapshot.ParsedRegistry]:
+    """
+    Load and parse the registry.
+
+    A fresh cached copy is served without a round-trip, and unchanged
+    registry content is loaded from a precompiled snapshot instead of being
+    parsed again. For a sharded registry only the shards ``profile`` needs
+    are fetched (all per-type shards when no profile was given).
+    """
+    store = None
+    if cfg.cache_dir:
+        store = snapshot.SnapshotStore(cfg.cache_dir / "snapshots")
+
+    if bundle_path:
+        try:
+            with bundle.Bundle(bundle_path) as pack_file:
+                data = pack_file.read(bundle.REGISTRY_MEMBER)
+        except (bundle.BundleError, OSError, KeyError) as e:
+            console.print_error(f"Can't read registry from {bundle_path}: {e}")
+            return None
+        return snapshot.load_parsed_registry(data, store)
+
+    source = registry.fetch_registry(
+        cfg.temp_dir / "registry.json",
+        use_local=cfg.use_local_files,
+        local_path=cfg.local_registry_path,
+        registry_url=cfg.registry_url,
+        cache=download_cache,
+        ttl=cfg.registry_ttl,
+        refresh=refresh,
+        policy=cfg.network_policy,
+    )
+    if source is None:
+        return None
+    try:
+        data = source.read_bytes()
+    except OSError:
+        return None
+
+    def fetch_shards(shards: Dict) -> Optional[List[bytes]]:
+        shard_data = registry.load_shards(
+            shards,
+            registry.shard_base(
+                cfg.use_local_files, cfg.local_registry_path, cfg.registry_url
+            ),
+            cfg.use_local_files,
+            cfg.temp_dir,
+            cache=download_cache,
+            policy=cfg.network_policy,
+            profile=profile,
+            jobs=cfg.jobs,
+        )
+        if shard_data is None:
+            console.print_error("Failed to fetch registry shards")
+        return shard_data
+
+    return snapshot.load_parsed_registry(data, store, fetch_shards=fetch_shards)
+
+
+def pack(args: cli.ParsedArgs, cfg: config.InstallerConfig) -> int:
+    """Build an offline pack file from a local registry and its component files."""
+    console.print_header()
+    console.print_step("Building pack file...")
+
+    registry_path = cfg.local_registry_path or Path("registry.json")
+    reg_data = registry.load_registry(
+        cfg.temp_dir / "registry.json", use_local=True, local_path=registry_path
+    )
+    if not reg_data:
+        console.print_error(f"Failed to load registry: {registry_path}")
+        return 1
+
+    try:
+        count, missing = bundle.write_bundle(
+            args.output, reg_data, registry_path.resolve().parent
+        )
+    except (bundle.BundleError, OSError) as e:
+        console.print_error(f"Failed to write pack file: {e}")
+        return 1
+
+    for path in missing:
+        console.print_warning(f"Not packed (file not found): {path}")
+    size_kb = Path(args.output).stat().st_size / 1024
+    console.print_success(f"Packed {count} files into {args.output} ({size_kb:.0f} KB)")
+    return 0 if not missing else 1
+
+
+def compile_registry(args: cli.ParsedArgs, cfg: config.InstallerConfig) -> int:
+    """Validate a local registry and, for 'registry build', write it compiled."""
+    building = args.command == "registry-build"
+    console.print_header()
+    console.print_step("Compiling registry..." if building else "Validating registry...")
+
+    registry_path = cfg.local_registry_path or Path("registry.json")
+    reg_data = registry.load_registry(
+        cfg.temp_dir / "registry.json", use_local=True, local_path=registry_path
+    )
+    if not isinstance(reg_data, dict):
+        console.print_error(f"Registry is missing or not valid JSON: {registry_path}")
+        return 2
+
+    source_root = registry_path.resolve().parent
+    compiled, result = compiler.compile_registry(
+        reg_data, source_root, scan_orphans=args.verbose
+    )
+
+    for comp_id, path in result.missing_files:
+        console.print_error(f"{comp_id} - File not found: {path}")
+        if args.fix:
+            for suggestion in compiler.suggest_paths(source_root, path, comp_id):
+                console.print_info(f"  Possible match: {suggestion}")
+    for profile_id, required_by, comp_id in result.missing_deps:
+        console.print_error(
+            f"Profile {profile_id}: unknown component {comp_id}"
+            + (f" (required by {required_by})" if required_by else "")
+        )
+    for cycle in result.cycles:
+        console.print_error(f"Dependency cycle: {' -> '.join(cycle)}")
+    for path in result.orphans:
+        console.print_warning(f"Orphaned file (not in registry): {path}")
+
+    files = compiled[compiler.COMPILED_KEY]["files"]
+    console.print_info(
+        f"Checked {result.checked} paths ({len(files)} files), "
+        f"{len(compiled[compiler.COMPILED_KEY]['profiles'])} profiles"
+    )
+    if not result.ok:
+        console.print_error(
+            "Registry has errors; nothing was written" if building else "Registry has errors"
+        )
+        return 1
+
+    if not building:
+        if reg_data.get(compiler.COMPILED_KEY) != compiled[compiler.COMPILED_KEY]:
+            console.print_warning(
+                "Compiled data is missing or out of date; run 'install.py registry build'"
+            )
+        console.print_success("All registry paths are valid!")
+        return 0
+
+    output = Path(args.output) if args.output else registry_path
+    try:
+        compiler.write_registry(output, compiled)
+    except OSError as e:
+        console.print_error(f"Failed to write {output}: {e}")
+        return 1
+    total_kb = sum(entry["size"] for entry in files.values()) / 1024
+    console.print_success(f"Compiled {output} ({len(files)} files, {total_kb:.0f} KB)")
+
+    if args.shards:
+        try:
+            manifest = compiler.write_shards(compiled, Path(args.shards))
+        except OSError as e:
+            console.print_error(f"Failed to write shards to {args.shards}: {e}")
+            return 1
+        console.print_success(f"Wrote sharded registry {manifest}")
+    return 0
+
+
+def restore_backup(args: cli.ParsedArgs, cfg: config.InstallerConfig) -> int:
+    """Put back the files of a backup snapshot of the install directory."""
+    console.print_header()
+    install_dir = str(cfg.install_dir)
+    store = backup.BackupStore.for_install_dir(install_dir)
+    snapshots = store.snapshots()
+    snapshot_id = args.restore
+    if snapshot_id == "latest" and snapshots:
+        snapshot_id = snapshots[0]
+
+    manifest = store.load(snapshot_id)
+    if manifest is None:
+        console.print_error(f"No backup snapshot {args.restore!r} in {store.root}")
+        if snapshots:
+            console.print_info(f"Available snapshots: {', '.join(snapshots)}")
+        return 1
+
+    console.print_step(f"Restoring snapshot {snapshot_id} ({len(manifest['files'])} files)...")
+
+    # Keep the files being replaced, so the restore itself can be undone
+    current = [os.path.join(install_dir, rel_path) for rel_path in manifest["files"]]
+    try:
+        undo_id, _ = store.snapshot(current, install_dir, cfg.jobs)
+    except OSError as e:
+        console.print_error(f"Failed to back up current files: {e}")
+        return 1
+
+    restored, failed = store.restore(snapshot_id, install_dir, cfg.jobs)
+    for rel_path in failed:
+        console.print_error(f"Failed to restore: {rel_path}")
+    if undo_id:
+        console.print_info(f"Previous versions saved as snapshot {undo_id}")
+    store.prune(cfg.backup_keep, cfg.backup_max_age_days)
+
+    console.print_success(f"Restored {restored} file(s) to {install_dir}")
+    return 0 if not failed else 1
+
+
 def main() -> int:
     """Main installer entry point."""
 
@@ -33,31 +240,37 @@ def main() -> int:
     cfg = config.build_config(
         branch=None,  # Will use env var or default
         install_dir=args.install_dir,
-        use_local_files=args.local_files is not None,
+        use_local_files=args.local_files is not None or args.command == "pack",
         local_registry_path=args.local_files if args.local_files else None,
         script_path=Path(__file__).parent,
+        jobs=args.jobs,
+        use_cache=not args.no_cache,
     )
 
+    if args.command == "pack":
+        return pack(args, cfg)
+    if args.command.startswith("registry-"):
+        return compile_registry(args, cfg)
+    if args.restore:
+        return restore_backup(args, cfg)
+
+    download_cache = None
+    if cfg.cache_dir:
+        download_cache = cache.DownloadCache(cfg.cache_dir, cfg.cache_max_bytes)
+
     # Check if we should show list
     if args.list:
         console.print_header()
         console.print_step("Fetching component registry...")
 
         # Load registry
-        registry_path = cfg.temp_dir / "registry.json"
-        reg_data = registry.load_registry(
-            registry_path,
-            use_local=cfg.use_local_files,
-            local_path=cfg.local_registry_path,
-            registry_url=cfg.registry_url,
-        )
+        parsed = load_registry(cfg, download_cache, args.refresh_registry, args.bundle)
 
-        if not reg_data:
+        if not parsed:
             console.print_error("Failed to load registry")
             return 1
 
-        components_dict = registry.parse_components(reg_data)
-        selection.list_all_components(components_dict)
+        selection.list_all_components(parsed.components)
         return 0
 
     # Show header
@@ -66,7 +279,10 @@ def main() -> int:
     # Load registry
     console.print_step("Fetching component registry...")
 
-    if cfg.use_local_files:
+    if args.bundle:
+        console.print_info("Registry source: bundle")
+        console.print_info(f"Bundle path: {args.bundle}")
+    elif cfg.use_local_files:
         console.print_info("Registry source: local")
         console.print_info(
             f"Registry path: {cfg.local_registry_path or 'registry.json'}"
@@ -75,23 +291,19 @@ def main() -> int:
         console.print_info("Registry source: remote")
         console.print_info(f"Registry URL: {cfg.registry_url}")
 
-    registry_path = cfg.temp_dir / "registry.json"
-    reg_data = registry.load_registry(
-        registry_path,
-        use_local=cfg.use_local_files,
-        local_path=cfg.local_registry_path,
-        registry_url=cfg.registry_url,
+    parsed = load_registry(
+        cfg, download_cache, args.refresh_registry, args.bundle, args.profile
     )
 
-    if not reg_data:
+    if not parsed:
         console.print_error("Failed to load registry")
         return 1
 
     console.print_success("Registry loaded successfully")
 
     # Parse components and profiles
-    components_dict = registry.parse_components(reg_data)
-    profiles_dict = registry.parse_profiles(reg_data)
+    components_dict = parsed.components
+    profiles_dict = parsed.profiles
 
     # Determine installation mode
     selected_profile = args.profile
@@ -105,7 +317,7 @@ def main() -> int:
             return 1
 
         profile = profiles_dict[selected_profile]
-        selected_components = profile.components
+        selected_components = list(profile.components)
 
     else:
         # Interactive mode
@@ -148,7 +360,7 @@ def main() -> int:
                 return main()  # Back to main menu
 
             profile = profiles_dict[selected_profile]
-            selected_components = profile.components
+            selected_components = list(profile.components)
         else:
             console.print_error("Custom component selection not yet implemented")
             console.print_info(
@@ -160,15 +372,33 @@ def main() -> int:
     if selected_components:
         console.print_step("Resolving dependencies...")
         original_count = len(selected_components)
-        selected_components = deps.resolve_dependencies(
-            selected_components, components_dict
-        )
+        resolution = parsed.closures.get(selected_profile or "")
+        if resolution is None:
+            resolution = deps.DependencyResolver(components_dict).resolve(
+                selected_components
+            )
+        # Profile closures were resolved when the registry was parsed
+        selected_components = list(resolution.order)
+
+        for required_by, comp_id in resolution.missing:
+            if required_by:
+                console.print_warning(
+                    f"Unknown dependency {comp_id} (required by {required_by})"
+                )
+            else:
+                console.print_warning(f"Unknown component: {comp_id}")
+        for cycle in resolution.cycles:
+            console.print_warning(f"Dependency cycle: {' -> '.join(cycle)}")
 
         if len(selected_components) > original_count:
             console.print_info(
                 f"Added {len(selected_components) - original_count} dependencies"
             )
 
+        size = parsed.download_size(selected_components)
+        if size is not None:
+            console.print_info(f"Total size: {size / 1024:.0f} KB")
+
     # Show installation preview
     if not non_interactive:
         report.show_installation_preview(
@@ -190,61 +420,106 @@ def main() -> int:
         )
         console.print_info("Installing automatically (profile specified)...")
 
-    # Detect collisions
-    console.print_step("Checking for file collisions...")
-
-    # Get all destination paths
-    dest_paths = []
-    for comp_id in selected_components:
-        comp = registry.find_component(components_dict, comp_id)
-        if comp and comp.path:
-            dest_path = paths.get_install_path(comp.path, str(cfg.install_dir))
-            dest_paths.append(dest_path)
-
-    collision_list = collisions.detect_collisions(dest_paths, str(cfg.install_dir))
-
-    # Determine collision strategy
-    collision_strategy = CollisionStrategy.OVERWRITE  # Default for fresh installs
-    backup_dir = None
-
-    if collision_list:
-        collisions.show_collision_report(collision_list)
-
-        if non_interactive:
-            # In non-interactive mode, default to overwrite
-            console.print_info("Using default strategy: overwrite")
-            collision_strategy = CollisionStrategy.OVERWRITE
-        else:
-            collision_strategy = collisions.get_collision_strategy()
-
-            if collision_strategy == CollisionStrategy.CANCEL:
-                console.print_info("Installation cancelled by user")
-                return 0
-
-            # Handle backup
-            if collision_strategy == CollisionStrategy.BACKUP:
-                console.print_step("Creating backup...")
-                backup_dir = collisions.create_backup(
-                    collision_list, str(cfg.install_dir)
-                )
+    with contextlib.ExitStack() as stack:
+        source_bundle = None
+        if args.bundle:
+            try:
+                source_bundle = stack.enter_context(bundle.Bundle(args.bundle))
+            except (bundle.BundleError, OSError) as e:
+                console.print_error(str(e))
+                return 1
+        local_base_path = cfg.install_dir.parent if cfg.use_local_files else Path.cwd()
+
+        # Detect collisions
+        console.print_step("Checking for file collisions...")
+
+        # Get all destination paths
+        dest_paths = []
+        for comp_id in selected_components:
+            comp = components_dict.index.get(comp_id)
+            if comp and comp.path:
+                dest_path = paths.get_install_path(comp.path, str(cfg.install_dir))
+                dest_paths.append(dest_path)
+
+        # Files already identical to what would be installed aren't collisions
+        dest_tree = fstree.FileTree.scan(dest_paths)
+        revalidated_since = time.time()
+        expected = install_ops.expected_files(
+            selected_components,
+            components_dict,
+            str(cfg.install_dir),
+            cfg.use_local_files,
+            local_base_path,
+            raw_url=cfg.raw_url,
+            cache=download_cache,
+            bundle=source_bundle,
+            policy=cfg.network_policy,
+            tree=dest_tree,
+            jobs=cfg.jobs,
+        )
+        collision_list = collisions.detect_collisions(
+            dest_paths, str(cfg.install_dir), dest_tree, expected
+        )
 
-                if backup_dir:
-                    console.print_success(f"Backed up files to {backup_dir}")
-                    collision_strategy = CollisionStrategy.OVERWRITE
-                else:
-                    console.print_error("Backup failed. Installation cancelled.")
-                    return 1
-
-    # Perform installation
-    result = install_ops.install_components(
-        selected_components,
-        components_dict,
-        str(cfg.install_dir),
-        cfg.raw_url,
-        cfg.use_local_files,
-        cfg.install_dir.parent if cfg.use_local_files else Path.cwd(),
-        collision_strategy,
-    )
+        # Determine collision strategy
+        collision_strategy = CollisionStrategy.OVERWRITE  # Default for fresh installs
+        backup_dir = None
+
+        if collision_list:
+            collisions.show_collision_report(collision_list)
+
+            if non_interactive:
+                # In non-interactive mode, default to overwrite
+                console.print_info("Using default strategy: overwrite")
+                collision_strategy = CollisionStrategy.OVERWRITE
+            else:
+                collision_strategy = collisions.get_collision_strategy()
+
+                if collision_strategy == CollisionStrategy.CANCEL:
+                    console.print_info("Installation cancelled by user")
+                    return 0
+
+                # Handle backup
+                if collision_strategy == CollisionStrategy.BACKUP:
+                    console.print_step("Creating backup...")
+                    snapshot_id = collisions.create_backup(
+                        collision_list,
+                        str(cfg.install_dir),
+                        jobs=cfg.jobs,
+                        keep=cfg.backup_keep,
+                        max_age_days=cfg.backup_max_age_days,
+                    )
+
+                    if snapshot_id:
+                        store = backup.BackupStore.for_install_dir(str(cfg.install_dir))
+                        backup_dir = f"{store.root} (snapshot {snapshot_id})"
+                        console.print_success(f"Backed up files to {backup_dir}")
+                        console.print_info(
+                            f"Restore them with: install.py --restore {snapshot_id}"
+                        )
+                        collision_strategy = CollisionStrategy.OVERWRITE
+                    else:
+                        console.print_error("Backup failed. Installation cancelled.")
+                        return 1
+
+        # Perform installation
+        result = install_ops.install_components(
+            selected_components,
+            components_dict,
+            str(cfg.install_dir),
+            cfg.raw_url,
+            cfg.use_local_files,
+            local_base_path,
+            collision_strategy,
+            jobs=cfg.jobs,
+            cache=download_cache,
+            archive_url=cfg.archive_url if args.bulk else None,
+            policy=cfg.network_policy,
+            bundle=source_bundle,
+            tree=dest_tree,
+            expected=expected,
+            revalidated_since=revalidated_since,
+        )
 
     result.backup_dir = backup_dir
 
@@ -253,8 +528,12 @@ def main() -> int:
         result, str(cfg.install_dir), selected_profile, len(selected_components)
     )
 
+    pool = network.get_pool()
+    report.show_retry_summary(pool.attempts, pool.governor.throttled)
+
     # Show post-install steps
-    report.show_post_install(str(cfg.install_dir), cfg.repo_url)
+    if not result.rolled_back:
+        report.show_post_install(str(cfg.install_dir), cfg.repo_url)
 
     return 0 if result.failed == 0 else 1
 
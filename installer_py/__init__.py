@@ -4,15 +4,24 @@ __version__ = "1.0.0"
 
 # Export all modules for convenient importing
 from . import (
+    archive,
+    backup,
+    bundle,
+    cache,
     cli,
+    compiler,
     config,
     console,
+    fstree,
     platform,
     paths,
     registry,
     network,
+    ratelimit,
     deps,
     selection,
+    snapshot,
+    staging,
     collisions,
     install_ops,
     transform,
@@ -21,15 +30,24 @@ from . import (
 )
 
 __all__ = [
+    "archive",
+    "backup",
+    "bundle",
+    "cache",
     "cli",
+    "compiler",
     "config",
     "console",
+    "fstree",
     "platform",
     "paths",
     "registry",
     "network",
+    "ratelimit",
     "deps",
     "selection",
+    "snapshot",
+    "staging",
     "collisions",
     "install_ops",
     "transform",
@@ -0,0 +1,86 @@
+"""Bulk component source: one branch archive instead of per-file downloads."""
+
+from __future__ import annotations
+
+import shutil
+import tarfile
+from pathlib import Path
+from typing import Iterable, Optional, Set
+
+from .network import (
+    CHUNK_SIZE,
+    DEFAULT_POLICY,
+    ConnectionPool,
+    NetworkPolicy,
+    get_pool,
+)
+from .paths import is_safe_relative_path
+
+
+def github_archive_url(repo_slug: str, branch: str) -> str:
+    """Return the tarball URL GitHub serves for a branch."""
+    return f"https://codeload.github.com/{repo_slug}/tar.gz/{branch}"
+
+
+def extract_paths(
+    url: str,
+    paths: Iterable[str],
+    dest_dir: Path,
+    pool: Optional[ConnectionPool] = None,
+    policy: NetworkPolicy = DEFAULT_POLICY,
+) -> Set[str]:
+    """
+    Stream a tar archive and extract only the requested repository paths.
+
+    The archive is read sequentially (``tarfile`` stream mode), so nothing is
+    buffered beyond the member being copied, and the download stops as soon as
+    every requested path has been found. Archive members are matched after
+    dropping their top-level directory (``<repo>-<branch>/``).
+
+    Args:
+        url: Archive URL (tar, tar.gz, tar.bz2 or tar.xz)
+        paths: Registry paths relative to the repository root
+        dest_dir: Directory to extract into, keeping relative paths
+        pool: Connection pool to download through
+        policy: Timeouts for the archive request (it is not retried; callers
+            fall back to per-file downloads instead)
+
+    Returns:
+        The subset of paths that were extracted
+
+    Raises:
+        HTTPStatusError, OSError, tarfile.TarError: if the archive can't be read
+    """
+    wanted = {path for path in paths if is_safe_relative_path(path)}
+    found: Set[str] = set()
+    if not wanted:
+        return found
+
+    with (pool or get_pool()).open(url, policy=policy) as response:
+        with tarfile.open(fileobj=response, mode="r|*") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                rel_path = _strip_root(member.name)
+                if rel_path not in wanted or rel_path in found:
+                    continue
+
+                source = tar.extractfile(member)
+                if source is None:
+                    continue
+                target = dest_dir / rel_path
+                target.parent.mkdir(parents=True, exist_ok=True)
+                with open(target, "wb") as f:
+                    shutil.copyfileobj(source, f, CHUNK_SIZE)
+                found.add(rel_path)
+
+                if found == wanted:
+                    break
+
+    return found
+
+
+def _strip_root(member_name: str) -> str:
+    parts = member_name.split("/", 1)
+    return parts[1] if len(parts) == 2 else ""
+
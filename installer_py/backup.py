@@ -0,0 +1,352 @@
+"""Backups of files an install is about to overwrite."""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, TypeVar
+
+from .bundle import hash_file
+from .paths import atomic_replace, is_safe_relative_path
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Linux ioctl that makes dst share src's extents (btrfs, XFS, bcachefs...)
+FICLONE = 0x40049409
+COPY_CHUNK = 1 << 30
+
+STORE_SUFFIX = ".backups"
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_ID_FORMAT = "%Y%m%d-%H%M%S"
+DEFAULT_BACKUP_KEEP = 10
+
+
+def copy_file(src: str, dst: str) -> str:
+    """
+    Copy src to dst with its metadata, as cheaply as the filesystem allows.
+
+    Tries a reflink (copy-on-write clone, no data written), then
+    os.copy_file_range (copied inside the kernel, possibly server-side on
+    NFS), then a plain read/write copy.
+
+    Returns:
+        "reflink", "copy_file_range" or "copy", whichever was used
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        method = _clone(fsrc.fileno(), fdst.fileno())
+        if method is None:
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+            shutil.copyfileobj(fsrc, fdst)
+            method = "copy"
+    shutil.copystat(src, dst)
+    return method
+
+
+def _clone(src_fd: int, dst_fd: int) -> Optional[str]:
+    """Reflink or kernel-copy one open file into another; None if neither works."""
+    if sys.platform.startswith("linux"):
+        import fcntl
+
+        try:
+            fcntl.ioctl(dst_fd, FICLONE, src_fd)
+            return "reflink"
+        except OSError:
+            pass
+    if hasattr(os, "copy_file_range"):
+        try:
+            while os.copy_file_range(src_fd, dst_fd, COPY_CHUNK):
+                pass
+            return "copy_file_range"
+        except OSError:
+            # EXDEV across filesystems on older kernels, ENOSYS, EINVAL...
+            pass
+    return None
+
+
+class BackupStore:
+    """
+    Content-addressed backups of an install directory.
+
+    Layout::
+
+        <install_dir>.backups/
+          blobs/<sha256[:2]>/<sha256>   file contents, stored once
+          snapshots/<id>.json           one manifest per backup
+
+    A manifest maps each backed-up path, relative to the install
+    directory, to its sha256, size, mode and mtime. A file that is the
+    same in many backups is stored once. Blobs are written with copy_file,
+    so on a reflink-capable filesystem a backup shares the install's disk
+    blocks until either copy changes. Snapshot IDs are timestamps, so they
+    sort by age.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    @classmethod
+    def for_install_dir(cls, install_dir: str) -> BackupStore:
+        return cls(Path(os.path.normpath(install_dir) + STORE_SUFFIX))
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.root / "blobs" / sha256[:2] / sha256
+
+    def manifest_path(self, snapshot_id: str) -> Path:
+        return self.root / "snapshots" / f"{snapshot_id}.json"
+
+    def snapshots(self) -> List[str]:
+        """IDs of the stored snapshots, newest first."""
+        try:
+            names = os.listdir(self.root / "snapshots")
+        except OSError:
+            return []
+        return sorted(
+            (name[:-5] for name in names if name.endswith(".json")),
+            key=_snapshot_order,
+            reverse=True,
+        )
+
+    def load(self, snapshot_id: str) -> Optional[Dict[str, Any]]:
+        """A snapshot's manifest, or None if it is missing or unreadable."""
+        if not snapshot_id or "/" in snapshot_id or snapshot_id.startswith("."):
+            return None
+        try:
+            with open(self.manifest_path(snapshot_id), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(manifest, dict) or manifest.get("format") != SNAPSHOT_FORMAT:
+            return None
+        if not isinstance(manifest.get("files"), dict):
+            return None
+        return manifest
+
+    def snapshot(
+        self,
+        files: List[str],
+        install_dir: str,
+        jobs: int = 1,
+        when: Optional[datetime] = None,
+    ) -> Tuple[Optional[str], List[str]]:
+        """
+        Back up files under install_dir as a new snapshot.
+
+        Blobs are stored by up to ``jobs`` threads; a file whose content is
+        already in the store is only hashed. Missing files are left out.
+
+        Returns:
+            (snapshot ID, or None if nothing was backed up; files that failed)
+        """
+        existing = [path for path in files if os.path.exists(path)]
+        stored = _map(self._store_file, existing, jobs)
+
+        entries: Dict[str, Dict[str, Any]] = {}
+        failed = []
+        for path, entry in zip(existing, stored):
+            if entry is None:
+                failed.append(path)
+            else:
+                entries[Path(os.path.relpath(path, install_dir)).as_posix()] = entry
+        if not entries:
+            return None, failed
+
+        when = when or datetime.now()
+        snapshot_id = self._new_id(when)
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "id": snapshot_id,
+            "created": when.isoformat(timespec="seconds"),
+            "install_dir": os.path.abspath(install_dir),
+            "files": dict(sorted(entries.items())),
+        }
+        with atomic_replace(self.manifest_path(snapshot_id)) as tmp_path:
+            tmp_path.write_text(json.dumps(manifest, indent=1) + "\n", encoding="utf-8")
+        return snapshot_id, failed
+
+    def restore(
+        self, snapshot_id: str, install_dir: str, jobs: int = 1
+    ) -> Tuple[int, List[str]]:
+        """
+        Write a snapshot's files back under install_dir.
+
+        Each file is replaced atomically and gets its recorded mode and
+        mtime back; files not in the snapshot are left alone.
+
+        Returns:
+            (number of files restored, paths that couldn't be)
+
+        Raises:
+            KeyError: if there is no such snapshot
+        """
+        manifest = self.load(snapshot_id)
+        if manifest is None:
+            raise KeyError(snapshot_id)
+
+        def restore_one(item: Tuple[str, Dict[str, Any]]) -> bool:
+            rel_path, entry = item
+            if not is_safe_relative_path(rel_path):
+                return False
+            dest = os.path.join(install_dir, rel_path)
+            try:
+                with atomic_replace(dest) as tmp_path:
+                    copy_file(str(self.blob_path(entry["sha256"])), str(tmp_path))
+                    os.chmod(tmp_path, int(entry["mode"]))
+                    mtime = int(entry["mtime_ns"])
+                    os.utime(tmp_path, ns=(mtime, mtime))
+            except (OSError, KeyError, TypeError, ValueError):
+                return False
+            return True
+
+        items = list(manifest["files"].items())
+        results = _map(restore_one, items, jobs)
+        failed = [rel_path for (rel_path, _), ok in zip(items, results) if not ok]
+        return len(items) - len(failed), failed
+
+    def prune(
+        self,
+        keep: Optional[int] = DEFAULT_BACKUP_KEEP,
+        max_age_days: Optional[int] = None,
+        now: Optional[datetime] = None,
+    ) -> List[str]:
+        """
+        Apply the retention policy, then delete blobs no snapshot uses.
+
+        A snapshot is kept if it is one of the ``keep`` newest, or younger
+        than ``max_age_days`` when that is set. With ``keep`` None nothing
+        is deleted; with ``keep`` 0 only the age limit applies, so nothing
+        is deleted without one. The newest snapshot is always kept.
+
+        Returns:
+            IDs of the deleted snapshots
+        """
+        if keep is None or (keep == 0 and max_age_days is None):
+            return []
+        cutoff = None
+        if max_age_days is not None:
+            cutoff = (now or datetime.now()) - timedelta(days=max_age_days)
+
+        removed = []
+        for position, snapshot_id in enumerate(self.snapshots()):
+            if position < max(keep, 1):
+                continue
+            if cutoff is not None and _snapshot_time(snapshot_id) >= cutoff:
+                continue
+            try:
+                self.manifest_path(snapshot_id).unlink()
+            except OSError:
+                continue
+            removed.append(snapshot_id)
+        if removed:
+            self._collect_garbage()
+        return removed
+
+    def _store_file(self, path: str) -> Optional[Dict[str, Any]]:
+        """Add one file's content to the blob store; None if it can't be read."""
+        try:
+            info = os.stat(path)
+            size, sha256 = hash_file(Path(path))
+            blob = self.blob_path(sha256)
+            if blob.exists():
+                # A fresh mtime keeps a concurrent prune from collecting it
+                try:
+                    os.utime(blob)
+                except OSError:
+                    pass
+            else:
+                size, sha256 = self._add_blob(path)
+        except OSError:
+            return None
+        return {
+            "sha256": sha256,
+            "size": size,
+            "mode": info.st_mode & 0o7777,
+            "mtime_ns": info.st_mtime_ns,
+        }
+
+    def _add_blob(self, path: str) -> Tuple[int, str]:
+        """Copy a file into the store under the hash of what was copied."""
+        blobs = self.root / "blobs"
+        blobs.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=blobs, prefix=".blob.", suffix=".tmp")
+        os.close(fd)
+        try:
+            copy_file(path, tmp_name)
+            # copy_file keeps the source's mtime; the blob's records when it was stored
+            os.utime(tmp_name)
+            # The file may have changed since it was hashed; trust the copy
+            size, sha256 = hash_file(Path(tmp_name))
+            blob = self.blob_path(sha256)
+            blob.parent.mkdir(exist_ok=True)
+            os.replace(tmp_name, blob)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
+        return size, sha256
+
+    def _new_id(self, when: datetime) -> str:
+        base = when.strftime(SNAPSHOT_ID_FORMAT)
+        snapshot_id, suffix = base, 1
+        while self.manifest_path(snapshot_id).exists():
+            suffix += 1
+            snapshot_id = f"{base}-{suffix}"
+        return snapshot_id
+
+    def _collect_garbage(self) -> None:
+        """
+        Delete blobs no manifest lists.
+
+        Blobs stored since collection started are kept: a snapshot being
+        taken at the same time writes its blobs before its manifest.
+        """
+        start = time.time()
+        used: Set[str] = set()
+        for snapshot_id in self.snapshots():
+            manifest = self.load(snapshot_id)
+            if manifest is None:
+                # Unreadable manifests might still need their blobs
+                return
+            used.update(entry.get("sha256") for entry in manifest["files"].values())
+        for blob in (self.root / "blobs").glob("*/*"):
+            if blob.name in used:
+                continue
+            try:
+                if blob.stat().st_mtime < start:
+                    blob.unlink()
+            except OSError:
+                pass
+
+
+def _snapshot_order(snapshot_id: str) -> Tuple[str, int]:
+    """Sort key for snapshot IDs: timestamp, then the numeric same-second suffix."""
+    parts = snapshot_id.split("-")
+    if len(parts) == 3 and parts[2].isdigit():
+        return "-".join(parts[:2]), int(parts[2])
+    return snapshot_id, 1
+
+
+def _snapshot_time(snapshot_id: str) -> datetime:
+    try:
+        return datetime.strptime(snapshot_id[:15], SNAPSHOT_ID_FORMAT)
+    except ValueError:
+        return datetime.min
+
+
+def _map(fn: Callable[[T], R], items: List[T], jobs: int) -> List[R]:
+    """fn over items, on up to ``jobs`` threads."""
+    if jobs <= 1 or len(items) <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(jobs, len(items))) as pool:
+        return list(pool.map(fn, items))
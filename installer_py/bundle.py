@@ -0,0 +1,227 @@
+"""Offline pack files: the registry and component files in one indexed bundle."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import shutil
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from .network import CHUNK_SIZE
+from .paths import atomic_replace, is_safe_relative_path
+
+MAGIC = b"OCPACK\x00\x01"
+FORMAT_VERSION = 1
+REGISTRY_MEMBER = "registry.json"
+
+# Magic, then the length of the JSON index that follows it
+_PREAMBLE = struct.Struct("<8sI")
+
+
+class BundleError(Exception):
+    """Raised for unreadable or corrupt bundle files."""
+
+
+@dataclass(frozen=True)
+class BundleMember:
+    """Location of one file inside a bundle's data section."""
+
+    offset: int
+    size: int
+    sha256: str
+
+
+class Bundle:
+    """
+    Read-only view of a pack file, memory-mapped for random access.
+
+    A pack is a fixed preamble (magic and index length), a JSON index mapping
+    each member path to its offset, size and sha256, then the member bytes
+    back to back. Members are read as slices of the mapping, so installing
+    one component touches only that component's pages and nothing is ever
+    extracted to a scratch directory. Reads are safe from multiple threads.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:
+            # mmap refuses empty files
+            self._file.close()
+            raise BundleError(f"Not a bundle: {self.path} ({e})") from e
+        try:
+            self.members, self._data_start = self._read_index()
+        except BundleError:
+            self.close()
+            raise
+
+    def __enter__(self) -> Bundle:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.members
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.members)
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+    def read(self, path: str) -> bytes:
+        """Return a member's bytes."""
+        start, end = self._span(path)
+        return self._map[start:end]
+
+    def registry(self) -> Dict:
+        """Return the parsed registry stored in the bundle."""
+        try:
+            return json.loads(self.read(REGISTRY_MEMBER))
+        except (KeyError, ValueError) as e:
+            raise BundleError(f"Bundle has no valid {REGISTRY_MEMBER}: {e}") from e
+
+    def extract(
+        self,
+        path: str,
+        dest_path: Union[str, Path],
+        transform: Optional[Callable[[bytes], bytes]] = None,
+    ) -> None:
+        """
+        Write a member to dest_path atomically, checking its sha256.
+
+        With ``transform``, the member's bytes are passed through it and
+        the result written in the same single write.
+
+        Raises:
+            KeyError: if path is not in the bundle
+            BundleError: if the member's bytes don't match the index
+            OSError: if dest_path can't be written
+        """
+        start, end = self._span(path)
+        with memoryview(self._map) as whole, whole[start:end] as data:
+            if hashlib.sha256(data).hexdigest() != self.members[path].sha256:
+                raise BundleError(f"Checksum mismatch for {path} in {self.path}")
+            with atomic_replace(dest_path) as tmp_path:
+                with open(tmp_path, "wb") as f:
+                    f.write(data if transform is None else transform(bytes(data)))
+
+    def _span(self, path: str) -> Tuple[int, int]:
+        member = self.members[path]
+        start = self._data_start + member.offset
+        return start, start + member.size
+
+    def _read_index(self) -> Tuple[Dict[str, BundleMember], int]:
+        if len(self._map) < _PREAMBLE.size:
+            raise BundleError(f"Not a bundle: {self.path}")
+        magic, index_size = _PREAMBLE.unpack_from(self._map)
+        if magic != MAGIC:
+            raise BundleError(f"Not a bundle: {self.path}")
+
+        data_start = _PREAMBLE.size + index_size
+        try:
+            index = json.loads(self._map[_PREAMBLE.size : data_start])
+            if index["format"] != FORMAT_VERSION:
+                raise BundleError(f"Unsupported bundle format {index['format']}: {self.path}")
+            members = {
+                path: BundleMember(int(offset), int(size), str(sha256))
+                for path, (offset, size, sha256) in index["members"].items()
+            }
+        except (ValueError, KeyError, TypeError) as e:
+            raise BundleError(f"Corrupt bundle index in {self.path}: {e}") from e
+
+        data_size = len(self._map) - data_start
+        for path, member in members.items():
+            if member.offset < 0 or member.offset + member.size > data_size:
+                raise BundleError(f"Member {path} lies outside {self.path}")
+        return members, data_start
+
+
+def write_bundle(
+    output_path: Union[str, Path], reg_data: Dict, source_root: Path
+) -> Tuple[int, List[str]]:
+    """
+    Pack a registry and every component file it lists into one bundle.
+
+    Component paths are resolved against source_root (the repository
+    checkout the registry came from). The file is written atomically.
+
+    Args:
+        output_path: Bundle file to create
+        reg_data: Parsed registry, stored as the bundle's registry.json
+        source_root: Directory component paths are relative to
+
+    Returns:
+        (number of component files packed, registry paths that were missing)
+    """
+    registry_bytes = json.dumps(reg_data, separators=(",", ":")).encode("utf-8")
+    sources: Dict[str, Optional[Path]] = {REGISTRY_MEMBER: None}
+    missing: List[str] = []
+    for path in _component_paths(reg_data):
+        if path in sources:
+            continue
+        source = source_root / path
+        if not is_safe_relative_path(path) or not source.is_file():
+            missing.append(path)
+            continue
+        sources[path] = source
+
+    # First pass sizes and hashes every member so the index can lead the file
+    members: Dict[str, List[Any]] = {}
+    offset = 0
+    for path, source in sources.items():
+        if source is None:
+            size, sha256 = len(registry_bytes), hashlib.sha256(registry_bytes).hexdigest()
+        else:
+            size, sha256 = hash_file(source)
+        members[path] = [offset, size, sha256]
+        offset += size
+
+    index = json.dumps(
+        {"format": FORMAT_VERSION, "members": members}, separators=(",", ":")
+    ).encode("utf-8")
+
+    with atomic_replace(output_path) as tmp_path:
+        with open(tmp_path, "wb") as out:
+            out.write(_PREAMBLE.pack(MAGIC, len(index)))
+            out.write(index)
+            for path, source in sources.items():
+                if source is None:
+                    out.write(registry_bytes)
+                    continue
+                with open(source, "rb") as f:
+                    shutil.copyfileobj(f, out, CHUNK_SIZE)
+                offset, size, _ = members[path]
+                if out.tell() - _PREAMBLE.size - len(index) != offset + size:
+                    raise BundleError(f"{source} changed while packing")
+
+    return len(sources) - 1, missing
+
+
+def _component_paths(reg_data: Dict) -> Iterator[str]:
+    for entries in reg_data.get("components", {}).values():
+        if not isinstance(entries, list):
+            continue
+        for entry in entries:
+            path = entry.get("path") if isinstance(entry, dict) else None
+            if path and path != "null":
+                yield path
+
+
+def hash_file(path: Path) -> Tuple[int, str]:
+    """Return a file's size and sha256, reading it in chunks."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
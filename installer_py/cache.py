@@ -0,0 +1,220 @@
+"""On-disk download cache keyed by URL and content hash."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .paths import atomic_replace
+
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+def default_cache_dir() -> Path:
+    """Return ``$XDG_CACHE_HOME/opencode-installer`` (``~/.cache`` by default)."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return Path(base) / "opencode-installer"
+
+
+@dataclass
+class CacheEntry:
+    """Validators and content hash recorded for one cached URL."""
+
+    url: str
+    sha256: str
+    size: int
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0.0
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Headers for revalidating this entry with a conditional GET."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class DownloadCache:
+    """
+    Content-addressed blob store with a small metadata file per URL.
+
+    Layout::
+
+        <root>/blobs/<sha256[:2]>/<sha256>   file contents
+        <root>/urls/<sha256(url)>.json       CacheEntry for a URL
+
+    Every file is written to a temporary name and renamed into place, so
+    several installer processes can share one cache. Blobs are evicted least
+    recently used first (by mtime, refreshed on every hit) once the total
+    size exceeds ``max_bytes``.
+    """
+
+    def __init__(self, root: Path, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        """Return the entry for a URL if both its metadata and blob exist."""
+        try:
+            with open(self._entry_path(url), "r", encoding="utf-8") as f:
+                entry = CacheEntry(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+        if entry.url != url or not self.blob_path(entry.sha256).exists():
+            return None
+        return entry
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.root / "blobs" / sha256[:2] / sha256
+
+    def store(
+        self,
+        url: str,
+        data: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> CacheEntry:
+        """Store downloaded content and its validators for a URL."""
+        sha256 = hashlib.sha256(data).hexdigest()
+        blob = self.blob_path(sha256)
+        if not blob.exists():
+            _atomic_write(blob, data)
+            self._account(len(data))
+        return self._record(url, sha256, len(data), etag, last_modified)
+
+    def store_file(
+        self,
+        url: str,
+        source: Path,
+        sha256: str,
+        size: int,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> CacheEntry:
+        """Store a downloaded file whose sha256 was computed while streaming."""
+        blob = self.blob_path(sha256)
+        if not blob.exists():
+            with atomic_replace(blob) as tmp:
+                shutil.copyfile(source, tmp)
+            self._account(size)
+        return self._record(url, sha256, size, etag, last_modified)
+
+    def _record(
+        self,
+        url: str,
+        sha256: str,
+        size: int,
+        etag: Optional[str],
+        last_modified: Optional[str],
+    ) -> CacheEntry:
+        entry = CacheEntry(
+            url=url,
+            sha256=sha256,
+            size=size,
+            etag=etag,
+            last_modified=last_modified,
+            fetched_at=time.time(),
+        )
+        self._write_entry(entry)
+        return entry
+
+    def refresh(self, entry: CacheEntry) -> None:
+        """Mark an entry as revalidated and recently used."""
+        entry.fetched_at = time.time()
+        self._write_entry(entry)
+        self.touch(entry)
+
+    def forget(self, url: str) -> None:
+        """Drop a URL's entry, leaving its blob to eviction."""
+        try:
+            self._entry_path(url).unlink()
+        except OSError:
+            pass
+
+    def touch(self, entry: CacheEntry) -> None:
+        """Bump an entry's blob in the LRU order."""
+        try:
+            os.utime(self.blob_path(entry.sha256))
+        except OSError:
+            pass
+
+    def copy_to(
+        self,
+        entry: CacheEntry,
+        output_path: Path,
+        transform: Optional[Callable[[bytes], bytes]] = None,
+    ) -> None:
+        """Atomically copy a cached blob, optionally transformed, to an output path."""
+        with atomic_replace(output_path) as tmp:
+            if transform is None:
+                shutil.copyfile(self.blob_path(entry.sha256), tmp)
+            else:
+                Path(tmp).write_bytes(transform(self.blob_path(entry.sha256).read_bytes()))
+        self.touch(entry)
+
+    def evict(self) -> None:
+        """Delete least recently used blobs until the cache fits max_bytes."""
+        with self._lock:
+            self._evict_locked()
+
+    def _account(self, added: int) -> None:
+        # Track the cache size in memory so eviction only rescans the blob
+        # directory when the size cap is actually exceeded.
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._scan_blobs())
+            else:
+                self._total_bytes += added
+            if self._total_bytes > self.max_bytes:
+                self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        blobs = self._scan_blobs()
+        total = sum(size for _, size, _ in blobs)
+        for _, size, path in sorted(blobs, key=lambda item: item[0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+        self._total_bytes = total
+
+    def _scan_blobs(self) -> List[Tuple[float, int, Path]]:
+        blobs = []
+        for path in (self.root / "blobs").glob("*/*"):
+            if path.name.endswith(".tmp"):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            blobs.append((stat.st_mtime, stat.st_size, path))
+        return blobs
+
+    def _entry_path(self, url: str) -> Path:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.root / "urls" / f"{key}.json"
+
+    def _write_entry(self, entry: CacheEntry) -> None:
+        _atomic_write(
+            self._entry_path(entry.url), json.dumps(asdict(entry)).encode("utf-8")
+        )
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    with atomic_replace(path) as tmp:
+        tmp.write_bytes(data)
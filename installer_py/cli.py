@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import argparse
-from typing import NamedTuple, Optional
+import sys
+from typing import List, NamedTuple, Optional
 
 PROFILES = ["essential", "developer", "business", "full", "advanced"]
 
@@ -11,11 +12,26 @@ class ParsedArgs(NamedTuple):
     install_dir: Optional[str]
     local_files: Optional[str]
     list: bool
+    jobs: Optional[int]
+    no_cache: bool
+    refresh_registry: bool
+    bulk: bool
+    bundle: Optional[str] = None
+    command: str = "install"
+    output: Optional[str] = None
+    verbose: bool = False
+    fix: bool = False
+    shards: Optional[str] = None
+    restore: Optional[str] = None
 
 
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="OpenAgents Installer (Python version)",
+        epilog=(
+            "Run 'install.py pack --help' to build an offline pack file, or "
+            "'install.py registry --help' to validate and compile registry.json."
+        ),
         formatter_class=argparse.ArgumentDefaultsHelpFormatter,
     )
     parser.add_argument("profile", nargs="?", choices=PROFILES, help="Installation profile")
@@ -31,16 +47,160 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="List available components",
     )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=_positive_int,
+        metavar="N",
+        help="Number of components to download in parallel (overrides OPENCODE_JOBS)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't read or write the download cache (~/.cache/opencode-installer)",
+    )
+    parser.add_argument(
+        "--refresh-registry",
+        action="store_true",
+        help="Revalidate the cached registry even if it is younger than OPENCODE_REGISTRY_TTL",
+    )
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="Download one archive of the branch instead of one request per file",
+    )
+    parser.add_argument(
+        "--bundle",
+        metavar="PACK",
+        help="Install from a pack file built with 'install.py pack' (no network)",
+    )
+    parser.add_argument(
+        "--restore",
+        metavar="SNAPSHOT",
+        help="Restore files from a backup snapshot of the install directory ('latest' or an ID)",
+    )
     return parser
 
 
-def parse_args() -> tuple[ParsedArgs, argparse.ArgumentParser]:
+def build_pack_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="install.py pack",
+        description="Build an offline pack file from a repository checkout",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("output", help="Pack file to write (e.g. agentic.ocp)")
+    parser.add_argument(
+        "--registry",
+        default="registry.json",
+        help="Registry to pack; component paths are relative to its directory",
+    )
+    return parser
+
+
+def build_registry_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="install.py registry",
+        description="Validate registry.json and compile its install-time data",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser(
+        "build",
+        help="Validate and write precomputed closures, sizes and hashes",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    build.add_argument(
+        "--registry",
+        default="registry.json",
+        help="Registry to compile; component paths are relative to its directory",
+    )
+    build.add_argument(
+        "--output", "-o", help="Where to write the compiled registry (default: in place)"
+    )
+    build.add_argument(
+        "--shards",
+        metavar="DIR",
+        help="Also write a sharded copy (manifest.json, per-type and per-profile shards) to DIR",
+    )
+
+    validate = commands.add_parser(
+        "validate",
+        help="Check component paths and dependencies without writing anything",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    validate.add_argument("--registry", default="registry.json", help="Registry to check")
+    validate.add_argument(
+        "--verbose", "-v", action="store_true", help="List every component and orphaned files"
+    )
+    validate.add_argument(
+        "--fix", "-f", action="store_true", help="Suggest existing files for missing paths"
+    )
+    return parser
+
+
+def _positive_int(value: str) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError("must be at least 1")
+    return number
+
+
+def parse_args(
+    argv: Optional[List[str]] = None,
+) -> tuple[ParsedArgs, argparse.ArgumentParser]:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["pack"]:
+        parser = build_pack_parser()
+        args = parser.parse_args(argv[1:])
+        parsed = ParsedArgs(
+            profile=None,
+            install_dir=None,
+            local_files=args.registry,
+            list=False,
+            jobs=None,
+            no_cache=True,
+            refresh_registry=False,
+            bulk=False,
+            command="pack",
+            output=args.output,
+        )
+        return parsed, parser
+
+    if argv[:1] == ["registry"]:
+        parser = build_registry_parser()
+        args = parser.parse_args(argv[1:])
+        parsed = ParsedArgs(
+            profile=None,
+            install_dir=None,
+            local_files=args.registry,
+            list=False,
+            jobs=None,
+            no_cache=True,
+            refresh_registry=False,
+            bulk=False,
+            command=f"registry-{args.command}",
+            output=getattr(args, "output", None),
+            verbose=getattr(args, "verbose", False) or getattr(args, "fix", False),
+            fix=getattr(args, "fix", False),
+            shards=getattr(args, "shards", None),
+        )
+        return parsed, parser
+
     parser = build_parser()
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     parsed = ParsedArgs(
         profile=args.profile,
         install_dir=args.install_dir,
         local_files=args.local_files,
         list=args.list,
+        jobs=args.jobs,
+        no_cache=args.no_cache,
+        refresh_registry=args.refresh_registry,
+        bulk=args.bulk,
+        bundle=args.bundle,
+        restore=args.restore,
     )
     return parsed, parser
@@ -1,25 +1,46 @@
 """Collision detection and handling."""
 
-import os
-from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Mapping, Optional
+from .backup import DEFAULT_BACKUP_KEEP, BackupStore
+from .compiler import CompiledFile
+from .fstree import FileTree
 from .types import CollisionStrategy, ComponentType
 from .console import print_warning, print_info, colorize, Colors
 
 
-def detect_collisions(component_paths: List[str], install_dir: str) -> List[str]:
+def detect_collisions(
+    component_paths: List[str],
+    install_dir: str,
+    tree: Optional[FileTree] = None,
+    expected: Optional[Mapping[str, CompiledFile]] = None,
+) -> List[str]:
     """
     Detect which files already exist at installation paths.
 
+    A file whose content is already exactly what would be installed is not
+    a collision: installing leaves it alone.
+
+    Args:
+        component_paths: Destination paths of the components to install
+        install_dir: Installation directory
+        tree: Snapshot of the destination directories; scanned if not given
+        expected: Size and sha256 of the incoming content by destination
+            path, where known (see install_ops.expected_files)
+
     Returns:
-        List of paths that already exist
+        List of paths that already exist with different content
     """
+    if tree is None:
+        tree = FileTree.scan(component_paths)
+    expected = expected or {}
     collisions = []
-
     for path in component_paths:
-        if os.path.exists(path):
-            collisions.append(path)
-
+        if not tree.exists(path):
+            continue
+        incoming = expected.get(path)
+        if incoming and tree.same_content(path, incoming.size, incoming.sha256):
+            continue
+        collisions.append(path)
     return collisions
 
 
@@ -114,34 +135,33 @@ def get_collision_strategy() -> CollisionStrategy:
         return CollisionStrategy.CANCEL
 
 
-def create_backup(files: List[str], install_dir: str) -> Optional[str]:
+def create_backup(
+    files: List[str],
+    install_dir: str,
+    jobs: int = 1,
+    keep: Optional[int] = DEFAULT_BACKUP_KEEP,
+    max_age_days: Optional[int] = None,
+) -> Optional[str]:
     """
     Create backup of files.
 
+    Files are added to the install directory's BackupStore
+    (<install_dir>.backups) as a new snapshot, storing only content the
+    store doesn't already hold, and older snapshots are pruned to the
+    retention policy (see BackupStore.prune).
+
     Returns:
-        Path to backup directory or None if no files were backed up
+        ID of the snapshot, or None if no files were backed up
     """
-    from datetime import datetime
-    import shutil
-
-    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-    backup_dir = f"{install_dir}.backup.{timestamp}"
-
-    backup_count = 0
-    for file_path in files:
-        if os.path.exists(file_path):
-            # Calculate relative path from install_dir
-            try:
-                rel_path = os.path.relpath(file_path, install_dir)
-                backup_path = os.path.join(backup_dir, rel_path)
-
-                # Ensure parent directory exists
-                Path(backup_path).parent.mkdir(parents=True, exist_ok=True)
-
-                # Copy the file
-                shutil.copy2(file_path, backup_path)
-                backup_count += 1
-            except Exception:
-                print_warning(f"Failed to backup: {file_path}")
-
-    return backup_dir if backup_count > 0 else None
+    store = BackupStore.for_install_dir(install_dir)
+    try:
+        snapshot_id, failed = store.snapshot(files, install_dir, jobs)
+    except OSError as e:
+        print_warning(f"Failed to write backup: {e}")
+        return None
+    for file_path in failed:
+        print_warning(f"Failed to backup: {file_path}")
+
+    if snapshot_id:
+        store.prune(keep, max_age_days)
+    return snapshot_id
@@ -0,0 +1,366 @@
+"""Registry compiler: validate registry.json and precompute what installs need."""
+
+from __future__ import annotations
+
+import datetime
+import hashlib
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AbstractSet, Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from .bundle import hash_file
+from .deps import DependencyResolver, Resolution
+from .paths import atomic_replace, is_safe_relative_path
+from .registry import (
+    SHARDS_FORMAT,
+    SHARDS_KEY,
+    RegistryIndex,
+    get_registry_key,
+    parse_components,
+    parse_profiles,
+)
+from .types import Profile
+
+COMPILED_KEY = "compiled"
+COMPILED_FORMAT = 2
+
+MANIFEST_NAME = "manifest.json"
+
+# Directories under .opencode scanned for files the registry doesn't list
+ORPHAN_DIRS = ("agent", "command", "tool", "plugin", "context")
+ORPHAN_SUFFIXES = (".md", ".ts")
+
+
+class CompiledFile(NamedTuple):
+    """Size and sha256 of one component file, as recorded at build time."""
+
+    size: int
+    sha256: str
+
+
+@dataclass
+class CompiledRegistry:
+    """
+    A registry's compiled section, decoded entry by entry as it is used.
+
+    Only the closure and file records the installer asks for are decoded,
+    so a large registry costs nothing beyond the profile being installed.
+    """
+
+    profiles: Dict[str, Any]
+    files: Dict[str, Any]
+
+    def closure(self, profile: Profile, index: RegistryIndex) -> Optional[Resolution]:
+        """
+        Return a profile's compiled closure, or None if it can't be trusted.
+
+        The closure is used only if its digest still matches the profile and
+        the dependencies of every component in it, and every ID it recorded
+        as missing is still missing; resolving again would give the same
+        result. Checking costs one lookup per component in the closure.
+        """
+        entry = self.profiles.get(profile.id)
+        try:
+            resolution = Resolution(
+                order=list(entry["order"]),
+                waves=[list(wave) for wave in entry["waves"]],
+                missing=[(required_by, comp_id) for required_by, comp_id in entry["missing"]],
+                cycles=[tuple(cycle) for cycle in entry["cycles"]],
+            )
+            digest = entry["digest"]
+        except (KeyError, TypeError, ValueError):
+            return None
+        if any(comp_id in index for _, comp_id in resolution.missing):
+            return None
+        if closure_digest(profile, resolution.order, index) != digest:
+            return None
+        return resolution
+
+    def file(self, path: str) -> Optional[CompiledFile]:
+        """Return the recorded size and sha256 of a component path."""
+        entry = self.files.get(path)
+        try:
+            return CompiledFile(int(entry["size"]), str(entry["sha256"]))
+        except (KeyError, TypeError, ValueError):
+            return None
+
+
+@dataclass
+class CompileReport:
+    """Problems found while compiling a registry."""
+
+    checked: int = 0
+    missing_files: List[Tuple[str, str]] = field(default_factory=list)
+    missing_deps: List[Tuple[str, Optional[str], str]] = field(default_factory=list)
+    cycles: List[Tuple[str, ...]] = field(default_factory=list)
+    orphans: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        """True if the registry can be compiled (orphans are only warnings)."""
+        return not (self.missing_files or self.missing_deps or self.cycles)
+
+
+def closure_digest(
+    profile: Profile, order: Sequence[str], index: RegistryIndex
+) -> Optional[str]:
+    """
+    Hash everything a profile's closure was resolved from.
+
+    That is the profile's component list and, for each component in the
+    closure, its ID and dependencies. Returns None if a component in
+    ``order`` is no longer in the registry.
+    """
+    records = []
+    for comp_id in order:
+        comp = index.get(comp_id)
+        if comp is None:
+            return None
+        records.append([comp_id, list(comp.dependencies)])
+    canonical = json.dumps(
+        [list(profile.components), records], separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def compile_registry(
+    reg_data: Dict, source_root: Path, scan_orphans: bool = False
+) -> Tuple[Dict, CompileReport]:
+    """
+    Validate a registry and build its compiled section.
+
+    Every component path must name a file under source_root (the directory
+    registry.json lives in); each is sized and hashed. Each profile is
+    resolved once, so installs read its closure instead of walking
+    dependencies again.
+
+    The compiled section looks like::
+
+        "compiled": {
+          "format": 2,
+          "files": {"<path>": {"size": 1234, "sha256": "...", "components": ["agent:x"]}},
+          "profiles": {
+            "<id>": {"digest": "<closure_digest>", "order": [...], "waves": [[...]],
+                     "missing": [], "cycles": []}
+          }
+        }
+
+    ``files`` doubles as the path index: it maps each registry path to the
+    components installed from it.
+
+    Args:
+        reg_data: Parsed registry.json
+        source_root: Directory component paths are relative to
+        scan_orphans: Also list files under .opencode the registry doesn't name
+
+    Returns:
+        (registry with its compiled section replaced, report of problems found)
+    """
+    report = CompileReport()
+    components = parse_components(reg_data)
+    profiles = parse_profiles(reg_data)
+
+    files: Dict[str, Dict[str, Any]] = {}
+    for comp_type, comps in components.items():
+        for comp in comps:
+            comp_id = f"{comp_type.value}:{comp.id}"
+            if not comp.path or comp.path == "null":
+                continue
+            report.checked += 1
+            entry = files.get(comp.path)
+            if entry is None:
+                source = source_root / comp.path
+                if not is_safe_relative_path(comp.path) or not source.is_file():
+                    report.missing_files.append((comp_id, comp.path))
+                    continue
+                size, sha256 = hash_file(source)
+                entry = files[comp.path] = {"size": size, "sha256": sha256, "components": []}
+            entry["components"].append(comp_id)
+
+    resolver = DependencyResolver(components)
+    closures = {}
+    for profile_id, profile in profiles.items():
+        resolution = resolver.resolve(profile.components)
+        for required_by, comp_id in resolution.missing:
+            report.missing_deps.append((profile_id, required_by, comp_id))
+        for cycle in resolution.cycles:
+            if cycle not in report.cycles:
+                report.cycles.append(cycle)
+        closures[profile_id] = {
+            "digest": closure_digest(profile, resolution.order, components.index),
+            "order": resolution.order,
+            "waves": resolution.waves,
+            "missing": [list(pair) for pair in resolution.missing],
+            "cycles": [list(cycle) for cycle in resolution.cycles],
+        }
+
+    if scan_orphans:
+        report.orphans = find_orphans(
+            source_root, files.keys() | {path for _, path in report.missing_files}
+        )
+
+    compiled = {
+        "format": COMPILED_FORMAT,
+        "files": dict(sorted(files.items())),
+        "profiles": closures,
+    }
+    result = {key: value for key, value in reg_data.items() if key != COMPILED_KEY}
+    result[COMPILED_KEY] = compiled
+    if reg_data.get(COMPILED_KEY) != compiled:
+        # Only a real change bumps the date, so rebuilding is idempotent
+        metadata = dict(result.get("metadata") or {})
+        metadata["lastUpdated"] = datetime.date.today().isoformat()
+        result["metadata"] = metadata
+    return result, report
+
+
+def load_compiled(reg_data: Dict) -> Optional[CompiledRegistry]:
+    """
+    Return a registry's compiled section, or None if it has none in this format.
+
+    Nothing is decoded or checked yet; see CompiledRegistry.closure. A
+    section that doesn't match the registry any more simply has its
+    closures rejected, and the installer resolves dependencies itself.
+    """
+    compiled = reg_data.get(COMPILED_KEY)
+    if not isinstance(compiled, dict) or compiled.get("format") != COMPILED_FORMAT:
+        return None
+    profiles = compiled.get("profiles")
+    files = compiled.get("files")
+    if not isinstance(profiles, dict) or not isinstance(files, dict):
+        return None
+    return CompiledRegistry(profiles, files)
+
+
+def find_orphans(source_root: Path, registered: AbstractSet[str]) -> List[str]:
+    """List files under .opencode's component directories not in registered."""
+    orphans = []
+    for name in ORPHAN_DIRS:
+        base = source_root / ".opencode" / name
+        if not base.is_dir():
+            continue
+        for path in sorted(base.rglob("*")):
+            if path.suffix not in ORPHAN_SUFFIXES or not path.is_file():
+                continue
+            rel_path = path.relative_to(source_root).as_posix()
+            if "/node_modules/" in rel_path or rel_path in registered:
+                continue
+            orphans.append(rel_path)
+    return orphans
+
+
+def suggest_paths(source_root: Path, missing_path: str, comp_id: str) -> List[str]:
+    """Markdown files near a missing path whose name mentions the component ID."""
+    name = comp_id.split(":", 1)[-1].lower()
+    base = source_root.joinpath(*Path(missing_path).parent.parts[:3])
+    if not name or not base.is_dir():
+        return []
+    return sorted(
+        path.relative_to(source_root).as_posix()
+        for path in base.rglob("*.md")
+        if name in path.relative_to(source_root).as_posix().lower()
+    )
+
+
+def write_registry(path: Path, reg_data: Dict) -> None:
+    """Write a registry in the repository's two-space JSON layout."""
+    with atomic_replace(path) as tmp_path:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(reg_data, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+
+
+def write_shards(reg_data: Dict, output_dir: Path) -> Path:
+    """
+    Write a compiled registry as a root manifest plus shards.
+
+    The manifest keeps everything but the components and the compiled
+    section, and lists the shards with their sha256 so clients can check
+    them and reuse cached copies::
+
+        "shards": {
+          "format": 1,
+          "types": {"agents": {"path": "types/agents.json", "sha256": "...", "size": 1234}},
+          "profiles": {"essential": {"path": "profiles/essential.json", ...}}
+        }
+
+    A per-type shard holds every component of that type and their file
+    records. A per-profile shard holds exactly the components of the
+    profile's closure, its compiled closure and their file records, so
+    installing a profile fetches one shard. Profiles whose ID isn't a safe
+    file name get no shard and are served from the per-type shards.
+
+    Returns:
+        Path of the manifest
+    """
+    compiled = reg_data.get(COMPILED_KEY) or {}
+    files = compiled.get("files", {})
+    closures = compiled.get("profiles", {})
+    sections = reg_data.get("components", {})
+    components = parse_components(reg_data)
+
+    def write(rel_path: str, shard: Dict) -> Dict[str, Any]:
+        data = json.dumps(shard, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        path = output_dir / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_replace(path) as tmp_path:
+            tmp_path.write_bytes(data)
+        return {"path": rel_path, "sha256": hashlib.sha256(data).hexdigest(), "size": len(data)}
+
+    def shard_compiled(paths: Sequence[str], profiles: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "format": COMPILED_FORMAT,
+            "files": {path: files[path] for path in paths if path in files},
+            "profiles": profiles,
+        }
+
+    types = {}
+    for comp_type, comps in components.items():
+        key = get_registry_key(comp_type)
+        entries = sections.get(key) or []
+        if not entries:
+            continue
+        types[key] = write(
+            f"types/{key}.json",
+            {
+                "components": {key: entries},
+                "compiled": shard_compiled(sorted({c.path for c in comps}), {}),
+            },
+        )
+
+    profile_shards = {}
+    for profile_id, closure in closures.items():
+        rel_path = f"profiles/{profile_id}.json"
+        if "/" in profile_id or not is_safe_relative_path(rel_path):
+            continue
+        members = set(closure.get("order", []))
+        grouped: Dict[str, List[Any]] = {}
+        paths = set()
+        for comp_type, comps in components.items():
+            key = get_registry_key(comp_type)
+            for comp, entry in zip(comps, sections.get(key) or []):
+                if f"{comp_type.value}:{comp.id}" in members:
+                    grouped.setdefault(key, []).append(entry)
+                    paths.add(comp.path)
+        profile_shards[profile_id] = write(
+            rel_path,
+            {
+                "components": grouped,
+                "compiled": shard_compiled(sorted(paths), {profile_id: closure}),
+            },
+        )
+
+    manifest = {
+        key: value
+        for key, value in reg_data.items()
+        if key not in ("components", COMPILED_KEY)
+    }
+    manifest[SHARDS_KEY] = {
+        "format": SHARDS_FORMAT,
+        "types": types,
+        "profiles": profile_shards,
+    }
+    manifest_path = output_dir / MANIFEST_NAME
+    write_registry(manifest_path, manifest)
+    return manifest_path
@@ -6,9 +6,16 @@ import os
 import subprocess
 from typing import Optional
 
+from .archive import github_archive_url
+from .backup import DEFAULT_BACKUP_KEEP
+from .cache import DEFAULT_CACHE_MAX_BYTES, default_cache_dir
+from .network import DEFAULT_POLICY, NetworkPolicy
+
 DEFAULT_BRANCH = "main"
 DEFAULT_INSTALL_DIR = ".opencode"
 DEFAULT_REPO_SLUG = "fcimeson/agentic-config"
+DEFAULT_JOBS = 8
+DEFAULT_REGISTRY_TTL = 300
 
 
 def _run_git_command(args: list[str], cwd: Path) -> Optional[str]:
@@ -63,6 +70,16 @@ def _extract_slug(origin_url: str) -> Optional[str]:
     return slug.rstrip("/").removesuffix(".git")
 
 
+def _env_int(name: str) -> Optional[int]:
+    value = os.environ.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
 @dataclass
 class InstallerConfig:
     branch: str
@@ -73,6 +90,14 @@ class InstallerConfig:
     registry_url: str
     use_local_files: bool
     local_registry_path: Optional[Path]
+    jobs: int = DEFAULT_JOBS
+    cache_dir: Optional[Path] = None
+    cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES
+    registry_ttl: int = DEFAULT_REGISTRY_TTL
+    archive_url: Optional[str] = None
+    network_policy: NetworkPolicy = DEFAULT_POLICY
+    backup_keep: Optional[int] = DEFAULT_BACKUP_KEEP
+    backup_max_age_days: Optional[int] = None
 
     @property
     def repo_url(self) -> str:
@@ -89,6 +114,8 @@ def build_config(
     use_local_files: bool = False,
     local_registry_path: Optional[str] = None,
     script_path: Optional[Path] = None,
+    jobs: Optional[int] = None,
+    use_cache: bool = True,
 ) -> InstallerConfig:
     resolved_branch = branch or os.environ.get("OPENCODE_BRANCH") or DEFAULT_BRANCH
     resolved_repo_slug = repo_slug or detect_repo_slug(script_path or Path.cwd())
@@ -112,6 +139,38 @@ def build_config(
 
     resolved_local_registry = Path(local_registry_path).expanduser() if local_registry_path else None
 
+    resolved_jobs = jobs or _env_int("OPENCODE_JOBS") or DEFAULT_JOBS
+
+    # OPENCODE_CACHE_DIR="" disables the download cache like --no-cache
+    env_cache_dir = os.environ.get("OPENCODE_CACHE_DIR")
+    resolved_cache_dir: Optional[Path] = None
+    if use_cache and env_cache_dir != "":
+        resolved_cache_dir = Path(env_cache_dir or default_cache_dir()).expanduser()
+
+    cache_max_mb = _env_int("OPENCODE_CACHE_MAX_MB")
+    resolved_cache_max_bytes = (
+        cache_max_mb * 1024 * 1024 if cache_max_mb is not None else DEFAULT_CACHE_MAX_BYTES
+    )
+
+    resolved_archive_url = os.environ.get("OPENCODE_ARCHIVE_URL") or github_archive_url(
+        resolved_repo_slug, resolved_branch
+    )
+
+    retries = _env_int("OPENCODE_RETRIES")
+    timeout = _env_int("OPENCODE_TIMEOUT")
+    resolved_policy = NetworkPolicy(
+        retries=retries if retries is not None else DEFAULT_POLICY.retries,
+        read_timeout=timeout or DEFAULT_POLICY.read_timeout,
+    )
+
+    registry_ttl = _env_int("OPENCODE_REGISTRY_TTL")
+    resolved_registry_ttl = registry_ttl if registry_ttl is not None else DEFAULT_REGISTRY_TTL
+
+    # Retention of backup snapshots; OPENCODE_BACKUP_KEEP=0 leaves only the age limit,
+    # and keeps everything when OPENCODE_BACKUP_DAYS isn't set
+    backup_keep = _env_int("OPENCODE_BACKUP_KEEP")
+    resolved_backup_keep = max(0, backup_keep) if backup_keep is not None else DEFAULT_BACKUP_KEEP
+
     return InstallerConfig(
         branch=resolved_branch,
         repo_slug=resolved_repo_slug,
@@ -121,4 +180,12 @@ def build_config(
         registry_url=resolved_registry_url,
         use_local_files=use_local_files,
         local_registry_path=resolved_local_registry,
+        jobs=max(1, resolved_jobs),
+        cache_dir=resolved_cache_dir,
+        cache_max_bytes=resolved_cache_max_bytes,
+        registry_ttl=resolved_registry_ttl,
+        archive_url=resolved_archive_url,
+        network_policy=resolved_policy,
+        backup_keep=resolved_backup_keep,
+        backup_max_age_days=_env_int("OPENCODE_BACKUP_DAYS"),
     )
@@ -1,75 +1,153 @@
 """Dependency resolution utilities."""
 
-from typing import Dict, List, Set, Optional
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .registry import index_for
 from .types import Component, ComponentType
 
 
+@dataclass
+class Resolution:
+    """
+    Result of resolving a set of component IDs.
+
+    ``order`` lists every known component reachable from the requested IDs,
+    each after its dependencies, and ``waves`` groups the same IDs by
+    dependency level: nothing in a wave depends on anything in that wave or
+    a later one. ``missing`` holds (required_by, id) pairs for IDs not in
+    the registry (required_by is None for requested IDs), and ``cycles``
+    each dependency cycle met, as the IDs along it.
+    """
+
+    order: List[str] = field(default_factory=list)
+    waves: List[List[str]] = field(default_factory=list)
+    missing: List[Tuple[Optional[str], str]] = field(default_factory=list)
+    cycles: List[Tuple[str, ...]] = field(default_factory=list)
+
+
+class DependencyResolver:
+    """
+    Iterative depth-first resolver over one registry.
+
+    The walk keeps an explicit stack, so chain depth is not limited by
+    Python's recursion limit, and it visits each component and edge once
+    per call: one walk over all the roots shares a single done set, so
+    roots listed dependencies-first cost nothing extra. Each component's
+    dependency list, or None if it can't be resolved, is memoized for the
+    life of the resolver, so resolving several profiles looks each
+    component up once. Resolving a set of roots is linear in the edges
+    reachable from them.
+    """
+
+    def __init__(self, components: Dict[ComponentType, List[Component]]):
+        self.index = index_for(components)
+        self._edges: Dict[str, Optional[Tuple[str, ...]]] = {}
+
+    def resolve(self, component_ids: Iterable[str]) -> Resolution:
+        """Resolve component IDs to an install order, dependencies first."""
+        result = Resolution()
+        done: Set[str] = set()
+        reported: Set[Tuple[str, ...]] = set()
+
+        for root in component_ids:
+            if root in done:
+                continue
+            done.add(root)
+            root_deps = self._dependencies(root)
+            if root_deps is None:
+                result.missing.append((None, root))
+                continue
+
+            # Each frame is a component and an iterator over its remaining deps
+            stack: List[Tuple[str, Iterator[str]]] = [(root, iter(root_deps))]
+            on_stack = {root}
+            while stack:
+                comp_id, deps = stack[-1]
+                for dep_id in deps:
+                    if dep_id in on_stack:
+                        self._report_cycle(stack, dep_id, result, reported)
+                        continue
+                    if dep_id in done:
+                        continue
+                    done.add(dep_id)
+                    dep_deps = self._dependencies(dep_id)
+                    if dep_deps is None:
+                        result.missing.append((comp_id, dep_id))
+                        continue
+                    stack.append((dep_id, iter(dep_deps)))
+                    on_stack.add(dep_id)
+                    break
+                else:
+                    # All dependencies placed; the component can follow them
+                    stack.pop()
+                    on_stack.discard(comp_id)
+                    result.order.append(comp_id)
+
+        for comp_id, level in zip(result.order, self.levels(result.order)):
+            if level == len(result.waves):
+                result.waves.append([])
+            result.waves[level].append(comp_id)
+        return result
+
+    def levels(self, order: Iterable[str]) -> List[int]:
+        """
+        Return the dependency level of each ID in an install order.
+
+        A component's level is one more than the highest level among its
+        dependencies that appear earlier in the order (0 if there are none),
+        so every component of a level can be installed at the same time once
+        the previous levels are done. Dependencies outside the order, and
+        the edge closing a cycle, are ignored. Repeated IDs get the same level.
+        """
+        seen: Dict[str, int] = {}
+        result = []
+        for comp_id in order:
+            level = seen.get(comp_id)
+            if level is None:
+                deps = self._dependencies(comp_id) or ()
+                level = max((seen[dep] + 1 for dep in deps if dep in seen), default=0)
+                seen[comp_id] = level
+            result.append(level)
+        return result
+
+    def _dependencies(self, comp_id: str) -> Optional[Tuple[str, ...]]:
+        """Return a component's dependency IDs, or None if it isn't known."""
+        try:
+            return self._edges[comp_id]
+        except KeyError:
+            comp = self.index.get(comp_id)
+            deps = comp.dependencies if comp else None
+            self._edges[comp_id] = deps
+            return deps
+
+    @staticmethod
+    def _report_cycle(
+        stack: List[Tuple[str, Iterator[str]]],
+        dep_id: str,
+        result: Resolution,
+        reported: Set[Tuple[str, ...]],
+    ) -> None:
+        path = [comp_id for comp_id, _ in stack]
+        cycle = path[path.index(dep_id) :]
+        # The same cycle can be entered at any of its members
+        start = cycle.index(min(cycle))
+        canonical = tuple(cycle[start:] + cycle[:start])
+        if canonical not in reported:
+            reported.add(canonical)
+            result.cycles.append(canonical + (canonical[0],))
+
+
 def resolve_dependencies(
     component_ids: List[str], components: Dict[ComponentType, List[Component]]
 ) -> List[str]:
     """
     Resolve dependencies for a list of component IDs.
 
+    Unknown IDs are left out and cycles are broken at the edge that closes
+    them; use DependencyResolver to get those reported.
+
     Returns:
         List of component IDs including all dependencies (topologically sorted)
     """
-    resolved = []
-    visited = set()
-
-    def visit(comp_id: str):
-        if comp_id in visited:
-            return
-        visited.add(comp_id)
-
-        # Find the component
-        comp = _find_component(components, comp_id)
-        if not comp:
-            return
-
-        # Visit dependencies first (depth-first)
-        for dep_id in comp.dependencies:
-            visit(dep_id)
-
-        # Add this component
-        if comp_id not in resolved:
-            resolved.append(comp_id)
-
-    # Visit each requested component
-    for comp_id in component_ids:
-        visit(comp_id)
-
-    return resolved
-
-
-def _find_component(
-    components: Dict[ComponentType, List[Component]], component_id: str
-) -> Optional[Component]:
-    """Find a component by its full ID (type:id)."""
-    if ":" not in component_id:
-        return None
-
-    type_str, comp_id = component_id.split(":", 1)
-
-    # Map type string to ComponentType
-    try:
-        comp_type = {
-            "agent": ComponentType.AGENT,
-            "subagent": ComponentType.SUBAGENT,
-            "command": ComponentType.COMMAND,
-            "tool": ComponentType.TOOL,
-            "plugin": ComponentType.PLUGIN,
-            "context": ComponentType.CONTEXT,
-            "config": ComponentType.CONFIG,
-        }.get(type_str)
-
-        if not comp_type:
-            return None
-    except:
-        return None
-
-    # Find the component
-    for comp in components.get(comp_type, []):
-        if comp.id == comp_id:
-            return comp
-
-    return None
+    return DependencyResolver(components).resolve(component_ids).order
@@ -0,0 +1,177 @@
+"""One-pass snapshot of the directories an install writes into."""
+
+from __future__ import annotations
+
+import os
+import stat
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from .bundle import hash_file
+
+# Marks a directory that hasn't been listed yet
+_UNSCANNED: Dict[str, os.DirEntry] = {}
+# Marks a directory that exists but couldn't be listed (permissions...)
+_UNREADABLE: Dict[str, os.DirEntry] = {}
+
+
+class FileStat(NamedTuple):
+    """Size and modification time of a file seen in a FileTree."""
+
+    size: int
+    mtime_ns: int
+
+
+class FileTree:
+    """
+    Existence, size and mtime of install destinations from one scan.
+
+    Each directory that holds a destination is listed once with
+    os.scandir, instead of stat-ing every destination separately; a
+    directory whose parent was listed without it is known to be missing
+    and costs nothing. Sizes and mtimes come from the directory entries
+    and are only stat-ed for the files asked about.
+
+    A directory that can't be listed is left unknown, and paths in it are
+    stat-ed one by one instead.
+
+    The snapshot is not refreshed by other writers; make_dirs keeps it in
+    step with the directories it creates.
+    """
+
+    def __init__(self) -> None:
+        # Listed directory -> its entries by name, or None if it is missing
+        self._dirs: Dict[str, Optional[Dict[str, os.DirEntry]]] = {}
+        self._digests: Dict[str, str] = {}
+
+    @classmethod
+    def scan(cls, file_paths: Iterable[str]) -> FileTree:
+        """Snapshot the directories holding file_paths."""
+        tree = cls()
+        parents = {os.path.dirname(os.path.normpath(path)) for path in file_paths}
+        # Parents first, so a missing directory settles its subdirectories
+        for directory in sorted(parents, key=len):
+            tree._listing(directory)
+        return tree
+
+    def exists(self, path: str) -> bool:
+        """Whether path exists (following symlinks), like os.path.exists."""
+        if not self._is_listed(path):
+            return os.path.exists(path)
+        entry = self._entry(path)
+        if entry is None:
+            return False
+        if entry.is_symlink():
+            return os.path.exists(entry.path)
+        return True
+
+    def stat(self, path: str) -> Optional[FileStat]:
+        """Size and mtime of a file, or None if it is missing or not a file."""
+        try:
+            if self._is_listed(path):
+                entry = self._entry(path)
+                if entry is None or not entry.is_file():
+                    return None
+                info = entry.stat()
+            else:
+                info = os.stat(path)
+                if not stat.S_ISREG(info.st_mode):
+                    return None
+        except OSError:
+            return None
+        return FileStat(info.st_size, info.st_mtime_ns)
+
+    def same_content(self, path: str, size: int, sha256: str) -> bool:
+        """
+        Whether path is a file with exactly this size and sha256.
+
+        Files of another size are rejected without being read, and each
+        file is hashed at most once per snapshot.
+        """
+        info = self.stat(path)
+        if info is None or info.size != size:
+            return False
+        path = os.path.normpath(path)
+        digest = self._digests.get(path)
+        if digest is None:
+            try:
+                _, digest = hash_file(path)
+            except OSError:
+                return False
+            self._digests[path] = digest
+        return digest == sha256
+
+    def missing_dirs(self, file_paths: Iterable[str]) -> List[str]:
+        """
+        The fewest directories to create so every file path has its parent.
+
+        Only the deepest missing directories are listed; creating each with
+        its parents covers the rest.
+        """
+        missing = set()
+        for path in file_paths:
+            parent = os.path.dirname(os.path.normpath(path))
+            if parent and self._listing(parent) is None:
+                missing.add(parent)
+        ancestors = set()
+        for directory in missing:
+            parent = os.path.dirname(directory)
+            while parent and parent not in ancestors:
+                ancestors.add(parent)
+                parent = os.path.dirname(parent)
+        return sorted(missing - ancestors)
+
+    def make_dirs(self, file_paths: Iterable[str]) -> None:
+        """
+        Create the missing parent directories of file_paths up front.
+
+        A directory that can't be created is left for the write into it to
+        fail and report.
+        """
+        for directory in self.missing_dirs(file_paths):
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError:
+                continue
+            self._dirs[directory] = {}
+            # Listings of its ancestors are stale now; they are rescanned if asked
+            child, parent = directory, os.path.dirname(directory)
+            while parent != child:
+                self._dirs.pop(parent or os.curdir, None)
+                child, parent = parent, os.path.dirname(parent)
+
+    def _is_listed(self, path: str) -> bool:
+        """Whether path's directory was listed (or is known to be missing)."""
+        return self._listing(os.path.dirname(os.path.normpath(path))) is not _UNREADABLE
+
+    def _entry(self, path: str) -> Optional[os.DirEntry]:
+        path = os.path.normpath(path)
+        listing = self._listing(os.path.dirname(path))
+        if listing is None:
+            return None
+        return listing.get(os.path.basename(path))
+
+    def _listing(self, directory: str) -> Optional[Dict[str, os.DirEntry]]:
+        """A directory's entries, scanning it on first use; None if missing."""
+        directory = directory or os.curdir
+        try:
+            return self._dirs[directory]
+        except KeyError:
+            pass
+
+        parent_listing = self._dirs.get(os.path.dirname(directory) or os.curdir, _UNSCANNED)
+        if parent_listing is None or (
+            parent_listing is not _UNSCANNED
+            and parent_listing is not _UNREADABLE
+            and os.path.basename(directory) not in parent_listing
+        ):
+            listing = None
+        else:
+            try:
+                with os.scandir(directory) as entries:
+                    listing = {entry.name: entry for entry in entries}
+            except (FileNotFoundError, NotADirectoryError):
+                listing = None
+            except OSError:
+                listing = _UNREADABLE
+        self._dirs[directory] = listing
+        return listing
@@ -1,16 +1,87 @@
 """Installation operations (file copying, downloading, etc)."""
 
-import os
+import hashlib
+import http.client
 import shutil
+import tarfile
+import tempfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Dict,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
+from .archive import extract_paths
+from .bundle import Bundle, BundleError, hash_file
+from .cache import DownloadCache
+from .compiler import CompiledFile
 from .types import Component, ComponentType, CollisionStrategy, InstallResult
-from .network import fetch_url
-from .paths import get_install_path, ensure_parent_dir
-from .transform import transform_context_paths, should_transform
-from .console import print_success, print_error, print_info, print_step
-from .registry import find_component
+from .network import DEFAULT_POLICY, HTTPStatusError, NetworkPolicy, fetch_url, revalidate
+from .fstree import FileTree
+from .paths import atomic_replace, get_install_path
+from .staging import CommitError, StagingArea
+from .transform import content_transform, should_transform, transform_file_content
+from .console import print_success, print_error, print_info, print_step, print_warning
+from .registry import RegistryIndex, index_for
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class _Source:
+    """Where component files are read from."""
+
+    raw_url: str
+    use_local_files: bool
+    local_base_path: Path
+    cache: Optional[DownloadCache] = None
+    policy: NetworkPolicy = DEFAULT_POLICY
+    archive_dir: Optional[Path] = None
+    archived: Set[str] = field(default_factory=set)
+    bundle: Optional[Bundle] = None
+    revalidated_since: Optional[float] = None
+
+    def local_path(self, registry_path: str) -> Optional[Path]:
+        """Return the on-disk source for a path, or None to download it."""
+        if self.use_local_files:
+            return self.local_base_path / registry_path
+        if self.archive_dir and registry_path in self.archived:
+            return self.archive_dir / registry_path
+        return None
+
+
+@dataclass
+class _InstallTask:
+    """A component that passed planning and needs its file fetched."""
+
+    comp: Component
+    dest_path: str
+    file_existed: bool
+    stage_path: str
+    incoming: Optional[CompiledFile] = None
+
+
+@dataclass
+class _Outcome:
+    """Result of installing one component, reported on the main thread."""
+
+    status: str  # "installed", "skipped", "unchanged" or "failed"
+    messages: List[Tuple[Callable[[str], None], str]] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
 
 
 def install_components(
@@ -21,10 +92,35 @@ def install_components(
     use_local_files: bool,
     local_base_path: Path,
     collision_strategy: CollisionStrategy,
+    jobs: int = 1,
+    cache: Optional[DownloadCache] = None,
+    archive_url: Optional[str] = None,
+    policy: NetworkPolicy = DEFAULT_POLICY,
+    bundle: Optional[Bundle] = None,
+    tree: Optional[FileTree] = None,
+    expected: Optional[Mapping[str, CompiledFile]] = None,
+    revalidated_since: Optional[float] = None,
 ) -> InstallResult:
     """
     Install a list of components.
 
+    Components are planned in order and their files fetched by up to
+    ``jobs`` worker threads. Nothing reaches the install directory before
+    every file has been fetched, so fetches needn't wait for dependencies.
+    Outcomes are reported back in the original order so console output and
+    InstallResult match a sequential run.
+
+    Which destinations exist is read from one FileTree snapshot (the one
+    collision detection took, if given). An existing file that already has
+    the ``expected`` content is left untouched and counted as unchanged.
+
+    The install is all-or-nothing: files are fetched into a StagingArea
+    next to the install directory and committed only once every component
+    has been staged. If any fails, including a component that is unknown or
+    has no path, the install directory is not touched and the staged files
+    are kept; the next run reuses those that still have the ``expected``
+    content and fetches only the rest.
+
     Args:
         component_ids: List of component IDs to install (type:id format)
         components_dict: Dictionary of all available components
@@ -33,6 +129,19 @@ def install_components(
         use_local_files: Whether to copy from local files
         local_base_path: Base path for local files
         collision_strategy: How to handle existing files
+        jobs: Maximum number of components fetched concurrently
+        cache: Download cache used to revalidate remote files
+        archive_url: Branch tarball to take remote files from in one request;
+            paths missing from it are still downloaded one by one
+        policy: Timeouts and retries for remote downloads
+        bundle: Pack file to read every component from instead of local
+            files or the network
+        tree: Snapshot of the destination directories; scanned if not given
+        expected: Size and sha256 of the incoming content by destination
+            path, where known (see expected_files)
+        revalidated_since: When expected_files started revalidating remote
+            files; cache entries confirmed since then are installed from the
+            cache without asking the server again
 
     Returns:
         InstallResult with counts and errors
@@ -40,86 +149,339 @@ def install_components(
     print_step("Installing components...")
 
     result = InstallResult()
+    staging = StagingArea(install_dir)
+
+    source = _Source(
+        raw_url,
+        use_local_files,
+        local_base_path,
+        cache,
+        policy,
+        bundle=bundle,
+        revalidated_since=revalidated_since,
+    )
+
+    def install_one(entry: Union[_InstallTask, _Outcome]) -> _Outcome:
+        if isinstance(entry, _Outcome):
+            return entry
+        return _install_file(entry, install_dir, source)
+
+    index = index_for(components_dict)
+    if tree is None:
+        tree = FileTree.scan(
+            get_install_path(comp.path, install_dir)
+            for comp in map(index.get, component_ids)
+            if comp and comp.path and comp.path != "null"
+        )
+    plan = [
+        _plan_component(
+            comp_id, index, install_dir, collision_strategy, tree, staging, expected
+        )
+        for comp_id in component_ids
+    ]
+    tasks = [task for task in plan if isinstance(task, _InstallTask)]
+    stage_paths = [task.stage_path for task in tasks]
+    FileTree.scan(stage_paths).make_dirs(stage_paths)
 
-    # Ensure base directory exists
-    Path(install_dir).mkdir(parents=True, exist_ok=True)
+    with ExitStack() as stack:
+        if archive_url and not use_local_files and not bundle:
+            source.archive_dir = Path(
+                stack.enter_context(tempfile.TemporaryDirectory(prefix="opencode-archive-"))
+            )
+            wanted = [task.comp.path for task in plan if isinstance(task, _InstallTask)]
+            source.archived = _extract_archive(
+                archive_url, wanted, source.archive_dir, policy
+            )
 
+        outcomes = []
+        for outcome in _run_in_order(install_one, plan, jobs):
+            _report_outcome(outcome, result)
+            outcomes.append(outcome)
+
+    staged = [
+        entry.dest_path
+        for entry, outcome in zip(plan, outcomes)
+        if isinstance(entry, _InstallTask) and outcome.status == "installed"
+    ]
+    failed = sum(outcome.status == "failed" for outcome in outcomes)
+    if not staged:
+        # Nothing worth keeping for a rerun
+        staging.discard()
+    if failed:
+        print_error(f"{failed} component(s) failed; no changes were made to {install_dir}")
+        if staged:
+            print_info(f"{len(staged)} staged file(s) kept in {staging.root} for the next run")
+        result.installed = 0
+        result.rolled_back = True
+        return result
+    if not staged:
+        return result
+
+    try:
+        staging.commit(staged, tree)
+    except CommitError as e:
+        print_error(str(e))
+        result.errors.append(str(e))
+        result.failed += len(staged)
+        result.installed = 0
+        result.rolled_back = True
+    return result
+
+
+def expected_files(
+    component_ids: Iterable[str],
+    components_dict: Dict[ComponentType, List[Component]],
+    install_dir: str,
+    use_local_files: bool,
+    local_base_path: Path,
+    raw_url: str = "",
+    cache: Optional[DownloadCache] = None,
+    bundle: Optional[Bundle] = None,
+    policy: NetworkPolicy = DEFAULT_POLICY,
+    tree: Optional[FileTree] = None,
+    jobs: int = 1,
+) -> Dict[str, CompiledFile]:
+    """
+    Size and sha256 that each component's installed file will have.
+
+    Bundles and local sources are read as they are. For remote installs the
+    registry's compiled hashes can lag behind upstream, so they aren't used:
+    each file is revalidated into the download cache with a conditional GET
+    (``jobs`` at a time) and its current content used, and without a cache
+    nothing is returned. With ``tree``, only remote files that could be
+    skipped are checked: those already at their destination or staged by
+    an earlier run. When paths are transformed, the content is hashed after
+    transforming.
+
+    Returns:
+        Size and sha256 by destination path, for the components where known
+    """
+    index = index_for(components_dict)
+    source = _Source(raw_url, use_local_files, local_base_path, cache, policy, bundle=bundle)
+    remote = bundle is None and not use_local_files
+    if remote and (cache is None or not raw_url):
+        return {}
+
+    paths = {}
     for comp_id in component_ids:
-        comp = find_component(components_dict, comp_id)
-        if not comp:
-            result.errors.append(f"Component not found: {comp_id}")
-            result.failed += 1
-            continue
-
-        if not comp.path or comp.path == "null":
-            result.errors.append(f"No path for component: {comp_id}")
-            result.failed += 1
-            continue
-
-        # Get installation path
-        dest_path = get_install_path(comp.path, install_dir)
-
-        # Check if file exists
-        file_existed = os.path.exists(dest_path)
-
-        # Handle collision strategy
-        if file_existed and collision_strategy == CollisionStrategy.SKIP:
-            print_info(f"Skipped existing: {comp.type.value}:{comp.id}")
-            result.skipped += 1
-            continue
-
-        # Ensure parent directory exists
-        ensure_parent_dir(dest_path)
-
-        # Install the file
-        success = False
-        if use_local_files:
-            # Copy from local file
-            src_path = local_base_path / comp.path
-            if not src_path.exists():
-                print_error(
-                    f"Local source not found for {comp.type.value}:{comp.id}: {src_path}"
-                )
-                result.failed += 1
-                continue
-
-            try:
-                shutil.copy2(src_path, dest_path)
-                success = True
-            except Exception as e:
-                print_error(f"Failed to copy {comp.type.value}:{comp.id}: {e}")
-                result.failed += 1
-                continue
-        else:
-            # Download from remote URL
-            file_url = f"{raw_url}/{comp.path}"
-            success = fetch_url(file_url, Path(dest_path))
-
-            if not success:
-                print_error(f"Failed to download {comp.type.value}:{comp.id}")
-                result.failed += 1
-                continue
-
-        # Transform paths if needed
-        if success and should_transform(install_dir):
-            try:
-                with open(dest_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-
-                transformed = transform_context_paths(content, install_dir)
-
-                with open(dest_path, "w", encoding="utf-8") as f:
-                    f.write(transformed)
-            except Exception:
-                # If transformation fails, that's okay - file is still installed
-                pass
-
-        # Report success
-        if file_existed:
-            print_success(f"Updated {comp.type.value}: {comp.id}")
-        else:
-            print_success(f"Installed {comp.type.value}: {comp.id}")
+        comp = index.get(comp_id)
+        if comp and comp.path and comp.path != "null":
+            paths[get_install_path(comp.path, install_dir)] = comp.path
+    if remote and tree is not None:
+        staging = StagingArea(install_dir)
+        staged = FileTree.scan(staging.path_for(dest) for dest in paths)
+        paths = {
+            dest: path
+            for dest, path in paths.items()
+            if tree.exists(dest) or staged.exists(staging.path_for(dest))
+        }
+
+    def expect(path: str) -> Optional[CompiledFile]:
+        try:
+            return _expected_file(path, install_dir, source)
+        except OSError:
+            return None
 
+    if remote and jobs > 1 and len(paths) > 1:
+        with ThreadPoolExecutor(max_workers=min(jobs, len(paths))) as pool:
+            incoming = list(pool.map(expect, paths.values()))
+    else:
+        incoming = [expect(path) for path in paths.values()]
+    return {dest: info for dest, info in zip(paths, incoming) if info}
+
+
+def _expected_file(path: str, install_dir: str, source: _Source) -> Optional[CompiledFile]:
+    """Size and sha256 one registry path will have once installed, if known."""
+    transform = should_transform(install_dir)
+    if source.bundle is not None:
+        member = source.bundle.members.get(path)
+        if member is None:
+            return None
+        if not transform:
+            return CompiledFile(member.size, member.sha256)
+        data = source.bundle.read(path)
+    elif source.use_local_files:
+        local_path = source.local_base_path / path
+        if not transform:
+            return CompiledFile(*hash_file(local_path))
+        data = local_path.read_bytes()
+    else:
+        entry = revalidate(f"{source.raw_url}/{path}", source.cache, policy=source.policy)
+        if entry is None:
+            return None
+        if not transform:
+            return CompiledFile(entry.size, entry.sha256)
+        data = source.cache.blob_path(entry.sha256).read_bytes()
+    data = transform_file_content(data, install_dir)
+    return CompiledFile(len(data), hashlib.sha256(data).hexdigest())
+
+
+def _plan_component(
+    comp_id: str,
+    index: RegistryIndex,
+    install_dir: str,
+    collision_strategy: CollisionStrategy,
+    tree: FileTree,
+    staging: StagingArea,
+    expected: Optional[Mapping[str, CompiledFile]] = None,
+) -> Union[_InstallTask, _Outcome]:
+    """Resolve a component and decide whether it needs fetching."""
+    comp = index.get(comp_id)
+    if not comp:
+        return _Outcome("failed", errors=[f"Component not found: {comp_id}"])
+
+    if not comp.path or comp.path == "null":
+        return _Outcome("failed", errors=[f"No path for component: {comp_id}"])
+
+    # Get installation path
+    dest_path = get_install_path(comp.path, install_dir)
+
+    # Check if file exists
+    file_existed = tree.exists(dest_path)
+
+    incoming = expected.get(dest_path) if expected else None
+    if (
+        file_existed
+        and incoming
+        and tree.same_content(dest_path, incoming.size, incoming.sha256)
+    ):
+        message = f"Unchanged: {comp.type.value}:{comp.id}"
+        return _Outcome("unchanged", messages=[(print_info, message)])
+
+    # Handle collision strategy
+    if file_existed and collision_strategy == CollisionStrategy.SKIP:
+        message = f"Skipped existing: {comp.type.value}:{comp.id}"
+        return _Outcome("skipped", messages=[(print_info, message)])
+
+    return _InstallTask(
+        comp, dest_path, file_existed, staging.path_for(dest_path), incoming
+    )
+
+
+def _extract_archive(
+    archive_url: str, paths: List[str], dest_dir: Path, policy: NetworkPolicy
+) -> Set[str]:
+    """Fetch the needed paths from one archive, or nothing if it fails."""
+    print_info(f"Downloading archive: {archive_url}")
+    try:
+        archived = extract_paths(archive_url, paths, dest_dir, policy=policy)
+    except (
+        HTTPStatusError,
+        http.client.HTTPException,
+        OSError,
+        EOFError,
+        tarfile.TarError,
+        zlib.error,
+    ) as e:
+        # A truncated or corrupt stream surfaces from the decoder or tarfile
+        print_warning(f"Archive download failed ({e}); downloading files individually")
+        return set()
+
+    missing = len(set(paths) - archived)
+    if missing:
+        print_info(f"{missing} file(s) not in archive; downloading individually")
+    return archived
+
+
+def _install_file(task: _InstallTask, install_dir: str, source: _Source) -> _Outcome:
+    """Fetch or copy one component file into staging. Runs on a worker thread."""
+    comp = task.comp
+    stage_path = task.stage_path
+    label = f"{comp.type.value}:{comp.id}"
+
+    # Paths are rewritten as the file is written, for global installs
+    transform = content_transform(install_dir)
+
+    # Install the file
+    src_path = source.local_path(comp.path)
+    if _already_staged(task):
+        # Left by an earlier run that failed elsewhere
+        pass
+    elif source.bundle is not None:
+        # Copy straight out of the memory-mapped pack
+        if comp.path not in source.bundle:
+            message = f"{label} is not in bundle {source.bundle.path}"
+            return _Outcome("failed", messages=[(print_error, message)])
+
+        try:
+            source.bundle.extract(comp.path, stage_path, transform)
+        except (BundleError, OSError) as e:
+            message = f"Failed to copy {label}: {e}"
+            return _Outcome("failed", messages=[(print_error, message)])
+    elif src_path is not None:
+        # Copy from local file
+        if not src_path.exists():
+            message = f"Local source not found for {label}: {src_path}"
+            return _Outcome("failed", messages=[(print_error, message)])
+
+        try:
+            with atomic_replace(stage_path) as tmp_path:
+                if transform is None:
+                    shutil.copy2(src_path, tmp_path)
+                else:
+                    tmp_path.write_bytes(transform(src_path.read_bytes()))
+                    shutil.copymode(src_path, tmp_path)
+        except Exception as e:
+            message = f"Failed to copy {label}: {e}"
+            return _Outcome("failed", messages=[(print_error, message)])
+    else:
+        # Download from remote URL
+        file_url = f"{source.raw_url}/{comp.path}"
+        if not fetch_url(
+            file_url,
+            Path(stage_path),
+            cache=source.cache,
+            policy=source.policy,
+            transform=transform,
+            fresh_since=source.revalidated_since,
+        ):
+            message = f"Failed to download {label}"
+            return _Outcome("failed", messages=[(print_error, message)])
+
+    if task.file_existed:
+        message = f"Updated {comp.type.value}: {comp.id}"
+    else:
+        message = f"Installed {comp.type.value}: {comp.id}"
+    return _Outcome("installed", messages=[(print_success, message)])
+
+
+def _already_staged(task: _InstallTask) -> bool:
+    """Whether the staged file already has the expected installed content."""
+    if task.incoming is None:
+        return False
+    try:
+        return hash_file(Path(task.stage_path)) == tuple(task.incoming)
+    except OSError:
+        return False
+
+
+def _report_outcome(outcome: _Outcome, result: InstallResult) -> None:
+    """Print an outcome's messages and fold it into the result counts."""
+    for show, message in outcome.messages:
+        show(message)
+
+    result.errors.extend(outcome.errors)
+
+    if outcome.status == "installed":
         result.installed += 1
+    elif outcome.status == "skipped":
+        result.skipped += 1
+    elif outcome.status == "unchanged":
+        result.unchanged += 1
+    else:
+        result.failed += 1
 
-    return result
+
+def _run_in_order(fn: Callable[[T], R], items: List[T], jobs: int) -> Iterator[R]:
+    """
+    Apply fn to items using up to ``jobs`` threads.
+
+    Results are yielded in input order as soon as every earlier item is
+    done. With a single job this is a plain lazy map, so behaviour is
+    identical to the sequential installer.
+    """
+    if jobs <= 1 or len(items) <= 1:
+        yield from map(fn, items)
+        return
+    with ThreadPoolExecutor(max_workers=min(jobs, len(items))) as pool:
+        yield from pool.map(fn, items)
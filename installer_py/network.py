@@ -1,43 +1,806 @@
 """Network utilities for fetching remote files."""
 
+from __future__ import annotations
+
+import hashlib
+import http.client
+import json
+import os
+import random
+import ssl
+import threading
+import time
 import urllib.request
 import urllib.error
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional, Tuple, TypeVar
+from urllib.parse import urljoin, urlsplit
+
+from .cache import CacheEntry, DownloadCache
+from .paths import atomic_replace, file_mode
+from .ratelimit import RateGovernor
+
+USER_AGENT = "opencode-installer"
+ACCEPT_ENCODING = "gzip, deflate"
+MAX_REDIRECTS = 5
+CHUNK_SIZE = 64 * 1024
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+PARTIAL_SUFFIX = ".part"
+
+PoolKey = Tuple[str, str, int]
+T = TypeVar("T")
+
+
+class HTTPStatusError(Exception):
+    """Raised when a server answers with a non-success status."""
+
+    def __init__(
+        self,
+        url: str,
+        status: int,
+        reason: str = "",
+        retry_after: Optional[float] = None,
+    ):
+        super().__init__(f"HTTP {status} {reason} for {url}".strip())
+        self.url = url
+        self.status = status
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class NetworkPolicy:
+    """
+    Timeouts and retry behaviour for installer downloads.
+
+    Every request the installer makes is an idempotent GET, so any attempt
+    that fails with a connection error, a timeout or one of
+    ``retry_statuses`` is retried up to ``retries`` times. Waits grow
+    exponentially from ``backoff_base`` up to ``backoff_max``, with up to
+    ``jitter`` of each wait randomised so parallel workers don't retry in
+    lockstep. A server's Retry-After is honoured up to ``backoff_max``.
+    """
+
+    connect_timeout: float = 10.0
+    read_timeout: float = 30.0
+    retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 10.0
+    jitter: float = 0.5
+    retry_statuses: FrozenSet[int] = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+    def should_retry(self, error: Exception, method: str = "GET") -> bool:
+        """Return whether a failed attempt may be repeated."""
+        if method not in ("GET", "HEAD"):
+            return False
+        if isinstance(error, HTTPStatusError):
+            return error.status in self.retry_statuses
+        return isinstance(error, (http.client.HTTPException, OSError))
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait after the given (1-based) failed attempt."""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        delay -= delay * self.jitter * random.random()
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+
+DEFAULT_POLICY = NetworkPolicy()
+
+
+@dataclass
+class FetchAttempt:
+    """Timing and outcome of one request attempt."""
+
+    url: str
+    attempt: int
+    elapsed: float
+    status: Optional[int] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of keep-alive HTTP(S) connections, reused per host.
+
+    Each connection is checked out by one thread at a time and returned to the
+    pool once its response has been read completely. URLs that plain
+    http.client can't serve (file:// mirrors, hosts behind an environment
+    proxy) fall back to urllib. Attempts made through ``request`` are paced by
+    the pool's shared RateGovernor.
+    """
+
+    def __init__(
+        self, max_idle_per_host: int = 16, governor: Optional[RateGovernor] = None
+    ):
+        self.max_idle_per_host = max_idle_per_host
+        self.governor = governor or RateGovernor()
+        self.connections_opened = 0
+        self.attempts: List[FetchAttempt] = []
+        self._idle: Dict[PoolKey, List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self._ssl_context = ssl.create_default_context()
+
+    @contextmanager
+    def open(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        policy: NetworkPolicy = DEFAULT_POLICY,
+    ) -> Iterator[DecodedResponse]:
+        """
+        GET a URL and yield the response, following redirects.
+
+        gzip/deflate transfer compression is negotiated unless ``headers``
+        set Accept-Encoding; the yielded response decodes it transparently.
+        A ``304 Not Modified`` answer to a conditional request is yielded like
+        a success so callers can serve their cached copy.
+
+        This makes a single attempt; see ``request`` for retries.
+
+        Raises:
+            HTTPStatusError: for non-2xx responses
+            OSError: for connection failures and timeouts (URLError is an OSError)
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            if not self._can_pool(url):
+                with self._open_with_urllib(url, headers, policy) as response:
+                    yield DecodedResponse(response)
+                return
+
+            key = _pool_key(url)
+            conn, response = self._send(key, url, headers, policy)
+            location = response.getheader("Location")
+            if response.status in REDIRECT_STATUSES and location:
+                response.read()
+                self._release(key, conn, response)
+                url = urljoin(url, location)
+                continue
 
+            if not 200 <= response.status < 300 and response.status != 304:
+                response.read()
+                self._release(key, conn, response)
+                raise HTTPStatusError(
+                    url,
+                    response.status,
+                    response.reason,
+                    _parse_retry_after(response.getheader("Retry-After")),
+                )
 
-def fetch_url(url: str, output_path: Path) -> bool:
+            try:
+                yield DecodedResponse(response)
+            except BaseException:
+                conn.close()
+                raise
+            self._release(key, conn, response)
+            return
+
+        raise HTTPStatusError(url, 310, "Too many redirects")
+
+    def request(
+        self,
+        url: str,
+        attempt: Callable[[], T],
+        policy: NetworkPolicy = DEFAULT_POLICY,
+    ) -> T:
+        """
+        Run ``attempt`` until it succeeds or the policy gives up.
+
+        ``attempt`` should perform one complete GET (open and read the body).
+        Each attempt holds a governor slot; throttling answers slow down the
+        whole pool. Each attempt's timing is appended to ``self.attempts``;
+        the last error is re-raised.
+        """
+        number = 1
+        while True:
+            try:
+                with self.governor.slot():
+                    start = time.monotonic()
+                    result = attempt()
+            except (HTTPStatusError, http.client.HTTPException, OSError) as e:
+                status = e.status if isinstance(e, HTTPStatusError) else None
+                if _is_throttle(e):
+                    self.governor.on_throttle(e.retry_after)
+                error = str(e) or type(e).__name__
+                elapsed = time.monotonic() - start
+                self._record(FetchAttempt(url, number, elapsed, status, error))
+                if number > policy.retries or not policy.should_retry(e):
+                    raise
+                retry_after = e.retry_after if isinstance(e, HTTPStatusError) else None
+                time.sleep(policy.backoff(number, retry_after))
+                number += 1
+                continue
+            self.governor.on_success()
+            self._record(FetchAttempt(url, number, time.monotonic() - start))
+            return result
+
+    def _record(self, attempt: FetchAttempt) -> None:
+        with self._lock:
+            self.attempts.append(attempt)
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+    def _send(
+        self,
+        key: PoolKey,
+        url: str,
+        headers: Optional[Dict[str, str]],
+        policy: NetworkPolicy,
+    ) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        """Send a GET, retrying once on a fresh socket if a reused one went stale."""
+        parts = urlsplit(url)
+        target = parts.path or "/"
+        if parts.query:
+            target += f"?{parts.query}"
+        request_headers = {
+            "User-Agent": USER_AGENT,
+            "Accept-Encoding": ACCEPT_ENCODING,
+            **(headers or {}),
+        }
+
+        conn, reused = self._acquire(key)
+        try:
+            return conn, self._exchange(conn, target, request_headers, policy)
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            if not reused:
+                raise
+
+        conn, _ = self._acquire(key, fresh=True)
+        try:
+            return conn, self._exchange(conn, target, request_headers, policy)
+        except BaseException:
+            conn.close()
+            raise
+
+    @staticmethod
+    def _exchange(
+        conn: http.client.HTTPConnection,
+        target: str,
+        headers: Dict[str, str],
+        policy: NetworkPolicy,
+    ) -> http.client.HTTPResponse:
+        if conn.sock is None:
+            conn.timeout = policy.connect_timeout
+            conn.connect()
+        conn.sock.settimeout(policy.read_timeout)
+        conn.request("GET", target, headers=headers)
+        return conn.getresponse()
+
+    def _acquire(
+        self, key: PoolKey, fresh: bool = False
+    ) -> Tuple[http.client.HTTPConnection, bool]:
+        if not fresh:
+            with self._lock:
+                idle = self._idle.get(key)
+                if idle:
+                    return idle.pop(), True
+
+        scheme, host, port = key
+        conn: http.client.HTTPConnection
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(host, port, context=self._ssl_context)
+        else:
+            conn = http.client.HTTPConnection(host, port)
+        with self._lock:
+            self.connections_opened += 1
+        return conn, False
+
+    def _release(
+        self,
+        key: PoolKey,
+        conn: http.client.HTTPConnection,
+        response: http.client.HTTPResponse,
+    ) -> None:
+        # Only connections whose response was fully consumed can be reused
+        if response.will_close or not response.isclosed():
+            conn.close()
+            return
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    @staticmethod
+    def _can_pool(url: str) -> bool:
+        scheme = urlsplit(url).scheme
+        if scheme not in ("http", "https"):
+            return False
+        host = urlsplit(url).hostname or ""
+        proxies = urllib.request.getproxies()
+        return scheme not in proxies or bool(urllib.request.proxy_bypass(host))
+
+    @staticmethod
+    @contextmanager
+    def _open_with_urllib(
+        url: str, headers: Optional[Dict[str, str]], policy: NetworkPolicy
+    ) -> Iterator[http.client.HTTPResponse]:
+        request_headers = {"User-Agent": USER_AGENT, **(headers or {})}
+        if urlsplit(url).scheme in ("http", "https"):
+            request_headers.setdefault("Accept-Encoding", ACCEPT_ENCODING)
+        request = urllib.request.Request(url, headers=request_headers)
+        try:
+            with urllib.request.urlopen(request, timeout=policy.read_timeout) as response:
+                yield response
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                yield e
+                return
+            retry_after = _parse_retry_after(e.headers.get("Retry-After"))
+            raise HTTPStatusError(url, e.code, str(e.reason), retry_after) from e
+
+
+class DecodedResponse:
+    """
+    Response wrapper that undoes gzip/deflate Content-Encoding while reading.
+
+    ``read(n)`` returns decoded bytes, and never more than n of them, so
+    callers can stream a compressed body in fixed-size chunks. The raw body is
+    checked against Content-Length at EOF, because http.client reports a
+    connection dropped mid-body as a normal end of stream.
+    """
+
+    def __init__(self, response: http.client.HTTPResponse):
+        self._response = response
+        self._raw_bytes = 0
+        self._eof = False
+        encoding = (response.headers.get("Content-Encoding") or "").strip().lower()
+        self.encoding = encoding or "identity"
+        self._decoder = None
+        if encoding in ("gzip", "x-gzip"):
+            self._decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            self._decoder = zlib.decompressobj()
+
+    @property
+    def status(self) -> int:
+        return self._response.status
+
+    @property
+    def headers(self):
+        return self._response.headers
+
+    def getheader(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self._response.headers.get(name, default)
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        if amt is None:
+            return b"".join(iter(lambda: self.read(CHUNK_SIZE), b""))
+
+        decoder = self._decoder
+        try:
+            while True:
+                if decoder and decoder.unconsumed_tail:
+                    data = decoder.decompress(decoder.unconsumed_tail, amt)
+                    if data:
+                        return data
+                    continue
+                if self._eof:
+                    if not decoder:
+                        return b""
+                    data = decoder.flush()
+                    if not decoder.eof:
+                        raise http.client.IncompleteRead(data)
+                    self._decoder = None
+                    return data
+
+                raw = self._response.read(amt)
+                if not raw:
+                    self._eof = True
+                    self._check_length()
+                    continue
+                self._raw_bytes += len(raw)
+                if not decoder:
+                    return raw
+                data = decoder.decompress(raw, amt)
+                if data:
+                    return data
+        except zlib.error as e:
+            raise http.client.HTTPException(f"invalid {self.encoding} body: {e}") from e
+
+    def _check_length(self) -> None:
+        expected = self._response.headers.get("Content-Length")
+        if expected and expected.isdigit() and int(expected) != self._raw_bytes:
+            raise http.client.IncompleteRead(b"", int(expected) - self._raw_bytes)
+
+
+@dataclass
+class PartialDownload:
+    """
+    Bytes of an interrupted download, kept next to the destination file.
+
+    The data lives in ``.<name>.part`` and the validators needed to resume it
+    in ``.<name>.part.json``. Partials are only kept for identity-encoded
+    responses that advertise ``Accept-Ranges: bytes`` and carry a strong ETag
+    or a Last-Modified date, so a later ``Range`` request can be made
+    conditional on the file being unchanged (``If-Range``).
+    """
+
+    path: Path
+    url: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @staticmethod
+    def path_for(output_path: Path) -> Path:
+        return output_path.with_name(f".{output_path.name}{PARTIAL_SUFFIX}")
+
+    @property
+    def meta_path(self) -> Path:
+        return self.path.with_name(self.path.name + ".json")
+
+    @property
+    def validator(self) -> Optional[str]:
+        if self.etag and not self.etag.startswith("W/"):
+            return self.etag
+        return self.last_modified
+
+    @classmethod
+    def load(cls, url: str, output_path: Path) -> Optional[PartialDownload]:
+        """Return the resumable partial download of url into output_path, if any."""
+        partial = cls(cls.path_for(output_path), url)
+        try:
+            meta = json.loads(partial.meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(meta, dict) or meta.get("url") != url:
+            return None
+        partial.etag = meta.get("etag")
+        partial.last_modified = meta.get("last_modified")
+        if not partial.validator or not partial.size():
+            return None
+        return partial
+
+    def size(self) -> int:
+        try:
+            return self.path.stat().st_size
+        except OSError:
+            return 0
+
+    def range_headers(self, offset: int) -> Dict[str, str]:
+        """Headers requesting the rest of the file if it is still the same file."""
+        return {
+            "Range": f"bytes={offset}-",
+            "If-Range": self.validator or "",
+            # Ranges of a gzip-encoded body index the compressed bytes
+            "Accept-Encoding": "identity",
+        }
+
+    def begin(self) -> None:
+        """Record the validators and start an empty partial file."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {"url": self.url, "etag": self.etag, "last_modified": self.last_modified}
+        self.meta_path.write_text(json.dumps(meta), encoding="utf-8")
+        self.path.write_bytes(b"")
+
+    def complete(self, output_path: Path) -> None:
+        """Move the finished download into place."""
+        os.chmod(self.path, file_mode(output_path))
+        os.replace(self.path, output_path)
+        self.meta_path.unlink()
+
+    def discard(self) -> None:
+        for path in (self.path, self.meta_path):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def _is_resumable(response: DecodedResponse) -> bool:
+    etag = response.getheader("ETag") or ""
+    return (
+        response.status == 200
+        and response.encoding == "identity"
+        and "bytes" in (response.getheader("Accept-Ranges") or "").lower()
+        and bool((etag and not etag.startswith("W/")) or response.getheader("Last-Modified"))
+    )
+
+
+def _range_start(response: DecodedResponse) -> Optional[int]:
+    """Return the first byte position of a 206 response's Content-Range."""
+    value = response.getheader("Content-Range") or ""
+    unit, _, spec = value.strip().partition(" ")
+    start = spec.partition("-")[0]
+    if unit.lower() != "bytes" or not start.isdigit():
+        return None
+    return int(start)
+
+
+def _is_throttle(error: Exception) -> bool:
+    return isinstance(error, HTTPStatusError) and (
+        error.status == 429 or (error.status == 503 and error.retry_after is not None)
+    )
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given as seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def _pool_key(url: str) -> PoolKey:
+    parts = urlsplit(url)
+    scheme = parts.scheme
+    port = parts.port or (443 if scheme == "https" else 80)
+    return scheme, parts.hostname or "", port
+
+
+_default_pool: Optional[ConnectionPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the shared connection pool used by the installer."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ConnectionPool()
+        return _default_pool
+
+
+def fetch_url(
+    url: str,
+    output_path: Path,
+    pool: Optional[ConnectionPool] = None,
+    cache: Optional[DownloadCache] = None,
+    policy: NetworkPolicy = DEFAULT_POLICY,
+    transform: Optional[Callable[[bytes], bytes]] = None,
+    fresh_since: Optional[float] = None,
+) -> bool:
     """
     Fetch a URL and save to a file.
 
+    The body is streamed in CHUNK_SIZE pieces to a temporary file next to
+    output_path and renamed into place once complete, so memory stays flat
+    and a failed download never leaves a truncated file behind. Failed
+    attempts are retried according to ``policy``.
+
+    When the server supports byte ranges, the temporary file is kept as a
+    PartialDownload if the transfer breaks, and the next attempt (or the next
+    run) asks only for the missing bytes. A server that ignores the Range,
+    or a file that changed in the meantime, gets a full download instead.
+
+    With a cache, a previously downloaded URL is revalidated with
+    If-None-Match/If-Modified-Since and a 304 is served from the cache. If
+    the cached blob was evicted in the meantime, the entry is dropped and
+    the URL requested once more without validators. A cache entry fetched
+    or revalidated at or after ``fresh_since`` (a time.time() value) is
+    served without asking the server at all.
+
+    ``transform`` rewrites the saved content: a cached copy is transformed
+    as it is copied out. A download is streamed, resumed and cached exactly
+    as served, then read back once and rewritten only if the transform
+    changed it, so most files are still written once.
+
     Returns:
         True if successful, False otherwise
     """
-    try:
-        with urllib.request.urlopen(url) as response:
-            data = response.read()
+    pool = pool or get_pool()
+    entry = cache.lookup(url) if cache and fresh_since is not None else None
+    if entry and entry.fetched_at >= fresh_since:
+        try:
+            cache.copy_to(entry, output_path, transform)
+            return True
+        except FileNotFoundError:
+            pass  # Evicted since the lookup; revalidate as usual
+    fetched = _fetch_once(url, output_path, pool, cache, policy, transform, True)
+    if fetched is None:
+        # The cached blob was evicted before the 304 arrived; ask for the body
+        fetched = _fetch_once(url, output_path, pool, cache, policy, transform, False)
+    return bool(fetched)
+
+
+def _fetch_once(
+    url: str,
+    output_path: Path,
+    pool: ConnectionPool,
+    cache: Optional[DownloadCache],
+    policy: NetworkPolicy,
+    transform: Optional[Callable[[bytes], bytes]],
+    conditional_ok: bool,
+) -> Optional[bool]:
+    """
+    One fetch_url pass; None if a 304 named a cached blob that is gone.
+
+    With ``conditional_ok`` False the request carries no validators, so the
+    server always sends the body.
+    """
+    entry = cache.lookup(url) if cache and conditional_ok else None
+    conditional = entry.conditional_headers() if entry else {}
 
-        # Ensure parent directory exists
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+    def attempt() -> Tuple[bool, str, int, Optional[str], Optional[str]]:
+        partial = PartialDownload.load(url, output_path)
+        offset = partial.size() if partial else 0
+        headers = dict(conditional)
+        if partial:
+            headers.update(partial.range_headers(offset))
 
-        with open(output_path, "wb") as f:
-            f.write(data)
+        sha256, size = "", 0
+        try:
+            with pool.open(url, headers or None, policy) as response:
+                etag = response.getheader("ETag")
+                last_modified = response.getheader("Last-Modified")
+                not_modified = response.status == 304
+                if not_modified:
+                    response.read()
+                    if partial:
+                        partial.discard()
+                elif partial and response.status == 206:
+                    if _range_start(response) != offset or response.encoding != "identity":
+                        partial.discard()
+                        raise http.client.HTTPException(f"unusable partial response for {url}")
+                    sha256, size = _stream_to_file(response, partial.path, append=True)
+                    partial.complete(output_path)
+                else:
+                    if partial:
+                        partial.discard()
+                    if _is_resumable(response):
+                        partial = PartialDownload(
+                            PartialDownload.path_for(output_path), url, etag, last_modified
+                        )
+                        partial.begin()
+                        sha256, size = _stream_to_file(response, partial.path)
+                        partial.complete(output_path)
+                    else:
+                        with atomic_replace(output_path) as tmp_path:
+                            sha256, size = _stream_to_file(response, tmp_path)
+        except HTTPStatusError as e:
+            if partial and e.status == 416:
+                # Our offset is past the end of the file; start over
+                partial.discard()
+                raise http.client.HTTPException(str(e)) from e
+            raise
+        return not_modified, sha256, size, etag, last_modified
 
-        return True
-    except (urllib.error.URLError, urllib.error.HTTPError, OSError):
+    try:
+        not_modified, sha256, size, etag, last_modified = pool.request(
+            url, attempt, policy
+        )
+        if cache and entry and not_modified:
+            try:
+                cache.copy_to(entry, output_path, transform)
+            except FileNotFoundError:
+                # Evicted by another writer since the lookup
+                if cache.blob_path(entry.sha256).exists():
+                    raise
+                cache.forget(url)
+                return None
+            cache.refresh(entry)
+            return True
+    except (HTTPStatusError, http.client.HTTPException, OSError):
         return False
 
+    if cache:
+        try:
+            cache.store_file(url, output_path, sha256, size, etag, last_modified)
+        except OSError:
+            # A broken cache must never fail the download itself
+            pass
+
+    if transform is not None:
+        try:
+            _transform_file(output_path, transform)
+        except OSError:
+            return False
+    return True
+
+
+def revalidate(
+    url: str,
+    cache: DownloadCache,
+    pool: Optional[ConnectionPool] = None,
+    policy: NetworkPolicy = DEFAULT_POLICY,
+) -> Optional[CacheEntry]:
+    """
+    Make sure the cache holds the current content of a URL.
+
+    A cached URL is revalidated with a conditional GET and a 304 costs no
+    body; otherwise the body is downloaded into the cache.
 
-def fetch_text(url: str) -> Optional[str]:
+    Returns:
+        The up-to-date cache entry, or None if the request failed
+    """
+    pool = pool or get_pool()
+    entry = cache.lookup(url)
+    conditional = entry.conditional_headers() if entry else {}
+
+    def attempt() -> Tuple[Optional[bytes], Optional[str], Optional[str]]:
+        with pool.open(url, conditional or None, policy) as response:
+            body = response.read()
+            if response.status == 304:
+                return None, None, None
+            return body, response.getheader("ETag"), response.getheader("Last-Modified")
+
+    try:
+        data, etag, last_modified = pool.request(url, attempt, policy)
+        if data is None:
+            if entry is None:
+                return None
+            cache.refresh(entry)
+            return entry
+        return cache.store(url, data, etag, last_modified)
+    except (HTTPStatusError, http.client.HTTPException, OSError):
+        return None
+
+
+def _transform_file(path: Path, transform: Callable[[bytes], bytes]) -> None:
+    """Rewrite a downloaded file through transform, if that changes it."""
+    data = path.read_bytes()
+    transformed = transform(data)
+    if transformed is not data:
+        with atomic_replace(path) as tmp_path:
+            tmp_path.write_bytes(transformed)
+
+
+def _stream_to_file(
+    response: DecodedResponse, path: Path, append: bool = False
+) -> Tuple[str, int]:
+    """
+    Copy a response body to path chunk by chunk, returning (sha256, size).
+
+    With ``append``, the body is added after the bytes already in path and
+    the returned digest and size cover the whole file.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "a+b" if append else "wb") as f:
+        if append:
+            f.seek(0)
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                size += len(chunk)
+        while True:
+            chunk = response.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            f.write(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def fetch_text(
+    url: str,
+    pool: Optional[ConnectionPool] = None,
+    policy: NetworkPolicy = DEFAULT_POLICY,
+) -> Optional[str]:
     """
     Fetch a URL and return as text.
 
     Returns:
         The text content if successful, None otherwise
     """
+    pool = pool or get_pool()
+
+    def attempt() -> bytes:
+        with pool.open(url, policy=policy) as response:
+            return response.read()
+
     try:
-        with urllib.request.urlopen(url) as response:
-            data = response.read()
-        return data.decode("utf-8")
-    except (urllib.error.URLError, urllib.error.HTTPError, OSError):
+        return pool.request(url, attempt, policy).decode("utf-8")
+    except (HTTPStatusError, http.client.HTTPException, OSError, UnicodeDecodeError):
         return None
@@ -1,8 +1,11 @@
 """Path handling and validation utilities."""
 
 import os
+import posixpath
+import tempfile
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional, Union
 
 
 def normalize_path(path: str) -> str:
@@ -61,7 +64,76 @@ def get_install_path(registry_path: str, install_dir: str) -> str:
     return os.path.join(install_dir, relative_path)
 
 
+def is_safe_relative_path(path: str) -> bool:
+    """Return whether a registry path stays inside the directory it is joined to."""
+    normalized = posixpath.normpath(path)
+    return (
+        bool(path)
+        and normalized == path
+        and not posixpath.isabs(path)
+        and not normalized.startswith("../")
+        and normalized != ".."
+    )
+
+
 def ensure_parent_dir(file_path: str) -> None:
     """Ensure the parent directory of a file exists."""
     parent = Path(file_path).parent
     parent.mkdir(parents=True, exist_ok=True)
+
+
+def _default_file_mode() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+_DEFAULT_FILE_MODE = _default_file_mode()
+
+
+def file_mode(file_path: Union[str, Path]) -> int:
+    """Return the permission bits of file_path, or the umask default if it's missing."""
+    try:
+        return os.stat(file_path).st_mode & 0o7777
+    except OSError:
+        return _DEFAULT_FILE_MODE
+
+
+@contextmanager
+def atomic_replace(file_path: Union[str, Path]) -> Iterator[Path]:
+    """
+    Yield a temporary path next to file_path and move it into place on success.
+
+    The temporary file lives in the destination directory so the final
+    os.replace is atomic: readers see either the old file or the complete new
+    one, never a partial write. On error the temporary file is removed and the
+    destination is left untouched. The new file keeps the mode of the file it
+    replaces, or the umask default for new files. Missing parent directories
+    are created, at no cost when they already exist.
+    """
+    target = Path(file_path)
+    prefix = f".{target.name}."
+    try:
+        fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=prefix, suffix=".tmp")
+    except FileNotFoundError:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=prefix, suffix=".tmp")
+    tmp_path = Path(tmp_name)
+    try:
+        mode = file_mode(target)
+        if hasattr(os, "fchmod"):
+            os.fchmod(fd, mode)
+        else:
+            os.chmod(tmp_path, mode)
+    finally:
+        os.close(fd)
+
+    try:
+        yield tmp_path
+        os.replace(tmp_path, target)
+    except BaseException:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,110 @@
+"""Shared rate governor for installer downloads."""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+DEFAULT_MAX_CONCURRENCY = 32
+DEFAULT_MAX_RATE = 100.0
+DEFAULT_THROTTLE_PAUSE = 1.0
+MAX_THROTTLE_PAUSE = 60.0
+DECREASE_INTERVAL = 1.0
+
+
+class RateGovernor:
+    """
+    Token bucket plus AIMD concurrency window shared by every download.
+
+    Each request takes a slot (at most ``limit`` in flight) and a token
+    (refilled at ``rate`` per second). A throttling answer (429, or 503 with
+    Retry-After) halves both the window and the rate and pauses the whole pool
+    until the server's Retry-After has passed; every success grows them back
+    additively. Aggregate throughput settles just under the server's limit
+    instead of every worker hammering it independently.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_rate: float = DEFAULT_MAX_RATE,
+        min_rate: float = 1.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.limit = float(max_concurrency)
+        self.rate = max_rate
+        self.in_flight = 0
+        self.throttled = 0
+        self.paused_until = 0.0
+        self._tokens = float(max_concurrency)
+        self._refilled_at = time.monotonic()
+        self._decreased_at = float("-inf")
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold a concurrency slot and one token for the duration of a request."""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    self._cond.wait(self.paused_until - now)
+                    continue
+                if self.in_flight >= max(1, int(self.limit)):
+                    self._cond.wait()
+                    continue
+                self._refill(now)
+                if self._tokens < 1:
+                    self._cond.wait((1 - self._tokens) / self.rate)
+                    continue
+                self._tokens -= 1
+                self.in_flight += 1
+                return
+
+    def release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self) -> None:
+        """Additive increase: roughly one extra slot per window of successes."""
+        with self._cond:
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self.rate = min(self.max_rate, self.rate + 1)
+            self._cond.notify_all()
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        """
+        Multiplicative decrease and a pool-wide pause.
+
+        Requests already in flight when the pool was paused tend to be
+        throttled together; only the first of them (and at most one per
+        DECREASE_INTERVAL) shrinks the window.
+        """
+        with self._cond:
+            now = time.monotonic()
+            self.throttled += 1
+            if now >= self.paused_until and now - self._decreased_at >= DECREASE_INTERVAL:
+                self._decreased_at = now
+                self.limit = max(1.0, self.limit / 2)
+                self.rate = max(self.min_rate, self.rate / 2)
+                self._tokens = min(self._tokens, 0.0)
+            pause = DEFAULT_THROTTLE_PAUSE if retry_after is None else retry_after
+            pause = min(pause, MAX_THROTTLE_PAUSE)
+            self.paused_until = max(self.paused_until, now + pause)
+
+    def _refill(self, now: float) -> None:
+        burst = max(1.0, self.limit)
+        self._tokens = min(burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
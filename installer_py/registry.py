@@ -1,12 +1,31 @@
 """Registry loading and parsing."""
 
+import gzip
+import hashlib
 import json
+import threading
+import time
+import zlib
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
 import shutil
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
 
+from .cache import DownloadCache
+from .config import DEFAULT_REGISTRY_TTL
+from .paths import is_safe_relative_path
 from .types import Component, ComponentType, Profile
-from .network import fetch_url
+from .network import DEFAULT_POLICY, NetworkPolicy, fetch_url
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Top-level key that marks a registry document as a sharded root manifest
+SHARDS_KEY = "shards"
+SHARDS_FORMAT = 1
+
+# Guards on-demand Component creation (module-level so maps stay picklable)
+_BUILD_LOCK = threading.Lock()
 
 
 def get_registry_key(comp_type: ComponentType) -> str:
@@ -22,59 +41,460 @@ def load_registry(
     use_local: bool = False,
     local_path: Optional[Path] = None,
     registry_url: Optional[str] = None,
+    cache: Optional[DownloadCache] = None,
+    ttl: float = DEFAULT_REGISTRY_TTL,
+    refresh: bool = False,
+    policy: NetworkPolicy = DEFAULT_POLICY,
+    profile: Optional[str] = None,
+    jobs: int = 1,
 ) -> Optional[Dict]:
     """
     Load the registry from local file or remote URL.
 
+    Both the single-file format and the sharded layout are accepted. For a
+    sharded root manifest, only the shards needed for ``profile`` (every
+    per-type shard when it is None) are fetched, ``jobs`` at a time, and
+    merged into a single-file registry.
+
+    A remote registry found in the cache and younger than ``ttl`` seconds is
+    parsed straight from the cache with no network round-trip. Older copies
+    are revalidated with a conditional GET.
+
+    Pre-compressed registries (``registry.json.gz``, locally or on a mirror)
+    are detected by their gzip header and decompressed while parsing. A
+    missing local ``registry.json`` falls back to ``registry.json.gz``.
+
     Args:
         registry_path: Where to save/load the registry
         use_local: Whether to use a local file
         local_path: Path to local registry file (if use_local is True)
         registry_url: URL to fetch registry from (if use_local is False)
+        cache: Download cache holding previously fetched registries
+        ttl: Seconds a cached registry is used without revalidation
+        refresh: Ignore the TTL and revalidate the cached registry now
+        policy: Timeouts and retries for the registry download
+        profile: Profile the registry is loaded for, if known
+        jobs: Shards fetched concurrently
 
     Returns:
         Parsed registry dict or None if failed
     """
+    source = fetch_registry(
+        registry_path, use_local, local_path, registry_url, cache, ttl, refresh, policy
+    )
+    if source is None:
+        return None
+
+    # Parse the registry
+    reg_data = _read_json(source)
+    shards = reg_data.get(SHARDS_KEY) if isinstance(reg_data, dict) else None
+    if not isinstance(shards, dict):
+        return reg_data
+
+    shard_data = load_shards(
+        shards,
+        shard_base(use_local, local_path, registry_url),
+        use_local,
+        registry_path.parent,
+        cache=cache,
+        policy=policy,
+        profile=profile,
+        jobs=jobs,
+    )
+    if shard_data is None:
+        return None
+    docs = [parse_registry_bytes(data) for data in shard_data]
+    if not all(isinstance(doc, dict) for doc in docs):
+        return None
+    return merge_shards(reg_data, docs)
+
+
+def fetch_registry(
+    registry_path: Path,
+    use_local: bool = False,
+    local_path: Optional[Path] = None,
+    registry_url: Optional[str] = None,
+    cache: Optional[DownloadCache] = None,
+    ttl: float = DEFAULT_REGISTRY_TTL,
+    refresh: bool = False,
+    policy: NetworkPolicy = DEFAULT_POLICY,
+) -> Optional[Path]:
+    """
+    Make the raw registry file available locally without parsing it.
+
+    Takes the same arguments as load_registry and returns the file to parse:
+    registry_path, or the cached blob when a fresh cached copy is used.
+    """
     if use_local:
         # Use local registry
         source_path = local_path or Path("registry.json")
         if not source_path.exists():
-            return None
+            compressed = source_path.with_name(source_path.name + ".gz")
+            if not compressed.exists():
+                return None
+            source_path = compressed
 
         # Copy to temp location
         shutil.copy(source_path, registry_path)
-    else:
-        # Fetch from remote URL
-        if not registry_url:
+        return registry_path
+
+    # Fetch from remote URL
+    if not registry_url:
+        return None
+
+    if cache and not refresh:
+        entry = cache.lookup(registry_url)
+        if entry and time.time() - entry.fetched_at < ttl:
+            return cache.blob_path(entry.sha256)
+
+    if not fetch_url(registry_url, registry_path, cache=cache, policy=policy):
+        return None
+    return registry_path
+
+
+def needed_shards(shards: Dict, profile: Optional[str] = None) -> List[Dict]:
+    """
+    Pick the shards of a sharded registry that a run needs.
+
+    A profile with its own shard needs only that shard, which holds the
+    profile's whole dependency closure. Anything else (no profile, as when
+    listing or choosing interactively, or a profile without a shard) needs
+    every per-type shard.
+    """
+    if profile:
+        entry = shards.get("profiles", {}).get(profile)
+        if entry:
+            return [entry]
+    return list(shards.get("types", {}).values())
+
+
+def shard_base(
+    use_local: bool, local_path: Optional[Path] = None, registry_url: Optional[str] = None
+) -> str:
+    """The manifest location that shard paths are relative to."""
+    if use_local:
+        return str(local_path or Path("registry.json"))
+    return registry_url or ""
+
+
+def load_shards(
+    shards: Dict,
+    base: str,
+    use_local: bool,
+    temp_dir: Path,
+    cache: Optional[DownloadCache] = None,
+    policy: NetworkPolicy = DEFAULT_POLICY,
+    profile: Optional[str] = None,
+    jobs: int = 1,
+) -> Optional[List[bytes]]:
+    """
+    Fetch the shards of a root manifest that ``profile`` needs.
+
+    Combines needed_shards and fetch_shards; see those for the details.
+    """
+    return fetch_shards(
+        needed_shards(shards, profile), base, use_local, temp_dir, cache, policy, jobs
+    )
+
+
+def fetch_shards(
+    entries: List[Dict],
+    base: str,
+    use_local: bool,
+    temp_dir: Path,
+    cache: Optional[DownloadCache] = None,
+    policy: NetworkPolicy = DEFAULT_POLICY,
+    jobs: int = 1,
+) -> Optional[List[bytes]]:
+    """
+    Fetch shard files concurrently and check them against the manifest.
+
+    Each manifest entry gives a shard's ``path``, relative to the manifest
+    (``base`` is the manifest's URL or local path), and its ``sha256``.
+    Shards are content-addressed, so one whose blob is already in the
+    download cache is used without any request.
+
+    Returns:
+        Each shard's bytes, in the order given, or None if any shard is
+        missing or doesn't match its hash
+    """
+
+    def fetch_one(entry: Dict) -> Optional[bytes]:
+        try:
+            path, sha256 = str(entry["path"]), str(entry["sha256"])
+        except (KeyError, TypeError):
+            return None
+        if not is_safe_relative_path(path):
             return None
 
-        if not fetch_url(registry_url, registry_path):
+        data = None
+        if cache and not use_local:
+            try:
+                data = cache.blob_path(sha256).read_bytes()
+            except OSError:
+                data = None
+        if data is None and use_local:
+            try:
+                data = (Path(base).parent / path).read_bytes()
+            except OSError:
+                return None
+        elif data is None:
+            dest = temp_dir / f"shard-{sha256}.json"
+            if not fetch_url(urljoin(base, path), dest, cache=cache, policy=policy):
+                return None
+            try:
+                data = dest.read_bytes()
+            except OSError:
+                return None
+        if hashlib.sha256(data).hexdigest() != sha256:
             return None
+        return data
 
-    # Parse the registry
+    if jobs <= 1 or len(entries) <= 1:
+        results = [fetch_one(entry) for entry in entries]
+    else:
+        with ThreadPoolExecutor(max_workers=min(jobs, len(entries))) as pool:
+            results = list(pool.map(fetch_one, entries))
+    if any(data is None for data in results):
+        return None
+    return results  # type: ignore[return-value]
+
+
+def merge_shards(manifest: Dict, shards: List[Dict]) -> Dict:
+    """
+    Combine a root manifest and its fetched shards into a single-file registry.
+
+    Component lists are concatenated per type in shard order, and the
+    shards' compiled closures and file records are merged into one
+    compiled section.
+    """
+    result = {key: value for key, value in manifest.items() if key != SHARDS_KEY}
+    components: Dict[str, List[Any]] = {}
+    compiled: Dict[str, Any] = {}
+    for shard in shards:
+        for key, entries in shard.get("components", {}).items():
+            components.setdefault(key, []).extend(entries)
+        shard_compiled = shard.get("compiled")
+        if isinstance(shard_compiled, dict):
+            compiled.setdefault("format", shard_compiled.get("format"))
+            for section in ("files", "profiles"):
+                compiled.setdefault(section, {}).update(shard_compiled.get(section, {}))
+    result["components"] = components
+    if compiled:
+        result["compiled"] = compiled
+    return result
+
+
+def _read_json(path: Path) -> Optional[Dict]:
+    try:
+        with open(path, "rb") as f:
+            return parse_registry_bytes(f.read())
+    except OSError:
+        return None
+
+
+def parse_registry_bytes(data: bytes) -> Optional[Dict]:
+    """Decode registry JSON, gzip-compressed or not; None if it is invalid."""
     try:
-        with open(registry_path, "r") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, OSError):
+        if data[:2] == GZIP_MAGIC:
+            data = gzip.decompress(data)
+        return json.loads(data)
+    except (json.JSONDecodeError, UnicodeDecodeError, OSError, EOFError, zlib.error):
         return None
 
 
-def parse_components(registry: Dict) -> Dict[ComponentType, List[Component]]:
-    """Parse components from registry into structured format."""
-    result = {}
+class RegistryIndex:
+    """
+    Hash lookups over parsed components, built once per registry.
 
-    for comp_type in ComponentType:
-        registry_key = get_registry_key(comp_type)
-        components_data = registry.get("components", {}).get(registry_key, [])
+    Components are keyed by their full ``type:id``, by registry path, and by
+    each tag and category. When an ID appears twice the first entry wins, as
+    it did with the linear scan this replaces.
 
-        components = []
-        for comp_data in components_data:
-            comp = Component.from_dict(comp_data, comp_type)
-            components.append(comp)
+    Every table is built on first use. Over a LazyComponentMap the ID table
+    holds only positions, read from the raw registry entries, so looking up
+    one component builds just that Component.
+    """
 
-        result[comp_type] = components
+    def __init__(self, components: Mapping[ComponentType, List[Component]]):
+        self._components = components
+        # Type value -> (type, short ID -> position in that type's list)
+        self._by_id: Optional[Dict[str, Tuple[ComponentType, Dict[str, int]]]] = None
+        self._by_path: Optional[Dict[str, List[Component]]] = None
+        self._by_tag: Optional[Dict[str, List[Component]]] = None
+        self._by_category: Optional[Dict[str, List[Component]]] = None
 
-    return result
+    def __len__(self) -> int:
+        return sum(len(positions) for _, positions in self._ids().values())
+
+    def __contains__(self, component_id: str) -> bool:
+        return self._locate(component_id) is not None
+
+    def get(self, component_id: str) -> Optional[Component]:
+        """Find a component by its full ID (type:id)."""
+        location = self._locate(component_id)
+        if location is None:
+            return None
+        comp_type, position = location
+        if isinstance(self._components, LazyComponentMap):
+            return self._components.component(comp_type, position)
+        return self._components[comp_type][position]
+
+    def by_path(self, path: str) -> List[Component]:
+        """Components installed from the given registry path."""
+        if self._by_path is None:
+            self._by_path = self._group(lambda comp: [comp.path] if comp.path else [])
+        return list(self._by_path.get(path, []))
+
+    def by_tag(self, tag: str) -> List[Component]:
+        if self._by_tag is None:
+            self._by_tag = self._group(lambda comp: comp.tags)
+        return list(self._by_tag.get(tag, []))
+
+    def by_category(self, category: str) -> List[Component]:
+        if self._by_category is None:
+            self._by_category = self._group(lambda comp: [comp.category])
+        return list(self._by_category.get(category, []))
+
+    def _locate(self, component_id: str) -> Optional[Tuple[ComponentType, int]]:
+        type_value, _, short_id = component_id.partition(":")
+        entry = self._ids().get(type_value)
+        if entry is None:
+            return None
+        comp_type, positions = entry
+        position = positions.get(short_id)
+        return None if position is None else (comp_type, position)
+
+    def _ids(self) -> Dict[str, Tuple[ComponentType, Dict[str, int]]]:
+        if self._by_id is None:
+            by_id = {}
+            for comp_type in self._components:
+                if isinstance(self._components, LazyComponentMap):
+                    ids = self._components.ids(comp_type)
+                else:
+                    ids = [comp.id for comp in self._components[comp_type]]
+                # Filled back to front so the first of any duplicates wins
+                positions = dict(zip(reversed(ids), range(len(ids) - 1, -1, -1)))
+                by_id[comp_type.value] = (comp_type, positions)
+            self._by_id = by_id
+        return self._by_id
+
+    def _group(
+        self, keys: Callable[[Component], Iterable[str]]
+    ) -> Dict[str, List[Component]]:
+        groups: Dict[str, List[Component]] = {}
+        for comps in self._components.values():
+            for comp in comps:
+                for key in keys(comp):
+                    groups.setdefault(key, []).append(comp)
+        return groups
+
+
+class LazyComponentMap(Mapping[ComponentType, List[Component]]):
+    """
+    Components grouped by type, built from registry entries on demand.
+
+    Holds each type's raw registry entries and turns one into a Component
+    the first time it is looked up through ``index`` or its type's list is
+    read, releasing the raw entry. A run that installs one profile builds
+    only the components in that profile's closure.
+    """
+
+    def __init__(self, entries: Mapping[ComponentType, List[Any]]):
+        self._entries: Dict[ComponentType, List[Any]] = {
+            comp_type: list(raw) for comp_type, raw in entries.items()
+        }
+        self._built: Dict[ComponentType, List[Optional[Component]]] = {
+            comp_type: [None] * len(raw) for comp_type, raw in self._entries.items()
+        }
+        self._lists: Dict[ComponentType, List[Component]] = {}
+        self.index = RegistryIndex(self)
+
+    def __getitem__(self, comp_type: ComponentType) -> List[Component]:
+        comps = self._lists.get(comp_type)
+        if comps is None:
+            if comp_type not in self._entries:
+                raise KeyError(comp_type)
+            count = len(self._entries[comp_type])
+            comps = [self.component(comp_type, position) for position in range(count)]
+            self._lists[comp_type] = comps
+        return comps
+
+    def __iter__(self) -> Iterator[ComponentType]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Snapshots store each unbuilt entry as its own JSON text, along with
+        # the finished ID table, so a snapshot hit decodes only the entries
+        # a run looks up instead of the whole registry
+        self.index._ids()
+        state = self.__dict__.copy()
+        with _BUILD_LOCK:
+            state["_entries"] = {
+                comp_type: [
+                    raw
+                    if raw is None or isinstance(raw, bytes)
+                    else json.dumps(raw, separators=(",", ":"), ensure_ascii=False).encode()
+                    for raw in entries
+                ]
+                for comp_type, entries in self._entries.items()
+            }
+        return state
+
+    def component(self, comp_type: ComponentType, position: int) -> Component:
+        """The Component at a position in its type's list, built if needed."""
+        built = self._built[comp_type]
+        comp = built[position]
+        if comp is None:
+            with _BUILD_LOCK:
+                comp = built[position]
+                if comp is None:
+                    raw = _decode_entry(self._entries[comp_type][position])
+                    comp = built[position] = Component.from_dict(raw, comp_type)
+                    self._entries[comp_type][position] = None
+        return comp
+
+    def ids(self, comp_type: ComponentType) -> List[str]:
+        """The short IDs of a type's components, without building them."""
+        with _BUILD_LOCK:
+            return [
+                comp.id if comp is not None else _decode_entry(raw).get("id", "")
+                for comp, raw in zip(self._built[comp_type], self._entries[comp_type])
+            ]
+
+
+def _decode_entry(raw: Any) -> Any:
+    """A raw registry entry, decoding the JSON text kept in snapshots."""
+    return json.loads(raw) if isinstance(raw, bytes) else raw
+
+
+def index_for(components: Mapping[ComponentType, List[Component]]) -> RegistryIndex:
+    """
+    Return the index of a parse_components result.
+
+    Dicts built by hand get a fresh index.
+    """
+    if isinstance(components, LazyComponentMap):
+        return components.index
+    return RegistryIndex(components)
+
+
+def parse_components(registry: Dict) -> LazyComponentMap:
+    """
+    Group the registry's components by type.
+
+    No Component is built here; see LazyComponentMap.
+    """
+    sections = registry.get("components", {})
+    return LazyComponentMap(
+        {
+            comp_type: sections.get(get_registry_key(comp_type), [])
+            for comp_type in ComponentType
+        }
+    )
 
 
 def parse_profiles(registry: Dict) -> Dict[str, Profile]:
@@ -83,15 +503,7 @@ def parse_profiles(registry: Dict) -> Dict[str, Profile]:
 
     profiles_data = registry.get("profiles", {})
     for profile_id, profile_data in profiles_data.items():
-        profile = Profile(
-            id=profile_id,
-            name=profile_data.get("name", profile_id),
-            description=profile_data.get("description", ""),
-            components=profile_data.get("components", []),
-            badge=profile_data.get("badge"),
-            additional_paths=profile_data.get("additionalPaths", []),
-        )
-        profiles[profile_id] = profile
+        profiles[profile_id] = Profile.from_dict(profile_id, profile_data)
 
     return profiles
 
@@ -100,35 +512,4 @@ def find_component(
     components: Dict[ComponentType, List[Component]], component_id: str
 ) -> Optional[Component]:
     """Find a component by its full ID (type:id)."""
-    if ":" not in component_id:
-        return None
-
-    type_str, comp_id = component_id.split(":", 1)
-
-    # Map type string to ComponentType
-    try:
-        if type_str == "agent":
-            comp_type = ComponentType.AGENT
-        elif type_str == "subagent":
-            comp_type = ComponentType.SUBAGENT
-        elif type_str == "command":
-            comp_type = ComponentType.COMMAND
-        elif type_str == "tool":
-            comp_type = ComponentType.TOOL
-        elif type_str == "plugin":
-            comp_type = ComponentType.PLUGIN
-        elif type_str == "context":
-            comp_type = ComponentType.CONTEXT
-        elif type_str == "config":
-            comp_type = ComponentType.CONFIG
-        else:
-            return None
-    except:
-        return None
-
-    # Find the component
-    for comp in components.get(comp_type, []):
-        if comp.id == comp_id:
-            return comp
-
-    return None
+    return index_for(components).get(component_id)
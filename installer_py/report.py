@@ -1,8 +1,17 @@
 """Installation report and post-install messaging."""
 
+from collections import defaultdict
 from typing import Optional, List
+from .network import FetchAttempt
 from .types import InstallResult
-from .console import print_success, print_step, print_info, colorize, Colors
+from .console import (
+    print_success,
+    print_step,
+    print_info,
+    print_warning,
+    colorize,
+    Colors,
+)
 
 
 def show_installation_summary(
@@ -13,12 +22,18 @@ def show_installation_summary(
 ) -> None:
     """Show installation summary with counts."""
     print()
-    print_success("Installation complete!")
+    if result.rolled_back:
+        print_warning(f"Installation rolled back; {install_dir} was left unchanged")
+    else:
+        print_success("Installation complete!")
     print(f"  Installed: {colorize(str(result.installed), Colors.GREEN)}")
 
     if result.skipped > 0:
         print(f"  Skipped: {colorize(str(result.skipped), Colors.CYAN)}")
 
+    if result.unchanged > 0:
+        print(f"  Unchanged: {colorize(str(result.unchanged), Colors.CYAN)}")
+
     if result.failed > 0:
         print(f"  Failed: {colorize(str(result.failed), Colors.RED)}")
 
@@ -26,6 +41,35 @@ def show_installation_summary(
         print(f"  Backup: {colorize(result.backup_dir, Colors.CYAN)}")
 
 
+def show_retry_summary(attempts: List[FetchAttempt], throttled: int = 0) -> None:
+    """Show per-attempt timing for downloads that needed more than one try."""
+    if throttled:
+        print()
+        print_warning(
+            f"Server rate-limited downloads {throttled} time(s); slowed down and retried"
+        )
+
+    by_url = defaultdict(list)
+    for attempt in attempts:
+        by_url[attempt.url].append(attempt)
+
+    retried = {url: tries for url, tries in by_url.items() if len(tries) > 1}
+    if not retried:
+        return
+
+    print()
+    print_warning(f"{len(retried)} download(s) needed retries:")
+    for url, tries in retried.items():
+        print(f"  {url}")
+        for attempt in sorted(tries, key=lambda a: a.attempt):
+            outcome = (
+                colorize("ok", Colors.GREEN)
+                if attempt.ok
+                else colorize(attempt.error or "failed", Colors.RED)
+            )
+            print(f"    attempt {attempt.attempt}: {attempt.elapsed:.2f}s {outcome}")
+
+
 def show_post_install(install_dir: str, repo_url: str) -> None:
     """Show post-installation instructions."""
     print()
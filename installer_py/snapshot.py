@@ -0,0 +1,253 @@
+"""Precompiled registry snapshots, so startup skips JSON parsing."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Mapping, Optional, Sequence
+
+from .compiler import CompiledRegistry, load_compiled
+from .deps import DependencyResolver, Resolution
+from .paths import atomic_replace
+from .registry import (
+    SHARDS_KEY,
+    LazyComponentMap,
+    merge_shards,
+    parse_components,
+    parse_profiles,
+    parse_registry_bytes,
+)
+from .types import Profile
+
+SNAPSHOT_VERSION = 8
+MAGIC = b"OCSNAP%02d" % SNAPSHOT_VERSION
+MAX_SNAPSHOTS = 4
+
+
+class ProfileClosures(Mapping[str, Resolution]):
+    """
+    Dependency closures of a registry's profiles, resolved on first access.
+
+    A closure comes from the registry's compiled section when that is still
+    current, and from a DependencyResolver otherwise; either way only the
+    profiles actually looked up cost anything.
+    """
+
+    def __init__(
+        self,
+        components: LazyComponentMap,
+        profiles: Dict[str, Profile],
+        compiled: Optional[CompiledRegistry] = None,
+    ):
+        self._components = components
+        self._profiles = profiles
+        self._compiled = compiled
+        self._resolved: Dict[str, Resolution] = {}
+        self._resolver: Optional[DependencyResolver] = None
+
+    def __getitem__(self, profile_id: str) -> Resolution:
+        resolution = self._resolved.get(profile_id)
+        if resolution is not None:
+            return resolution
+
+        profile = self._profiles[profile_id]
+        if self._compiled is not None:
+            resolution = self._compiled.closure(profile, self._components.index)
+        if resolution is None:
+            if self._resolver is None:
+                self._resolver = DependencyResolver(self._components)
+            resolution = self._resolver.resolve(profile.components)
+        self._resolved[profile_id] = resolution
+        return resolution
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._profiles)
+
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+
+@dataclass
+class ParsedRegistry:
+    """
+    Everything the installer derives from registry.json before installing.
+
+    Components, closures and compiled file records are all built lazily, so
+    parsing is proportional to what a run looks up rather than to the size
+    of the registry.
+
+    ``shards`` is set when the registry is a sharded root manifest whose
+    shards haven't been merged in yet; its components are then empty.
+    """
+
+    sha256: str
+    components: LazyComponentMap
+    profiles: Dict[str, Profile]
+    closures: Mapping[str, Resolution]
+    compiled: Optional[CompiledRegistry] = None
+    shards: Optional[Dict] = None
+
+    @classmethod
+    def from_registry(cls, reg_data: Dict, sha256: str) -> ParsedRegistry:
+        """Parse profiles and set up lazy components and closures."""
+        components = parse_components(reg_data)
+        profiles = parse_profiles(reg_data)
+        compiled = load_compiled(reg_data)
+        closures = ProfileClosures(components, profiles, compiled)
+        shards = reg_data.get(SHARDS_KEY)
+        if not isinstance(shards, dict):
+            shards = None
+        return cls(sha256, components, profiles, closures, compiled, shards)
+
+    def download_size(self, component_ids: Iterable[str]) -> Optional[int]:
+        """Total size of the components' files, or None if any is unknown."""
+        total = 0
+        for comp_id in component_ids:
+            comp = self.components.index.get(comp_id)
+            info = self.compiled.file(comp.path) if self.compiled and comp else None
+            if info is None:
+                return None
+            total += info.size
+        return total
+
+
+class SnapshotStore:
+    """
+    Pickled ParsedRegistry objects keyed by the sha256 of the registry bytes.
+
+    Layout::
+
+        <root>/<sha256>.snap   MAGIC, then the pickle
+
+    A snapshot is only ever used for byte-identical registry content, and
+    MAGIC carries SNAPSHOT_VERSION, which must be bumped whenever Component,
+    Profile or the index change shape; anything unreadable is treated as a
+    miss and rebuilt. Only the MAX_SNAPSHOTS most recently written files are
+    kept.
+
+    Unpickling runs code, and the cache directory may be shared (a CI cache,
+    a baked image), so a snapshot is only loaded if it is owned by the
+    current user and not writable by anyone else. Snapshots are written
+    with mode 0600.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def path_for(self, sha256: str) -> Path:
+        return self.root / f"{sha256}.snap"
+
+    def load(self, sha256: str) -> Optional[ParsedRegistry]:
+        try:
+            with open(self.path_for(sha256), "rb") as f:
+                if not _is_private(f.fileno()) or f.read(len(MAGIC)) != MAGIC:
+                    return None
+                parsed = pickle.load(f)
+        except OSError:
+            return None
+        except Exception:
+            # Stale class layouts surface as arbitrary unpickling errors
+            return None
+        if not isinstance(parsed, ParsedRegistry) or parsed.sha256 != sha256:
+            return None
+        return parsed
+
+    def save(self, parsed: ParsedRegistry) -> None:
+        with atomic_replace(self.path_for(parsed.sha256)) as tmp_path:
+            os.chmod(tmp_path, 0o600)
+            with open(tmp_path, "wb") as f:
+                f.write(MAGIC)
+                pickle.dump(parsed, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._prune()
+
+    def _prune(self) -> None:
+        snapshots = []
+        for path in self.root.glob("*.snap"):
+            try:
+                snapshots.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        snapshots.sort(reverse=True)
+        for _, path in snapshots[MAX_SNAPSHOTS:]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def _snapshot_key(data: bytes, shard_data: Sequence[bytes]) -> str:
+    digest = hashlib.sha256(data)
+    for shard in shard_data:
+        digest.update(hashlib.sha256(shard).digest())
+    return digest.hexdigest()
+
+
+def _is_private(fd: int) -> bool:
+    """Whether an open file belongs to the current user and only they can write it."""
+    if not hasattr(os, "getuid"):
+        # No POSIX ownership to check (Windows)
+        return True
+    info = os.fstat(fd)
+    return info.st_uid == os.getuid() and not info.st_mode & 0o022
+
+
+def load_parsed_registry(
+    data: bytes,
+    store: Optional[SnapshotStore] = None,
+    shard_data: Sequence[bytes] = (),
+    fetch_shards: Optional[Callable[[Dict], Optional[Sequence[bytes]]]] = None,
+) -> Optional[ParsedRegistry]:
+    """
+    Return the parsed form of raw registry bytes, from a snapshot if possible.
+
+    For a sharded registry, ``data`` is the root manifest and ``shard_data``
+    the shards fetched for this run, which are merged in; the snapshot is
+    keyed by the manifest and those shards together. When ``shard_data`` is
+    not given and ``data`` turns out to be a manifest, ``fetch_shards`` is
+    called with its shards entry to get them. On a snapshot miss the
+    registry is parsed and written back to the store once, merged; a store
+    that can't be written is ignored, and an unmerged manifest is never
+    stored.
+
+    Returns:
+        The ParsedRegistry, or None if the bytes are not a valid registry or
+        its shards couldn't be fetched
+    """
+    sha256 = _snapshot_key(data, shard_data)
+    if store:
+        parsed = store.load(sha256)
+        if parsed is not None:
+            return parsed
+
+    reg_data = parse_registry_bytes(data)
+    if not isinstance(reg_data, dict):
+        return None
+    shards = reg_data.get(SHARDS_KEY)
+    if not shard_data and isinstance(shards, dict):
+        if fetch_shards is None:
+            return ParsedRegistry.from_registry(reg_data, sha256)
+        fetched = fetch_shards(shards)
+        if fetched is None:
+            return None
+        shard_data = fetched
+        sha256 = _snapshot_key(data, shard_data)
+        if store:
+            parsed = store.load(sha256)
+            if parsed is not None:
+                return parsed
+    if shard_data:
+        docs = [parse_registry_bytes(shard) for shard in shard_data]
+        if not all(isinstance(doc, dict) for doc in docs):
+            return None
+        reg_data = merge_shards(reg_data, docs)
+    parsed = ParsedRegistry.from_registry(reg_data, sha256)
+
+    if store:
+        try:
+            store.save(parsed)
+        except (OSError, pickle.PicklingError):
+            pass
+    return parsed
@@ -0,0 +1,147 @@
+"""Staging directory that makes an install all-or-nothing."""
+
+from __future__ import annotations
+
+import errno
+import os
+import shutil
+from typing import List, Optional, Set, Tuple
+
+from .backup import copy_file
+from .fstree import FileTree
+from .paths import atomic_replace
+
+STAGING_SUFFIX = ".staging"
+UNDO_SUFFIX = ".undo"
+
+
+class CommitError(Exception):
+    """Moving staged files into place failed; the install was rolled back."""
+
+
+class StagingArea:
+    """
+    Files of one install, written next to the install directory first.
+
+    Components are fetched into <install_dir>.staging, mirroring the
+    install layout, and only moved into the install directory by commit()
+    once every one of them has been staged. A failed run leaves the install
+    directory untouched and its staged files in place, so the next run
+    only has to fetch what is missing or changed.
+
+    The staging directory is a sibling of the install directory, so
+    normally both are on the same filesystem and every move is an atomic
+    rename. When they aren't (the install directory is a mount point, or a
+    symlink onto another filesystem), each file is copied to a temporary
+    file inside its target directory and renamed into place from there.
+    """
+
+    def __init__(self, install_dir: str):
+        self.install_dir = os.path.normpath(install_dir)
+        self.root = self.install_dir + STAGING_SUFFIX
+        self.undo_root = self.install_dir + UNDO_SUFFIX
+        # A fresh install can be committed with a single directory rename
+        self.fresh = not os.path.lexists(self.install_dir)
+
+    def path_for(self, dest_path: str) -> str:
+        """Where the file bound for dest_path is staged."""
+        return os.path.join(self.root, os.path.relpath(dest_path, self.install_dir))
+
+    def commit(self, dest_paths: List[str], tree: Optional[FileTree] = None) -> None:
+        """
+        Move the staged files for dest_paths into the install directory.
+
+        A fresh install renames the whole staging directory into place.
+        Otherwise each file is moved with os.replace, after hard-linking
+        the file it replaces into <install_dir>.undo; if any move fails,
+        the files already moved are put back and the old ones restored.
+        Missing destination directories are created first, with ``tree``
+        (the snapshot of the install directory) when given.
+
+        Raises:
+            CommitError: if the commit failed and was rolled back
+        """
+        if self.fresh and not os.path.lexists(self.install_dir):
+            self._prune(dest_paths)
+            try:
+                os.rename(self.root, self.install_dir)
+                return
+            except OSError:
+                pass
+
+        if tree is None:
+            tree = FileTree.scan(dest_paths)
+        tree.make_dirs(dest_paths)
+
+        moved: List[Tuple[str, bool]] = []
+        try:
+            for dest_path in dest_paths:
+                had_old = self._save_old(dest_path)
+                _move(self.path_for(dest_path), dest_path)
+                moved.append((dest_path, had_old))
+        except OSError as e:
+            failures = self._roll_back(moved)
+            message = f"Failed to install {dest_path}: {e}; rolled back"
+            if failures:
+                message += f" ({len(failures)} file(s) could not be restored: {failures})"
+            raise CommitError(message) from e
+        self.discard()
+
+    def discard(self) -> None:
+        """Remove the staging and undo directories."""
+        shutil.rmtree(self.root, ignore_errors=True)
+        shutil.rmtree(self.undo_root, ignore_errors=True)
+
+    def _undo_path(self, dest_path: str) -> str:
+        return os.path.join(self.undo_root, os.path.relpath(dest_path, self.install_dir))
+
+    def _save_old(self, dest_path: str) -> bool:
+        """Keep the file dest_path is about to replace; False if there is none."""
+        if not os.path.lexists(dest_path):
+            return False
+        undo_path = self._undo_path(dest_path)
+        os.makedirs(os.path.dirname(undo_path), exist_ok=True)
+        if os.path.lexists(undo_path):
+            os.unlink(undo_path)
+        try:
+            os.link(dest_path, undo_path)
+        except OSError:
+            copy_file(dest_path, undo_path)
+        return True
+
+    def _roll_back(self, moved: List[Tuple[str, bool]]) -> List[str]:
+        """Undo the moves in reverse order; return paths that couldn't be."""
+        failures = []
+        for dest_path, had_old in reversed(moved):
+            try:
+                # Back to staging, so a rerun can still use it
+                _move(dest_path, self.path_for(dest_path))
+                if had_old:
+                    _move(self._undo_path(dest_path), dest_path)
+            except OSError:
+                failures.append(dest_path)
+        return failures
+
+    def _prune(self, dest_paths: List[str]) -> None:
+        """Delete anything in the staging directory not bound for dest_paths."""
+        wanted: Set[str] = {os.path.normpath(self.path_for(path)) for path in dest_paths}
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                if path not in wanted:
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+
+
+def _move(src: str, dst: str) -> None:
+    """os.replace, or an atomic copy into dst's directory across filesystems."""
+    try:
+        os.replace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        with atomic_replace(dst) as tmp_path:
+            copy_file(src, str(tmp_path))
+        os.unlink(src)
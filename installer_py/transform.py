@@ -1,7 +1,13 @@
 """Path transformation utilities for global installs."""
 
 import os
-import re
+from functools import lru_cache, partial
+from typing import Callable, Optional
+
+# Every reference rewritten for a global install. "@.opencode/context/"
+# is covered too, so one pass over the content does both rewrites.
+CONTEXT_PATH = ".opencode/context"
+_CONTEXT_PATH_BYTES = CONTEXT_PATH.encode("ascii")
 
 
 def transform_context_paths(content: str, install_dir: str) -> str:
@@ -11,22 +17,45 @@ def transform_context_paths(content: str, install_dir: str) -> str:
     Only transforms if installing to a non-local path.
     Local paths are .opencode or */.opencode
     """
-    # Check if this is a local install
-    normalized_dir = install_dir.replace("\\", "/")
-    if normalized_dir.endswith("/.opencode") or normalized_dir == ".opencode":
-        # Don't transform for local installs
+    # Don't transform for local installs
+    if not should_transform(install_dir):
         return content
+    return content.replace(CONTEXT_PATH, _replacement(install_dir))
 
-    # Expand tilde for transformations
-    expanded_path = os.path.expanduser(install_dir)
 
-    # Transform @.opencode/context/ to @{install_dir}/context/
-    content = re.sub(r"@\.opencode/context/", f"@{expanded_path}/context/", content)
+def transform_file_content(data: bytes, install_dir: str) -> bytes:
+    """
+    Apply transform_context_paths to a file's bytes.
 
-    # Transform .opencode/context to {install_dir}/context (without @)
-    content = re.sub(r"\.opencode/context", f"{expanded_path}/context", content)
+    Works on the bytes directly: the ASCII pattern can't match inside a
+    multi-byte UTF-8 sequence. Content without a match is returned as the
+    same object, after one substring search and no decoding. Files that
+    contain NUL bytes or aren't UTF-8 text are returned unchanged.
+    """
+    if _CONTEXT_PATH_BYTES not in data or not should_transform(install_dir):
+        return data
+    if b"\0" in data:
+        return data
+    try:
+        data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data
+    return data.replace(
+        _CONTEXT_PATH_BYTES, _replacement(install_dir).encode("utf-8")
+    )
 
-    return content
+
+def content_transform(install_dir: str) -> Optional[Callable[[bytes], bytes]]:
+    """The bytes transform to apply while writing files, or None if none is needed."""
+    if not should_transform(install_dir):
+        return None
+    return partial(transform_file_content, install_dir=install_dir)
+
+
+@lru_cache(maxsize=None)
+def _replacement(install_dir: str) -> str:
+    # Expand tilde for transformations
+    return f"{os.path.expanduser(install_dir)}/context"
 
 
 def should_transform(install_dir: str) -> bool:
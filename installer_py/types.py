@@ -2,14 +2,19 @@
 
 from __future__ import annotations
 
+import sys
 from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
-from typing import List, Optional, Dict, Any, TYPE_CHECKING
+from typing import Iterable, List, Optional, Dict, Any, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from .config import InstallerConfig
 
+# Registry records drop their per-instance __dict__ where dataclasses allow
+# it (slots=True needs Python 3.10+).
+_SLOTS: Dict[str, Any] = {"slots": True} if sys.version_info >= (3, 10) else {}
+
 
 class ComponentType(Enum):
     """Component types available in the registry."""
@@ -33,17 +38,23 @@ class CollisionStrategy(Enum):
     CANCEL = "cancel"
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class Component:
-    """Represents a component from the registry."""
+    """
+    Represents a component from the registry.
+
+    Registries hold thousands of these, so tags and dependencies are tuples
+    of interned strings: the same tag, category or dependency ID is stored
+    once however many components mention it.
+    """
 
     id: str
     name: str
     type: ComponentType
     path: str
     description: str = ""
-    tags: List[str] = field(default_factory=list)
-    dependencies: List[str] = field(default_factory=list)
+    tags: Tuple[str, ...] = ()
+    dependencies: Tuple[str, ...] = ()
     category: str = "standard"
 
     @staticmethod
@@ -55,22 +66,42 @@ class Component:
             type=comp_type,
             path=data.get("path", ""),
             description=data.get("description", ""),
-            tags=data.get("tags", []),
-            dependencies=data.get("dependencies", []),
-            category=data.get("category", "standard"),
+            tags=_interned(data.get("tags") or ()),
+            dependencies=_interned(data.get("dependencies") or ()),
+            category=_intern(data.get("category", "standard")),
         )
 
 
-@dataclass
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+def _interned(values: Iterable[Any]) -> Tuple[Any, ...]:
+    return tuple(map(_intern, values))
+
+
+@dataclass(**_SLOTS)
 class Profile:
     """Represents an installation profile."""
 
     id: str
     name: str
     description: str
-    components: List[str]
+    components: Tuple[str, ...]
     badge: Optional[str] = None
-    additional_paths: List[str] = field(default_factory=list)
+    additional_paths: Tuple[str, ...] = ()
+
+    @staticmethod
+    def from_dict(profile_id: str, data: Dict[str, Any]) -> "Profile":
+        """Create a Profile from dictionary data."""
+        return Profile(
+            id=profile_id,
+            name=data.get("name", profile_id),
+            description=data.get("description", ""),
+            components=_interned(data.get("components") or ()),
+            badge=data.get("badge"),
+            additional_paths=tuple(data.get("additionalPaths") or ()),
+        )
 
 
 @dataclass
@@ -80,6 +111,8 @@ class InstallResult:
     installed: int = 0
     skipped: int = 0
     failed: int = 0
+    unchanged: int = 0
+    rolled_back: bool = False
     backup_dir: Optional[str] = None
     errors: List[str] = field(default_factory=list)
 
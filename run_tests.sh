@@ -11,7 +11,16 @@ cd "$(dirname "$0")"
 # Run each test module
 python3 -m unittest tests_installer.test_config
 python3 -m unittest tests_installer.test_paths
+python3 -m unittest tests_installer.test_fstree
+python3 -m unittest tests_installer.test_backup
 python3 -m unittest tests_installer.test_registry
+python3 -m unittest tests_installer.test_deps
+python3 -m unittest tests_installer.test_install_ops
+python3 -m unittest tests_installer.test_transform
+python3 -m unittest tests_installer.test_network
+python3 -m unittest tests_installer.test_bundle
+python3 -m unittest tests_installer.test_snapshot
+python3 -m unittest tests_installer.test_compiler
 
 echo ""
 echo "All tests completed!"
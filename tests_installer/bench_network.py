@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-file urllib connections vs the pooled transport.
+
+Serves a profile-sized set of files from a local stub server that sleeps on
+every new connection to mimic a TCP+TLS handshake, then fetches them both
+ways and reports connection counts and wall time.
+
+Usage:
+    python3 -m tests_installer.bench_network [--files N] [--handshake-ms MS] [--jobs N]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from installer_py.network import ConnectionPool, fetch_url
+from tests_installer.stub_server import StubHandler, StubServer
+
+
+class SlowHandshakeHandler(StubHandler):
+    handshake_delay = 0.0
+
+    def setup(self):
+        time.sleep(self.handshake_delay)
+        super().setup()
+
+
+def fetch_with_urllib(url: str, dest: Path) -> bool:
+    with urllib.request.urlopen(url) as response:
+        dest.write_bytes(response.read())
+    return True
+
+
+def run(label, fetch, server, files, jobs, out_dir):
+    server.connections = server.requests = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        ok = list(
+            executor.map(lambda p: fetch(server.url + p, out_dir / p.lstrip("/")), files)
+        )
+    elapsed = time.perf_counter() - start
+    assert all(ok), f"{label}: some downloads failed"
+    print(
+        f"{label:<10} requests={server.requests:<4} connections={server.connections:<4} "
+        f"time={elapsed * 1000:.0f}ms"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=60)
+    parser.add_argument("--handshake-ms", type=float, default=30.0)
+    parser.add_argument("--jobs", type=int, default=1)
+    args = parser.parse_args()
+
+    files = {f"/context/file-{i}.md": b"x" * 4096 for i in range(args.files)}
+    SlowHandshakeHandler.handshake_delay = args.handshake_ms / 1000
+
+    with tempfile.TemporaryDirectory() as tmp, StubServer(
+        files, SlowHandshakeHandler
+    ) as server:
+        out_dir = Path(tmp)
+        (out_dir / "context").mkdir()
+        run("urllib", fetch_with_urllib, server, files, args.jobs, out_dir)
+
+        pool = ConnectionPool()
+        run(
+            "pooled",
+            lambda url, dest: fetch_url(url, dest, pool=pool),
+            server,
+            files,
+            args.jobs,
+            out_dir,
+        )
+        pool.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark: registry startup from JSON vs from a precompiled snapshot.
+
+Builds a synthetic registry (10k components by default, spread over every
+component type, each depending on a few earlier ones, plus a handful of
+profiles) and times what the installer does before showing anything:
+parsing registry.json and setting up the lazy component map and index.
+Compares a cold run against a snapshot hit, times a non-interactive
+profile run (parse, resolve one profile, build its components), and
+reports the memory the parsed registry keeps alive (tracemalloc).
+
+Usage:
+    python3 -m tests_installer.bench_registry [--components N] [--repeat N]
+"""
+
+import argparse
+import gc
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from installer_py.registry import get_registry_key
+from installer_py.snapshot import ParsedRegistry, SnapshotStore, load_parsed_registry
+from installer_py.types import ComponentType
+
+
+def synthetic_registry(count: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    types = list(ComponentType)
+    components = {get_registry_key(t): [] for t in types}
+    ids = []
+    for i in range(count):
+        comp_type = types[i % len(types)]
+        deps = rng.sample(ids, min(len(ids), 3))
+        components[get_registry_key(comp_type)].append(
+            {
+                "id": f"comp-{i}",
+                "name": f"Component {i}",
+                "path": f".opencode/{comp_type.value}/comp-{i}.md",
+                "description": "Synthetic component " * 4,
+                "tags": [f"tag-{i % 50}", "synthetic"],
+                "dependencies": deps,
+                "category": rng.choice(["essential", "standard", "extended"]),
+            }
+        )
+        ids.append(f"{comp_type.value}:comp-{i}")
+    profiles = {
+        f"profile-{p}": {
+            "name": f"Profile {p}",
+            "description": "Synthetic profile",
+            "components": rng.sample(ids, min(len(ids), 200)),
+        }
+        for p in range(5)
+    }
+    return {"version": "1.0.0", "components": components, "profiles": profiles}
+
+
+def best_of(repeat: int, fn) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def profile_run(data: bytes, store=None) -> None:
+    """What ``install.py <profile>`` needs before installing anything."""
+    parsed = load_parsed_registry(data, store)
+    for comp_id in parsed.closures["profile-0"].order:
+        parsed.components.index.get(comp_id)
+
+
+def retained_memory(data: bytes) -> int:
+    """Bytes still allocated once the raw JSON dict has been dropped."""
+    gc.collect()
+    tracemalloc.start()
+    reg_data = json.loads(data)
+    parsed = ParsedRegistry.from_registry(reg_data, "")
+    del reg_data
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del parsed
+    return current
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--components", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data = json.dumps(synthetic_registry(args.components)).encode()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SnapshotStore(Path(tmp))
+        cold = best_of(args.repeat, lambda: load_parsed_registry(data, None))
+        load_parsed_registry(data, store)
+        warm = best_of(args.repeat, lambda: load_parsed_registry(data, store))
+        snapshot_size = sum(p.stat().st_size for p in Path(tmp).glob("*.snap"))
+        profile_warm = best_of(args.repeat, lambda: profile_run(data, store))
+    profile_cold = best_of(args.repeat, lambda: profile_run(data))
+
+    print(f"registry   components={args.components} json={len(data) / 1024:.0f}KB")
+    print(f"parse      time={cold * 1000:.1f}ms")
+    print(f"snapshot   time={warm * 1000:.1f}ms size={snapshot_size / 1024:.0f}KB")
+    print(f"profile    cold={profile_cold * 1000:.1f}ms snapshot={profile_warm * 1000:.1f}ms")
+    print(f"memory     retained={retained_memory(data) / 1024:.0f}KB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""Local HTTP server standing in for raw.githubusercontent.com in tests."""
+
+import gzip
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serve ``server.files`` over keep-alive HTTP/1.1."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.paths.append(self.path)
+            injected = self.server.inject.get(self.path)
+            status = injected.pop(0) if injected else None
+        if status is not None:
+            self.send_response(status)
+            if self.server.retry_after is not None:
+                self.send_header("Retry-After", str(self.server.retry_after))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = self.server.files.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        encoding = None
+        if self.server.compress and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            encoding = "gzip"
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+        if self.headers.get("If-None-Match") == etag:
+            with self.server.lock:
+                self.server.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        start = self._range_start(body, etag) if encoding is None else None
+        if start is None:
+            self.send_response(200)
+        else:
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+            body = body[start:]
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        elif self.server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        with self.server.lock:
+            truncate = self.server.truncate.get(self.path, 0)
+            if truncate:
+                self.server.truncate[self.path] = truncate - 1
+        if truncate:
+            body = body[: len(body) // 2]
+            self.close_connection = True
+        self.wfile.write(body)
+        with self.server.lock:
+            self.server.bytes_sent += len(body)
+
+    def _range_start(self, body: bytes, etag: str) -> Optional[int]:
+        """Honour ``Range: bytes=N-`` (and If-Range) when ranges are enabled."""
+        value = self.headers.get("Range")
+        if not self.server.ranges or not value:
+            return None
+        with self.server.lock:
+            self.server.range_requests.append(value)
+        if self.headers.get("If-Range", etag) != etag:
+            return None
+        start = value.partition("=")[2].partition("-")[0]
+        if not value.startswith("bytes=") or not start.isdigit() or int(start) >= len(body):
+            return None
+        return int(start)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TruncatingHandler(StubHandler):
+    """Announce the full body but drop the connection halfway through it."""
+
+    def do_GET(self):
+        body = self.server.files[self.path]
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body[: len(body) // 2])
+        self.close_connection = True
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server that counts connections and requests.
+
+    ``paths`` logs every requested path in arrival order.
+    ``inject`` maps a path to a list of error statuses answered (and
+    consumed) before the real file is served. With ``compress`` set, bodies
+    are gzip-encoded for clients that accept it. ``ranges`` enables
+    ``Range`` requests, and ``truncate`` maps a path to how many of its next
+    responses are cut off halfway.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, files: Dict[str, bytes], handler=StubHandler):
+        super().__init__(("127.0.0.1", 0), handler)
+        self.files = files
+        self.connections = 0
+        self.requests = 0
+        self.paths: List[str] = []
+        self.not_modified = 0
+        self.inject: Dict[str, List[int]] = {}
+        self.retry_after = None
+        self.compress = False
+        self.bytes_sent = 0
+        self.ranges = True
+        self.range_requests: List[str] = []
+        self.truncate: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,170 @@
+"""Tests for backing up files before they are overwritten."""
+
+import os
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+import unittest
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from installer_py import backup
+from installer_py.backup import BackupStore, copy_file
+from installer_py.collisions import create_backup
+
+
+class TestCopyFile(unittest.TestCase):
+    """Test the reflink / copy_file_range / plain copy chain."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "src.md")
+        self.dst = os.path.join(self.tmp.name, "dst.md")
+        with open(self.src, "wb") as f:
+            f.write(b"context\n" * 10000)
+        os.utime(self.src, ns=(1_000_000_000, 1_000_000_000))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _check_copy(self):
+        with open(self.dst, "rb") as f:
+            self.assertEqual(f.read(), b"context\n" * 10000)
+        self.assertEqual(os.stat(self.dst).st_mtime_ns, 1_000_000_000)
+
+    def test_copy_keeps_content_and_mtime(self):
+        """Test whichever method the filesystem supports gives a full copy."""
+        self.assertIn(copy_file(self.src, self.dst), ("reflink", "copy_file_range", "copy"))
+        self._check_copy()
+
+    def test_fallback_copy(self):
+        """Test the plain copy is used when the kernel can't help."""
+        with mock.patch.object(backup, "_clone", return_value=None):
+            self.assertEqual(copy_file(self.src, self.dst), "copy")
+        self._check_copy()
+
+
+class TestBackupStore(unittest.TestCase):
+    """Test content-addressed snapshots, restore and retention."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.install_dir = os.path.join(self.tmp.name, ".opencode")
+        self.store = BackupStore.for_install_dir(self.install_dir)
+        self.files = []
+        for i in range(8):
+            path = os.path.join(self.install_dir, "context", f"ctx-{i}.md")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(f"# Context {i}\n")
+            self.files.append(path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def blobs(self):
+        return sorted(p.name for p in (self.store.root / "blobs").glob("*/*"))
+
+    def test_identical_content_is_stored_once(self):
+        """Test a second snapshot only adds the content that changed."""
+        first, failed = self.store.snapshot(self.files, self.install_dir, 4, datetime(2026, 1, 1))
+        self.assertEqual((first, failed), ("20260101-000000", []))
+        self.assertEqual(len(self.blobs()), 8)
+
+        with open(self.files[0], "w") as f:
+            f.write("# Edited\n")
+        second, _ = self.store.snapshot(self.files, self.install_dir, 4, datetime(2026, 1, 1))
+
+        self.assertEqual(second, "20260101-000000-2")
+        self.assertEqual(self.store.snapshots(), [second, first])
+        self.assertEqual(len(self.blobs()), 9)
+        manifest = self.store.load(second)
+        self.assertEqual(sorted(manifest["files"]), [f"context/ctx-{i}.md" for i in range(8)])
+
+    def test_restore(self):
+        """Test restoring brings back content, mode and mtime."""
+        os.chmod(self.files[1], 0o600)
+        os.utime(self.files[1], ns=(1_000_000_000, 1_000_000_000))
+        snapshot_id, _ = self.store.snapshot(self.files, self.install_dir)
+        with open(self.files[1], "w") as f:
+            f.write("# Broken\n")
+        os.remove(self.files[2])
+
+        self.assertEqual(self.store.restore(snapshot_id, self.install_dir, jobs=4), (8, []))
+
+        with open(self.files[1]) as f:
+            self.assertEqual(f.read(), "# Context 1\n")
+        info = os.stat(self.files[1])
+        self.assertEqual((info.st_mode & 0o777, info.st_mtime_ns), (0o600, 1_000_000_000))
+        self.assertTrue(os.path.exists(self.files[2]))
+        with self.assertRaises(KeyError):
+            self.store.restore("19990101-000000", self.install_dir)
+        self.assertIsNone(self.store.load("../../etc/passwd"))
+
+    def test_retention(self):
+        """Test keep-N and keep-for-D-days pruning, and unused blobs going away."""
+        for day in range(1, 6):
+            with open(self.files[0], "w") as f:
+                f.write(f"# Day {day}\n")
+            self.store.snapshot(self.files[:1], self.install_dir, when=datetime(2026, 1, day))
+
+        removed = self.store.prune(keep=2, max_age_days=2, now=datetime(2026, 1, 5))
+        self.assertEqual(removed, ["20260102-000000", "20260101-000000"])
+        self.assertEqual(len(self.blobs()), 3)
+
+        self.assertEqual(self.store.prune(keep=0, now=datetime(2026, 2, 1)), [])
+        self.store.prune(keep=0, max_age_days=2, now=datetime(2026, 2, 1))
+        self.assertEqual(self.store.snapshots(), ["20260105-000000"])
+        self.assertEqual(len(self.blobs()), 1)
+
+    def test_same_second_snapshots_sort_numerically(self):
+        """Test a -10 suffix is newer than -2, so pruning keeps the right one."""
+        for _ in range(11):
+            self.store.snapshot(self.files[:1], self.install_dir, when=datetime(2026, 1, 1))
+
+        self.assertEqual(
+            self.store.snapshots()[:3],
+            ["20260101-000000-11", "20260101-000000-10", "20260101-000000-9"],
+        )
+        self.assertEqual(self.store.snapshots()[-1], "20260101-000000")
+        self.assertEqual(self.store.prune(keep=0), [])
+        self.store.prune(keep=1)
+        self.assertEqual(self.store.snapshots(), ["20260101-000000-11"])
+
+    def test_new_blobs_survive_collection(self):
+        """Test a blob stored after collection began isn't taken for garbage."""
+        self.store.snapshot(self.files[:2], self.install_dir, when=datetime(2026, 1, 1))
+        with open(self.files[0], "w") as f:
+            f.write("# Edited\n")
+        self.store.snapshot(self.files[:1], self.install_dir, when=datetime(2026, 1, 2))
+        # A concurrent snapshot's blob, not yet listed in any manifest
+        stray = self.store.blob_path("ab" * 32)
+        stray.parent.mkdir(exist_ok=True)
+        stray.write_bytes(b"in flight")
+        os.utime(stray, (2e9, 2e9))
+
+        self.store.prune(keep=1)
+
+        self.assertTrue(stray.exists())
+        self.assertEqual(len(self.blobs()), 2)
+
+    def test_create_backup(self):
+        """Test create_backup snapshots existing files and applies retention."""
+        missing = os.path.join(self.install_dir, "context", "gone.md")
+        first = create_backup(self.files + [missing], self.install_dir, jobs=4)
+        self.assertNotIn("context/gone.md", self.store.load(first)["files"])
+
+        with open(self.files[0], "w") as f:
+            f.write("# Edited\n")
+        self.store.manifest_path(first).rename(self.store.manifest_path("20000101-000000"))
+        second = create_backup(self.files, self.install_dir, keep=1)
+
+        self.assertEqual(self.store.snapshots(), [second])
+        self.assertEqual(len(self.blobs()), 8)
+        self.assertIsNone(create_backup([missing], self.install_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+"""Tests for offline pack files."""
+
+import contextlib
+import io
+import sys
+import tempfile
+from pathlib import Path
+import unittest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from installer_py.bundle import Bundle, BundleError, write_bundle
+from installer_py.install_ops import install_components
+from installer_py.registry import parse_components
+from installer_py.types import CollisionStrategy
+from tests_installer.test_install_ops import make_registry
+
+
+class TestBundle(unittest.TestCase):
+    """Test building and reading pack files."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.source = self.root / "repo"
+        self.registry = make_registry(5)
+        for i, comp in enumerate(self.registry["components"]["contexts"]):
+            path = self.source / comp["path"]
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(f"# Context {i}\n".encode() * (i + 1))
+        self.pack_path = self.root / "agentic.ocp"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        """Test every member and the registry read back unchanged."""
+        count, missing = write_bundle(self.pack_path, self.registry, self.source)
+        self.assertEqual((count, missing), (5, []))
+
+        with Bundle(self.pack_path) as pack:
+            self.assertEqual(pack.registry(), self.registry)
+            for comp in self.registry["components"]["contexts"]:
+                self.assertEqual(
+                    pack.read(comp["path"]), (self.source / comp["path"]).read_bytes()
+                )
+
+    def test_missing_files_are_reported(self):
+        """Test registry paths without a source file are left out and listed."""
+        (self.source / ".opencode/context/ctx-3.md").unlink()
+        count, missing = write_bundle(self.pack_path, self.registry, self.source)
+
+        self.assertEqual((count, missing), (4, [".opencode/context/ctx-3.md"]))
+        with Bundle(self.pack_path) as pack:
+            self.assertNotIn(".opencode/context/ctx-3.md", pack)
+
+    def test_corrupt_member_is_rejected(self):
+        """Test extract refuses a member whose bytes don't match the index."""
+        write_bundle(self.pack_path, self.registry, self.source)
+        data = bytearray(self.pack_path.read_bytes())
+        data[-1] ^= 0xFF
+        self.pack_path.write_bytes(bytes(data))
+
+        dest = self.root / "out" / "ctx-4.md"
+        with Bundle(self.pack_path) as pack:
+            with self.assertRaises(BundleError):
+                pack.extract(".opencode/context/ctx-4.md", dest)
+        self.assertFalse(dest.exists())
+
+    def test_not_a_bundle(self):
+        """Test empty and foreign files raise BundleError."""
+        for content in (b"", b'{"components": {}}'):
+            self.pack_path.write_bytes(content)
+            with self.assertRaises(BundleError):
+                Bundle(self.pack_path)
+
+    def test_install_from_bundle(self):
+        """Test install_components reads components from the pack only."""
+        write_bundle(self.pack_path, self.registry, self.source)
+        install_dir = self.root / "project" / ".opencode"
+        ids = [f"context:ctx-{i}" for i in range(5)]
+
+        with Bundle(self.pack_path) as pack, contextlib.redirect_stdout(io.StringIO()):
+            result = install_components(
+                ids,
+                parse_components(pack.registry()),
+                str(install_dir),
+                "https://example.invalid",
+                False,
+                Path.cwd(),
+                CollisionStrategy.OVERWRITE,
+                jobs=3,
+                bundle=pack,
+            )
+
+        self.assertEqual(result.installed, 5)
+        self.assertEqual(result.failed, 0)
+        for i in range(5):
+            self.assertEqual(
+                (install_dir / "context" / f"ctx-{i}.md").read_bytes(),
+                f"# Context {i}\n".encode() * (i + 1),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,319 @@
+"""Tests for the registry compiler."""
+
+import copy
+import hashlib
+import json
+import sys
+import tempfile
+from pathlib import Path
+import unittest
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from installer_py import snapshot
+from installer_py.cache import DownloadCache
+from installer_py.compiler import (
+    COMPILED_KEY,
+    compile_registry,
+    load_compiled,
+    suggest_paths,
+    write_registry,
+    write_shards,
+)
+from installer_py.registry import load_registry, load_shards, needed_shards
+from installer_py.snapshot import ParsedRegistry, SnapshotStore, load_parsed_registry
+from tests_installer.stub_server import StubServer
+from tests_installer.test_registry import TEST_REGISTRY
+
+
+def _write_sources(registry, root):
+    """Create a placeholder file for every component in a registry."""
+    for entries in registry["components"].values():
+        for comp in entries:
+            path = root / comp["path"]
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f"# {comp['name']}\n")
+
+
+class TestCompileRegistry(unittest.TestCase):
+    """Test building and reading the compiled section."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.registry = copy.deepcopy(TEST_REGISTRY)
+        _write_sources(self.registry, self.root)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _compiled(self):
+        """A compiled copy of the registry that tests can edit freely."""
+        return copy.deepcopy(compile_registry(self.registry, self.root)[0])
+
+    def test_compiled_section(self):
+        """Test closures, sizes, hashes and the path index are recorded."""
+        compiled, report = compile_registry(self.registry, self.root)
+
+        self.assertTrue(report.ok)
+        self.assertEqual(report.checked, 3)
+        section = compiled[COMPILED_KEY]
+        self.assertEqual(
+            section["profiles"]["test"]["order"],
+            ["subagent:helper", "agent:test-agent", "config:env-example"],
+        )
+        content = b"# Test Agent\n"
+        self.assertEqual(
+            section["files"][".opencode/agent/test-agent.md"],
+            {
+                "size": len(content),
+                "sha256": hashlib.sha256(content).hexdigest(),
+                "components": ["agent:test-agent"],
+            },
+        )
+        # The source registry is left untouched
+        self.assertNotIn(COMPILED_KEY, self.registry)
+
+    def test_rebuild_is_idempotent(self):
+        """Test compiling a compiled registry changes nothing, not even the date."""
+        compiled, _ = compile_registry(self.registry, self.root)
+        compiled["metadata"] = {"lastUpdated": "2000-01-01"}
+        again, _ = compile_registry(compiled, self.root)
+
+        self.assertEqual(again, compiled)
+
+    def test_problems_are_reported(self):
+        """Test missing files, unknown dependencies and cycles make it fail."""
+        (self.root / "env.example").unlink()
+        agent = self.registry["components"]["agents"][0]
+        agent["dependencies"] = ["subagent:helper", "tool:gone"]
+        self.registry["components"]["subagents"][0]["dependencies"] = ["agent:test-agent"]
+
+        _, report = compile_registry(self.registry, self.root)
+
+        self.assertFalse(report.ok)
+        self.assertEqual(report.missing_files, [("config:env-example", "env.example")])
+        self.assertEqual(report.missing_deps, [("test", "agent:test-agent", "tool:gone")])
+        self.assertEqual(
+            report.cycles, [("agent:test-agent", "subagent:helper", "agent:test-agent")]
+        )
+
+    def test_orphans_and_suggestions(self):
+        """Test unregistered files are listed and near matches suggested."""
+        extra = self.root / ".opencode/agent/subagents/helper-v2.md"
+        extra.write_text("# Helper v2\n")
+        (self.root / ".opencode/agent/node_modules").mkdir()
+        (self.root / ".opencode/agent/node_modules/dep.md").write_text("")
+
+        _, report = compile_registry(self.registry, self.root, scan_orphans=True)
+
+        self.assertEqual(report.orphans, [".opencode/agent/subagents/helper-v2.md"])
+        self.assertEqual(
+            suggest_paths(self.root, ".opencode/agent/subagents/helpr.md", "subagent:helper"),
+            [".opencode/agent/subagents/helper-v2.md", ".opencode/agent/subagents/helper.md"],
+        )
+
+    def test_installer_uses_compiled_closures(self):
+        """Test a compiled registry's closures are read without running the resolver."""
+        compiled, _ = compile_registry(self.registry, self.root)
+        output = self.root / "registry.json"
+        write_registry(output, compiled)
+        reg_data = json.loads(output.read_text())
+
+        with mock.patch.object(snapshot, "DependencyResolver") as resolver:
+            parsed = ParsedRegistry.from_registry(reg_data, "")
+            closure = parsed.closures["test"]
+
+        resolver.assert_not_called()
+        self.assertEqual(closure, ParsedRegistry.from_registry(self.registry, "").closures["test"])
+        self.assertEqual(
+            parsed.download_size(closure.order),
+            sum(entry["size"] for entry in compiled[COMPILED_KEY]["files"].values()),
+        )
+
+    def test_stale_closure_is_ignored(self):
+        """Test edits made after compiling fall back to resolving."""
+        compiled = self._compiled()
+        compiled["profiles"]["test"]["components"].remove("config:env-example")
+        self.assertEqual(
+            ParsedRegistry.from_registry(compiled, "").closures["test"].order,
+            ["subagent:helper", "agent:test-agent"],
+        )
+
+        compiled = self._compiled()
+        compiled["components"]["agents"][0]["dependencies"] = []
+        self.assertEqual(
+            ParsedRegistry.from_registry(compiled, "").closures["test"].order,
+            ["agent:test-agent", "config:env-example"],
+        )
+
+    def test_added_missing_dependency_is_noticed(self):
+        """Test a closure that recorded an unknown ID is rejected once it exists."""
+        self.registry["components"]["agents"][0]["dependencies"].append("tool:later")
+        compiled = self._compiled()
+        self.assertEqual(
+            compiled[COMPILED_KEY]["profiles"]["test"]["missing"],
+            [["agent:test-agent", "tool:later"]],
+        )
+
+        compiled["components"]["tools"] = [{"id": "later", "name": "Later", "path": "t.ts"}]
+        closure = ParsedRegistry.from_registry(compiled, "").closures["test"]
+        self.assertEqual(closure.missing, [])
+        self.assertIn("tool:later", closure.order)
+
+    def test_malformed_section_is_ignored(self):
+        """Test a compiled section of the wrong shape is not trusted."""
+        compiled = self._compiled()
+        compiled[COMPILED_KEY]["profiles"]["test"] = {"order": 3}
+        compiled[COMPILED_KEY]["files"]["env.example"] = {"size": "big"}
+        parsed = ParsedRegistry.from_registry(compiled, "")
+        self.assertEqual(len(parsed.closures["test"].order), 3)
+        self.assertIsNone(parsed.download_size(["config:env-example"]))
+
+        compiled[COMPILED_KEY] = {"format": 1}
+        self.assertIsNone(load_compiled(compiled))
+
+
+class TestShardedRegistry(unittest.TestCase):
+    """Test writing a sharded registry and loading only the shards a run needs."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.registry = copy.deepcopy(TEST_REGISTRY)
+        self.registry["components"]["tools"] = [
+            {"id": "extra", "name": "Extra", "path": "tools/extra.ts", "dependencies": []}
+        ]
+        _write_sources(self.registry, self.root)
+        self.compiled, _ = compile_registry(self.registry, self.root)
+        self.manifest = write_shards(self.compiled, self.root / "shards")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _files(self):
+        shard_dir = self.manifest.parent
+        return {
+            "/" + path.relative_to(shard_dir).as_posix(): path.read_bytes()
+            for path in shard_dir.rglob("*.json")
+        }
+
+    def test_manifest_layout(self):
+        """Test the manifest lists shards and carries no components."""
+        manifest = json.loads(self.manifest.read_text())
+
+        self.assertNotIn("components", manifest)
+        self.assertNotIn(COMPILED_KEY, manifest)
+        self.assertEqual(manifest["profiles"], self.registry["profiles"])
+        shards = manifest["shards"]
+        self.assertEqual(sorted(shards["types"]), ["agents", "config", "subagents", "tools"])
+        self.assertEqual(needed_shards(shards, "test"), [shards["profiles"]["test"]])
+        self.assertEqual(len(needed_shards(shards)), 4)
+
+    def test_local_profile_loads_its_closure(self):
+        """Test a profile gets exactly its closure, with the compiled data."""
+        reg_data = load_registry(
+            self.root / "registry.json",
+            use_local=True,
+            local_path=self.manifest,
+            profile="test",
+        )
+        parsed = ParsedRegistry.from_registry(reg_data, "")
+
+        self.assertNotIn("tools", reg_data["components"])
+        with mock.patch.object(snapshot, "DependencyResolver") as resolver:
+            closure = parsed.closures["test"]
+        resolver.assert_not_called()
+        self.assertEqual(
+            closure.order, ["subagent:helper", "agent:test-agent", "config:env-example"]
+        )
+        self.assertIsNotNone(parsed.download_size(closure.order))
+
+    def test_local_without_profile_loads_everything(self):
+        """Test listing components merges every per-type shard."""
+        reg_data = load_registry(
+            self.root / "registry.json", use_local=True, local_path=self.manifest, jobs=4
+        )
+        full = {
+            key: entries for key, entries in self.registry["components"].items() if entries
+        }
+
+        self.assertEqual(reg_data["components"], full)
+        self.assertEqual(reg_data[COMPILED_KEY]["files"], self.compiled[COMPILED_KEY]["files"])
+
+    def test_remote_fetches_only_needed_shards(self):
+        """Test a profile install fetches the manifest and one shard, then uses the cache."""
+        cache = DownloadCache(self.root / "cache")
+        with StubServer(self._files()) as server:
+
+            def load():
+                return load_registry(
+                    self.root / "registry.json",
+                    registry_url=server.url + "/manifest.json",
+                    cache=cache,
+                    ttl=60,
+                    profile="test",
+                )
+
+            self.assertIn("agents", load()["components"])
+            self.assertEqual(server.paths, ["/manifest.json", "/profiles/test.json"])
+            self.assertIsNotNone(load())
+
+        self.assertEqual(server.requests, 2)
+
+    def test_corrupt_shard_is_rejected(self):
+        """Test a shard that doesn't match the manifest's hash fails the load."""
+        shard = self.manifest.parent / "profiles" / "test.json"
+        shard.write_bytes(shard.read_bytes().replace(b"Helper", b"Helpr"))
+
+        self.assertIsNone(
+            load_registry(
+                self.root / "registry.json",
+                use_local=True,
+                local_path=self.manifest,
+                profile="test",
+            )
+        )
+
+    def test_snapshot_is_keyed_by_shards(self):
+        """Test a snapshot of a merged registry depends on the shards used."""
+        store = SnapshotStore(self.root / "snapshots")
+        data = self.manifest.read_bytes()
+        files = self._files()
+        profile_shard = [files["/profiles/test.json"]]
+        type_shards = [files["/types/agents.json"], files["/types/tools.json"]]
+
+        manifest = load_parsed_registry(data, store)
+        self.assertIsNotNone(manifest.shards)
+        self.assertEqual(len(manifest.components.index), 0)
+        self.assertEqual(list(store.root.glob("*.snap")), [])
+
+        parsed = load_parsed_registry(data, store, profile_shard)
+        self.assertIsNone(parsed.shards)
+        self.assertEqual(load_parsed_registry(data, store, profile_shard).sha256, parsed.sha256)
+        other = load_parsed_registry(data, store, type_shards)
+        self.assertNotEqual(other.sha256, parsed.sha256)
+        self.assertIn("tool:extra", other.components.index)
+        self.assertNotIn("tool:extra", parsed.components.index)
+
+    def test_sharded_snapshot_written_once(self):
+        """Test a sharded registry stores one snapshot, of the merged registry."""
+        store = SnapshotStore(self.root / "snapshots")
+        data = self.manifest.read_bytes()
+
+        def fetch(shards):
+            return load_shards(shards, str(self.manifest), True, self.root, profile="test")
+
+        parsed = load_parsed_registry(data, store, fetch_shards=fetch)
+        self.assertIn("agent:test-agent", parsed.components.index)
+        self.assertEqual(list(store.root.glob("*.snap")), [store.path_for(parsed.sha256)])
+        with mock.patch.object(snapshot, "merge_shards") as merge:
+            again = load_parsed_registry(data, store, fetch_shards=fetch)
+        merge.assert_not_called()
+        self.assertEqual(again.sha256, parsed.sha256)
+        self.assertIsNone(load_parsed_registry(data, store, fetch_shards=lambda shards: None))
+
+
+if __name__ == "__main__":
+    unittest.main()
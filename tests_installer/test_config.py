@@ -22,6 +22,9 @@ class TestConfigPrecedence(unittest.TestCase):
             "OPENCODE_REPO",
             "OPENCODE_RAW_URL",
             "OPENCODE_REGISTRY_URL",
+            "OPENCODE_JOBS",
+            "OPENCODE_CACHE_DIR",
+            "OPENCODE_CACHE_MAX_MB",
         ]
         for var in env_vars:
             if var in os.environ:
@@ -95,6 +98,35 @@ class TestConfigPrecedence(unittest.TestCase):
         cfg = build_config(raw_url=custom_url)
         self.assertEqual(cfg.raw_url, custom_url)
 
+    def test_default_jobs(self):
+        """Test default download concurrency."""
+        cfg = build_config()
+        self.assertEqual(cfg.jobs, 8)
+
+    def test_env_jobs_override(self):
+        """Test OPENCODE_JOBS overrides default concurrency."""
+        os.environ["OPENCODE_JOBS"] = "3"
+        cfg = build_config()
+        self.assertEqual(cfg.jobs, 3)
+
+    def test_arg_jobs_override(self):
+        """Test argument overrides OPENCODE_JOBS."""
+        os.environ["OPENCODE_JOBS"] = "3"
+        cfg = build_config(jobs=1)
+        self.assertEqual(cfg.jobs, 1)
+
+    def test_cache_dir_env_override(self):
+        """Test OPENCODE_CACHE_DIR relocates the download cache."""
+        os.environ["OPENCODE_CACHE_DIR"] = "/tmp/oc-cache"
+        cfg = build_config()
+        self.assertEqual(str(cfg.cache_dir), "/tmp/oc-cache")
+
+    def test_cache_disabled(self):
+        """Test cache can be disabled by argument or empty env var."""
+        self.assertIsNone(build_config(use_cache=False).cache_dir)
+        os.environ["OPENCODE_CACHE_DIR"] = ""
+        self.assertIsNone(build_config().cache_dir)
+
 
 if __name__ == "__main__":
     unittest.main()
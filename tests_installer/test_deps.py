@@ -0,0 +1,138 @@
+"""Tests for dependency resolution."""
+
+import sys
+import time
+from pathlib import Path
+import unittest
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from installer_py.deps import DependencyResolver, resolve_dependencies
+from installer_py.registry import parse_components
+
+
+def make_graph(edges):
+    """Build components from {id: [dependency ids]} (all contexts)."""
+    return parse_components(
+        {
+            "components": {
+                "contexts": [
+                    {
+                        "id": comp_id,
+                        "path": f".opencode/context/{comp_id}.md",
+                        "dependencies": [f"context:{dep}" for dep in deps],
+                    }
+                    for comp_id, deps in edges.items()
+                ]
+            }
+        }
+    )
+
+
+def ids(*names):
+    return [f"context:{name}" for name in names]
+
+
+class TestDependencyResolver(unittest.TestCase):
+    """Test the iterative resolver."""
+
+    def test_dependencies_come_first(self):
+        """Test depth-first order with shared dependencies listed once."""
+        components = make_graph({"a": ["b", "c"], "b": ["d"], "c": ["d"], "d": []})
+        self.assertEqual(
+            resolve_dependencies(ids("a"), components), ids("d", "b", "c", "a")
+        )
+        self.assertEqual(
+            resolve_dependencies(ids("c", "a"), components), ids("d", "c", "b", "a")
+        )
+
+    def test_missing_is_reported(self):
+        """Test unknown requested IDs and dependencies are reported, not installed."""
+        components = make_graph({"a": ["ghost"]})
+        result = DependencyResolver(components).resolve(ids("a", "nope"))
+
+        self.assertEqual(result.order, ids("a"))
+        self.assertEqual(
+            result.missing,
+            [("context:a", "context:ghost"), (None, "context:nope")],
+        )
+
+    def test_cycles_are_reported_once(self):
+        """Test a cycle is broken, reported once and everything still installs."""
+        components = make_graph({"a": ["b"], "b": ["c"], "c": ["a"], "d": ["d"]})
+        result = DependencyResolver(components).resolve(ids("a", "b", "d"))
+
+        self.assertEqual(sorted(result.order), ids("a", "b", "c", "d"))
+        self.assertEqual(
+            result.cycles,
+            [tuple(ids("a", "b", "c", "a")), tuple(ids("d", "d"))],
+        )
+
+    def test_waves_group_independent_components(self):
+        """Test components land one level above their deepest dependency."""
+        components = make_graph(
+            {"a": ["b", "c"], "b": ["d"], "c": [], "d": [], "e": [], "f": ["a"]}
+        )
+        result = DependencyResolver(components).resolve(ids("f", "e"))
+
+        self.assertEqual(
+            result.waves, [ids("d", "c", "e"), ids("b"), ids("a"), ids("f")]
+        )
+        self.assertEqual(sorted(sum(result.waves, [])), sorted(result.order))
+
+    def test_levels_ignore_cycle_back_edges(self):
+        """Test a cycle still yields a valid level for every component."""
+        resolver = DependencyResolver(make_graph({"a": ["b"], "b": ["a"], "c": []}))
+        self.assertEqual(resolver.levels(ids("b", "a", "c", "a")), [0, 1, 0, 1])
+
+    def test_resolver_reuse(self):
+        """Test one resolver gives independent results for several profiles."""
+        resolver = DependencyResolver(make_graph({"a": ["b"], "b": [], "c": ["b"]}))
+        self.assertEqual(resolver.resolve(ids("a")).order, ids("b", "a"))
+        self.assertEqual(resolver.resolve(ids("c")).order, ids("b", "c"))
+
+    def test_lookups_are_memoized(self):
+        """Test each component is looked up once across several resolves."""
+        components = make_graph({"a": ["b", "c"], "b": ["d"], "c": ["d", "x"], "d": [], "e": ["c"]})
+        resolver = DependencyResolver(components)
+        resolver.resolve(ids("a"))
+        with mock.patch.object(resolver.index, "get", wraps=resolver.index.get) as get:
+            result = resolver.resolve(ids("e", "a", "e"))
+
+        get.assert_called_once_with("context:e")
+        self.assertEqual(result.order, ids("d", "c", "e", "b", "a"))
+        self.assertEqual(result.missing, [("context:c", "context:x")])
+
+    def test_deep_chain_scales_linearly(self):
+        """Test a 100k-edge chain resolves without recursion and in linear time."""
+        timings = []
+        for count in (25_000, 100_000):
+            edges = {f"n{i}": [f"n{i + 1}"] if i + 1 < count else [] for i in range(count)}
+            resolver = DependencyResolver(make_graph(edges))
+            start = time.perf_counter()
+            order = resolver.resolve(ids("n0")).order
+            timings.append(time.perf_counter() - start)
+            self.assertEqual(len(order), count)
+            self.assertEqual(order[0], f"context:n{count - 1}")
+
+        # 4x the edges should cost about 4x the time, far from 16x
+        self.assertLess(timings[1], timings[0] * 10 + 0.05)
+
+    def test_chain_listed_dependencies_first_scales_linearly(self):
+        """Test resolving every ID of a chain, deepest first, stays linear."""
+        timings = []
+        for count in (5_000, 20_000):
+            edges = {f"n{i}": [f"n{i + 1}"] if i + 1 < count else [] for i in range(count)}
+            resolver = DependencyResolver(make_graph(edges))
+            roots = ids(*(f"n{i}" for i in reversed(range(count))))
+            start = time.perf_counter()
+            order = resolver.resolve(roots).order
+            timings.append(time.perf_counter() - start)
+            self.assertEqual(order, roots)
+
+        self.assertLess(timings[1], timings[0] * 10 + 0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""Tests for the install directory snapshot."""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+import unittest
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from installer_py import fstree
+from installer_py.collisions import detect_collisions
+from installer_py.fstree import FileTree
+
+
+class TestFileTree(unittest.TestCase):
+    """Test existence, stat and directory planning from one scan."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        os.makedirs(os.path.join(self.root, "agent", "subagents"))
+        with open(os.path.join(self.root, "agent", "a.md"), "w") as f:
+            f.write("hello")
+        os.symlink("gone.md", os.path.join(self.root, "agent", "broken.md"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def test_exists_and_stat(self):
+        """Test answers match os.path and os.stat."""
+        paths = [
+            self.path("agent", "a.md"),
+            self.path("agent", "b.md"),
+            self.path("agent", "broken.md"),
+            self.path("agent", "subagents", "c.md"),
+        ]
+        tree = FileTree.scan(paths)
+
+        self.assertEqual(
+            [tree.exists(path) for path in paths], [os.path.exists(path) for path in paths]
+        )
+        info = os.stat(paths[0])
+        self.assertEqual(tree.stat(paths[0]), (info.st_size, info.st_mtime_ns))
+        self.assertIsNone(tree.stat(paths[1]))
+        self.assertIsNone(tree.stat(self.path("agent", "subagents")))
+
+    def test_each_directory_is_listed_once(self):
+        """Test one scandir per existing directory, none below a missing one."""
+        paths = [self.path("agent", f"{i}.md") for i in range(20)]
+        paths += [self.path("agent", "new", "deep", f"{i}.md") for i in range(5)]
+        paths += [self.path("agent", "new", f"{i}.md") for i in range(5)]
+
+        with mock.patch.object(fstree.os, "scandir", wraps=os.scandir) as scandir:
+            tree = FileTree.scan(paths)
+            self.assertFalse(any(tree.exists(path) for path in paths))
+
+        scandir.assert_called_once_with(self.path("agent"))
+
+    def test_missing_dirs_are_minimal(self):
+        """Test only the deepest missing directories are planned and created."""
+        paths = [
+            self.path("agent", "a.md"),
+            self.path("command", "x", "one.md"),
+            self.path("command", "two.md"),
+            self.path("context", "core", "y", "three.md"),
+        ]
+        tree = FileTree.scan(paths)
+
+        self.assertEqual(
+            tree.missing_dirs(paths),
+            [self.path("command", "x"), self.path("context", "core", "y")],
+        )
+        tree.make_dirs(paths)
+        self.assertTrue(os.path.isdir(self.path("command", "x")))
+        self.assertTrue(os.path.isdir(self.path("context", "core", "y")))
+        self.assertEqual(tree.missing_dirs(paths), [])
+        self.assertFalse(tree.exists(self.path("command", "x", "one.md")))
+
+    def test_unreadable_directory_falls_back_to_stat(self):
+        """Test a directory scandir can't list is answered per path, not as missing."""
+        paths = [self.path("agent", "a.md"), self.path("agent", "b.md")]
+        scandir = os.scandir
+
+        def denied(path):
+            if path == self.path("agent"):
+                raise PermissionError(13, "Permission denied", path)
+            return scandir(path)
+
+        with mock.patch.object(fstree.os, "scandir", denied):
+            tree = FileTree.scan(paths)
+            self.assertEqual([tree.exists(path) for path in paths], [True, False])
+            self.assertEqual(tree.stat(paths[0]).size, 5)
+            self.assertIsNone(tree.stat(paths[1]))
+            self.assertEqual(tree.missing_dirs(paths), [])
+
+    def test_detect_collisions_uses_tree(self):
+        """Test collisions come from the snapshot that was passed in."""
+        paths = [self.path("agent", "a.md"), self.path("agent", "b.md")]
+        tree = FileTree.scan(paths)
+        os.remove(paths[0])
+
+        self.assertEqual(detect_collisions(paths, self.root, tree), [paths[0]])
+        self.assertEqual(detect_collisions(paths, self.root), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,444 @@
+"""Tests for component installation."""
+
+import contextlib
+import errno
+import io
+import os
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+from pathlib import Path
+import unittest
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from installer_py import fstree, install_ops, staging
+from installer_py.cache import DownloadCache
+from installer_py.fstree import FileTree
+from installer_py.collisions import detect_collisions
+from installer_py.install_ops import expected_files, install_components
+from installer_py.registry import parse_components
+from installer_py.types import CollisionStrategy
+from tests_installer.stub_server import StubServer
+
+
+def make_registry(count):
+    """Build a registry with ``count`` context components."""
+    return {
+        "components": {
+            "contexts": [
+                {
+                    "id": f"ctx-{i}",
+                    "name": f"Context {i}",
+                    "path": f".opencode/context/ctx-{i}.md",
+                }
+                for i in range(count)
+            ]
+        }
+    }
+
+
+class TestInstallComponents(unittest.TestCase):
+    """Test installing components from local files."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.source = self.root / "src"
+        self.registry = make_registry(12)
+        for comp in self.registry["components"]["contexts"]:
+            path = self.source / comp["path"]
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f"# {comp['name']}\n")
+        # Component whose source file is missing
+        self.registry["components"]["contexts"].append(
+            {"id": "missing", "name": "Missing", "path": ".opencode/context/missing.md"}
+        )
+        self.components = parse_components(self.registry)
+        self.ids = [f"context:ctx-{i}" for i in range(12)]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _install(self, install_dir, jobs, strategy=CollisionStrategy.OVERWRITE, expected=None):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            result = install_components(
+                self.ids,
+                self.components,
+                str(install_dir),
+                "https://example.invalid",
+                True,
+                self.source,
+                strategy,
+                jobs=jobs,
+                expected=expected,
+            )
+        return result, output.getvalue()
+
+    def test_parallel_matches_sequential(self):
+        """Test parallel install gives the same result and output order."""
+        seq_result, seq_output = self._install(self.root / "seq" / ".opencode", 1)
+        par_result, par_output = self._install(self.root / "par" / ".opencode", 6)
+
+        self.assertEqual(seq_result.installed, 12)
+        self.assertEqual(seq_result.failed, 0)
+        self.assertEqual(seq_result, par_result)
+        self.assertEqual(
+            seq_output.replace("/seq/", "/x/"), par_output.replace("/par/", "/x/")
+        )
+
+    def test_failure_leaves_target_untouched(self):
+        """Test a failed component stops the commit and a rerun reuses staged files."""
+        install_dir = self.root / ".opencode"
+        self._install(install_dir, 4)
+        (self.source / ".opencode/context/ctx-0.md").write_text("# New 0\n")
+        self.ids.append("context:missing")
+        expected = expected_files(self.ids, self.components, str(install_dir), True, self.source)
+
+        result, output = self._install(install_dir, 4, expected=expected)
+
+        self.assertTrue(result.rolled_back)
+        self.assertEqual((result.installed, result.unchanged, result.failed), (0, 11, 1))
+        self.assertIn("no changes were made", output)
+        self.assertEqual((install_dir / "context" / "ctx-0.md").read_text(), "# Context 0\n")
+        staged = self.root / ".opencode.staging" / "context" / "ctx-0.md"
+        self.assertEqual(staged.read_text(), "# New 0\n")
+
+        (self.source / ".opencode/context/missing.md").write_text("# Missing\n")
+        (self.source / ".opencode/context/ctx-0.md").unlink()
+        expected[str(install_dir / "context" / "missing.md")] = expected_files(
+            ["context:missing"], self.components, str(install_dir), True, self.source
+        )[str(install_dir / "context" / "missing.md")]
+        result, _ = self._install(install_dir, 4, expected=expected)
+
+        self.assertFalse(result.rolled_back)
+        self.assertEqual((result.installed, result.unchanged), (2, 11))
+        self.assertEqual((install_dir / "context" / "ctx-0.md").read_text(), "# New 0\n")
+        self.assertFalse(staged.parent.exists())
+
+    def test_failed_commit_is_rolled_back(self):
+        """Test files already moved into place are restored when a move fails."""
+        install_dir = self.root / ".opencode"
+        self._install(install_dir, 4)
+        for i in range(12):
+            (self.source / f".opencode/context/ctx-{i}.md").write_text(f"# New {i}\n")
+
+        real_replace = os.replace
+        moves = []
+
+        def failing_replace(src, dst):
+            if str(dst).startswith(str(install_dir) + os.sep):
+                moves.append(dst)
+                if len(moves) == 5:
+                    raise OSError("disk full")
+            return real_replace(src, dst)
+
+        with mock.patch.object(staging.os, "replace", failing_replace):
+            result, output = self._install(install_dir, 4)
+
+        self.assertTrue(result.rolled_back)
+        self.assertEqual((result.installed, result.failed), (0, 12))
+        self.assertIn("disk full", output)
+        for i in range(12):
+            content = (install_dir / "context" / f"ctx-{i}.md").read_text()
+            self.assertEqual(content, f"# Context {i}\n")
+
+    def test_commit_across_filesystems(self):
+        """Test EXDEV from a rename falls back to copying into the target directory."""
+        install_dir = self.root / ".opencode"
+        self._install(install_dir, 4)
+        (self.source / ".opencode/context/ctx-3.md").write_text("# New 3\n")
+        real_replace = os.replace
+        staging_root = str(self.root / ".opencode.staging")
+
+        def cross_device(src, dst):
+            if str(src).startswith(staging_root) and not str(dst).startswith(staging_root):
+                raise OSError(errno.EXDEV, "Invalid cross-device link")
+            return real_replace(src, dst)
+
+        with mock.patch.object(staging.os, "replace", cross_device):
+            result, _ = self._install(install_dir, 4)
+
+        self.assertEqual((result.installed, result.rolled_back), (12, False))
+        self.assertEqual((install_dir / "context" / "ctx-3.md").read_text(), "# New 3\n")
+        self.assertFalse(Path(staging_root).exists())
+
+    def test_unknown_component_stops_the_commit(self):
+        """Test a component that can't be planned fails the whole install."""
+        install_dir = self.root / ".opencode"
+        self._install(install_dir, 4)
+        (self.source / ".opencode/context/ctx-0.md").write_text("# New 0\n")
+        self.ids.append("context:unknown")
+
+        result, output = self._install(install_dir, 4)
+
+        self.assertTrue(result.rolled_back)
+        self.assertEqual((result.installed, result.failed), (0, 1))
+        self.assertIn("Component not found: context:unknown", result.errors)
+        self.assertIn("no changes were made", output)
+        self.assertEqual((install_dir / "context" / "ctx-0.md").read_text(), "# Context 0\n")
+
+    def test_nothing_staged_leaves_no_staging_dir(self):
+        """Test a run where every file failed cleans up its staging directory."""
+        self.ids = ["context:missing"]
+        result, _ = self._install(self.root / ".opencode", 4)
+
+        self.assertEqual((result.failed, result.rolled_back), (1, True))
+        self.assertFalse((self.root / ".opencode.staging").exists())
+
+    def test_skip_existing(self):
+        """Test skip strategy leaves existing files untouched."""
+        install_dir = self.root / ".opencode"
+        self._install(install_dir, 4)
+        target = install_dir / "context" / "ctx-0.md"
+        target.write_text("local edits\n")
+
+        result, _ = self._install(install_dir, 4, CollisionStrategy.SKIP)
+
+        self.assertEqual(result.skipped, 12)
+        self.assertEqual(target.read_text(), "local edits\n")
+
+    def test_directories_created_up_front(self):
+        """Test the shared destination directory is created once, before any copy."""
+        with mock.patch.object(fstree.os, "makedirs", wraps=os.makedirs) as makedirs:
+            result, _ = self._install(self.root / "new" / ".opencode", 4)
+
+        self.assertEqual(result.installed, 12)
+        # One call for the staging directory; the rest are its own recursion
+        self.assertEqual(
+            makedirs.call_args_list[0],
+            mock.call(str(self.root / "new" / ".opencode.staging" / "context"), exist_ok=True),
+        )
+        self.assertEqual(len(makedirs.call_args_list), 3)
+        self.assertTrue((self.root / "new" / ".opencode" / "context" / "ctx-0.md").exists())
+        self.assertFalse((self.root / "new" / ".opencode.staging").exists())
+
+    def test_unchanged_files_are_not_rewritten(self):
+        """Test a rerun onto an up-to-date target writes nothing, transformed or not."""
+        (self.source / ".opencode/context/ctx-1.md").write_text("See .opencode/context/ctx-0.md\n")
+        for install_dir in (self.root / ".opencode", self.root / "global"):
+            self._install(install_dir, 4)
+            target = install_dir / "context" / "ctx-0.md"
+            target.write_text("local edits\n")
+            expected = expected_files(
+                self.ids, self.components, str(install_dir), True, self.source
+            )
+            dest_paths = sorted(expected)
+
+            self.assertEqual(
+                detect_collisions(dest_paths, str(install_dir), expected=expected),
+                [str(target)],
+            )
+            with mock.patch.object(
+                install_ops, "atomic_replace", wraps=install_ops.atomic_replace
+            ) as replace:
+                result, _ = self._install(install_dir, 4, expected=expected)
+            self.assertEqual((result.installed, result.unchanged), (1, 11))
+            self.assertEqual(len(replace.call_args_list), 1)
+
+        self.assertIn(
+            str(self.root / "global" / "context"),
+            (self.root / "global" / "context" / "ctx-1.md").read_text(),
+        )
+
+    def test_global_install_writes_each_file_once(self):
+        """Test paths are rewritten on the way in, with no second write."""
+        (self.source / ".opencode/context/ctx-1.md").write_text("See @.opencode/context/ctx-0.md\n")
+        (self.source / ".opencode/context/ctx-2.md").write_bytes(b"\xff .opencode/context\n")
+        install_dir = self.root / "global"
+
+        with mock.patch.object(
+            install_ops, "atomic_replace", wraps=install_ops.atomic_replace
+        ) as replace:
+            result, _ = self._install(install_dir, 4)
+
+        self.assertEqual(result.installed, 12)
+        self.assertEqual(len(replace.call_args_list), 12)
+        self.assertEqual(
+            (install_dir / "context" / "ctx-1.md").read_text(),
+            f"See @{install_dir}/context/ctx-0.md\n",
+        )
+        self.assertEqual(
+            (install_dir / "context" / "ctx-2.md").read_bytes(), b"\xff .opencode/context\n"
+        )
+
+    def test_dependencies_fetched_alongside(self):
+        """Test dependents are fetched without waiting, and reported in listed order."""
+        contexts = self.registry["components"]["contexts"]
+        contexts[5]["dependencies"] = ["context:ctx-2", "context:ctx-3"]
+        contexts[2]["dependencies"] = ["context:ctx-0"]
+        self.components = parse_components(self.registry)
+        self.ids = [f"context:ctx-{i}" for i in (0, 2, 3, 5, 1, 4, 6, 7)]
+
+        events = []
+        lock = threading.Lock()
+        install_file = install_ops._install_file
+
+        def recording_install(task, install_dir, source):
+            with lock:
+                events.append(("start", task.comp.id))
+            time.sleep(0.02)
+            outcome = install_file(task, install_dir, source)
+            with lock:
+                events.append(("done", task.comp.id))
+            return outcome
+
+        with mock.patch.object(install_ops, "_install_file", recording_install):
+            result, output = self._install(self.root / ".opencode", 8)
+
+        self.assertEqual(result.installed, 8)
+        # Nothing is installed before the commit, so there's no dependency barrier
+        self.assertLess(events.index(("start", "ctx-5")), events.index(("done", "ctx-0")))
+        installed = [line.split()[-1] for line in output.splitlines() if "Installed" in line]
+        self.assertEqual(installed, [i.split(":")[1] for i in self.ids])
+
+
+def make_tarball(files, root="agentic-config-main"):
+    """Build a gzipped tarball with every file under a top-level directory."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        for path, body in files.items():
+            info = tarfile.TarInfo(f"{root}/{path}")
+            info.size = len(body)
+            tar.addfile(info, io.BytesIO(body))
+    return buffer.getvalue()
+
+
+class TestArchiveSource(unittest.TestCase):
+    """Test installing remote components from one branch tarball."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.install_dir = Path(self.tmp.name) / ".opencode"
+        registry = make_registry(6)
+        self.components = parse_components(registry)
+        self.ids = [f"context:ctx-{i}" for i in range(6)]
+        self.archived = {
+            f".opencode/context/ctx-{i}.md": f"ctx {i}\n".encode() for i in range(5)
+        }
+        # ctx-5 is only available as a raw file
+        self.files = {
+            "/main.tar.gz": make_tarball({**self.archived, "README.md": b"readme"}),
+            "/raw/.opencode/context/ctx-5.md": b"ctx 5\n",
+        }
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_install_from_archive(self):
+        """Test archived paths come from one request and the rest fall back."""
+        with StubServer(self.files) as server, contextlib.redirect_stdout(io.StringIO()):
+            result = install_components(
+                self.ids,
+                self.components,
+                str(self.install_dir),
+                server.url + "/raw",
+                False,
+                Path.cwd(),
+                CollisionStrategy.OVERWRITE,
+                jobs=3,
+                archive_url=server.url + "/main.tar.gz",
+            )
+
+        self.assertEqual(result.installed, 6)
+        self.assertEqual(server.requests, 2)
+        for i in range(6):
+            content = (self.install_dir / "context" / f"ctx-{i}.md").read_text()
+            self.assertEqual(content, f"ctx {i}\n")
+
+    def test_remote_unchanged_is_confirmed_upstream(self):
+        """Test a remote file only counts as unchanged if the server says so."""
+        cache = DownloadCache(Path(self.tmp.name) / "cache")
+        files = {f"/raw/{path}": body for path, body in self.archived.items()}
+        with StubServer(files) as server, contextlib.redirect_stdout(io.StringIO()):
+
+            def install():
+                raw_url = server.url + "/raw"
+                dests = [str(self.install_dir / "context" / f"ctx-{i}.md") for i in range(5)]
+                started = time.time()
+                expected = expected_files(
+                    self.ids[:5],
+                    self.components,
+                    str(self.install_dir),
+                    False,
+                    Path.cwd(),
+                    raw_url=raw_url,
+                    cache=cache,
+                    tree=FileTree.scan(dests),
+                    jobs=3,
+                )
+                return install_components(
+                    self.ids[:5],
+                    self.components,
+                    str(self.install_dir),
+                    raw_url,
+                    False,
+                    Path.cwd(),
+                    CollisionStrategy.OVERWRITE,
+                    jobs=3,
+                    cache=cache,
+                    expected=expected,
+                    revalidated_since=started,
+                )
+
+            self.assertEqual(install().installed, 5)
+            self.assertEqual(install().unchanged, 5)
+            files["/raw/.opencode/context/ctx-2.md"] = b"ctx 2 v2\n"
+            before = server.requests
+            result = install()
+            # One conditional GET per file; the changed body isn't fetched twice
+            self.assertEqual(server.requests - before, 5)
+
+        self.assertEqual((result.installed, result.unchanged), (1, 4))
+        self.assertEqual((self.install_dir / "context" / "ctx-2.md").read_text(), "ctx 2 v2\n")
+
+    def test_broken_archive_falls_back(self):
+        """Test an unreadable archive falls back to per-file downloads."""
+        with StubServer(self.files) as server, contextlib.redirect_stdout(io.StringIO()):
+            result = install_components(
+                self.ids,
+                self.components,
+                str(self.install_dir),
+                server.url + "/raw",
+                False,
+                Path.cwd(),
+                CollisionStrategy.OVERWRITE,
+                archive_url=server.url + "/missing.tar.gz",
+            )
+
+        self.assertEqual((result.installed, result.failed), (0, 5))
+        self.assertTrue(result.rolled_back)
+        self.assertFalse(self.install_dir.exists())
+        staged = Path(self.tmp.name) / ".opencode.staging" / "context" / "ctx-5.md"
+        self.assertEqual(staged.read_text(), "ctx 5\n")
+
+
+    def test_truncated_archive_falls_back(self):
+        """Test an archive cut off mid-stream falls back to per-file downloads."""
+        files = {
+            **self.files,
+            **{f"/raw/{path}": body for path, body in self.archived.items()},
+        }
+        with StubServer(files) as server, contextlib.redirect_stdout(io.StringIO()):
+            server.truncate["/main.tar.gz"] = 1
+            result = install_components(
+                self.ids,
+                self.components,
+                str(self.install_dir),
+                server.url + "/raw",
+                False,
+                Path.cwd(),
+                CollisionStrategy.OVERWRITE,
+                archive_url=server.url + "/main.tar.gz",
+            )
+
+        self.assertEqual((result.installed, result.failed), (6, 0))
+        self.assertEqual((self.install_dir / "context" / "ctx-0.md").read_text(), "ctx 0\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,443 @@
+"""Tests for the network transport and download cache."""
+
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import unittest
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from installer_py import network
+from installer_py.cache import DownloadCache
+from installer_py.network import (
+    ConnectionPool,
+    NetworkPolicy,
+    PartialDownload,
+    fetch_text,
+    fetch_url,
+)
+from installer_py.ratelimit import RateGovernor
+from installer_py.transform import content_transform
+from tests_installer.stub_server import StubServer, TruncatingHandler
+
+FAST_RETRIES = NetworkPolicy(backoff_base=0.01, read_timeout=0.5)
+
+FILES = {f"/agent/a{i}.md": f"# Agent {i}\n".encode() for i in range(20)}
+
+
+class TestConnectionPool(unittest.TestCase):
+    """Test keep-alive connection reuse."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pool = ConnectionPool()
+
+    def tearDown(self):
+        self.pool.close()
+        self.tmp.cleanup()
+
+    def test_sequential_fetches_share_one_connection(self):
+        """Test many fetches to one host reuse a single connection."""
+        with StubServer(FILES) as server:
+            for path, body in FILES.items():
+                dest = Path(self.tmp.name) / path.lstrip("/")
+                self.assertTrue(fetch_url(server.url + path, dest, pool=self.pool))
+                self.assertEqual(dest.read_bytes(), body)
+
+        self.assertEqual(server.requests, len(FILES))
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(self.pool.connections_opened, 1)
+
+    def test_concurrent_fetches_bounded_by_workers(self):
+        """Test threads check out separate connections and return them."""
+        with StubServer(FILES) as server:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                texts = list(
+                    executor.map(
+                        lambda p: fetch_text(server.url + p, pool=self.pool), FILES
+                    )
+                )
+
+        self.assertEqual(texts, [body.decode() for body in FILES.values()])
+        self.assertLessEqual(server.connections, 4)
+
+    def test_missing_file_keeps_connection(self):
+        """Test a 404 fails the fetch but leaves the connection reusable."""
+        with StubServer(FILES) as server:
+            dest = Path(self.tmp.name) / "missing.md"
+            self.assertFalse(fetch_url(server.url + "/missing.md", dest, pool=self.pool))
+            self.assertFalse(dest.exists())
+            self.assertIsNotNone(fetch_text(server.url + "/agent/a0.md", pool=self.pool))
+
+        self.assertEqual(server.connections, 1)
+
+
+class TestStreamingWrites(unittest.TestCase):
+    """Test downloads are streamed and replaced atomically."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dest = Path(self.tmp.name) / "plugin" / "bun.lock"
+        self.pool = ConnectionPool()
+
+    def tearDown(self):
+        self.pool.close()
+        self.tmp.cleanup()
+
+    def test_large_file_streams_in_chunks(self):
+        """Test a file larger than one chunk arrives intact."""
+        body = bytes(range(256)) * 1024
+        with StubServer({"/bun.lock": body}) as server:
+            self.assertTrue(fetch_url(server.url + "/bun.lock", self.dest, self.pool))
+        self.assertEqual(self.dest.read_bytes(), body)
+
+    def test_truncated_download_keeps_old_file(self):
+        """Test a dropped connection leaves the previous file and no temp files."""
+        self.dest.parent.mkdir(parents=True)
+        self.dest.write_text("previous\n")
+        with StubServer({"/bun.lock": b"x" * 4096}, TruncatingHandler) as server:
+            self.assertFalse(
+                fetch_url(server.url + "/bun.lock", self.dest, self.pool, policy=FAST_RETRIES)
+            )
+
+        self.assertEqual(self.dest.read_text(), "previous\n")
+        self.assertEqual(os.listdir(self.dest.parent), ["bun.lock"])
+
+
+class TestCompressedTransfers(unittest.TestCase):
+    """Test gzip Content-Encoding is negotiated and decoded while streaming."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pool = ConnectionPool()
+        # Larger than one chunk once decompressed, and highly compressible
+        self.body = b"".join(
+            f"- See @.opencode/context/core/file-{i}.md\n".encode() for i in range(4000)
+        )
+
+    def tearDown(self):
+        self.pool.close()
+        self.tmp.cleanup()
+
+    def test_gzip_body_is_decoded(self):
+        """Test a gzip-encoded body is written decompressed."""
+        dest = Path(self.tmp.name) / "context.md"
+        with StubServer({"/context.md": self.body}) as server:
+            server.compress = True
+            self.assertTrue(fetch_url(server.url + "/context.md", dest, self.pool))
+
+        self.assertEqual(dest.read_bytes(), self.body)
+        self.assertLess(server.bytes_sent * 4, len(self.body))
+
+    def test_gzip_text_and_cache(self):
+        """Test fetch_text decodes gzip and cache revalidation still works."""
+        cache = DownloadCache(Path(self.tmp.name) / "cache")
+        dest = Path(self.tmp.name) / "context.md"
+        with StubServer({"/context.md": self.body}) as server:
+            server.compress = True
+            self.assertEqual(
+                fetch_text(server.url + "/context.md", self.pool), self.body.decode()
+            )
+            fetch_url(server.url + "/context.md", dest, self.pool, cache)
+            fetch_url(server.url + "/context.md", dest, self.pool, cache)
+
+        self.assertEqual(server.not_modified, 1)
+        self.assertEqual(dest.read_bytes(), self.body)
+
+
+class TestResumableDownloads(unittest.TestCase):
+    """Test interrupted downloads resume with Range requests."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dest = Path(self.tmp.name) / "plugin" / "bun.lock"
+        self.pool = ConnectionPool()
+        self.body = bytes(range(256)) * 1024
+
+    def tearDown(self):
+        self.pool.close()
+        self.tmp.cleanup()
+
+    def _fetch(self, server, policy=FAST_RETRIES):
+        return fetch_url(server.url + "/bun.lock", self.dest, self.pool, policy=policy)
+
+    def test_retry_resumes_from_partial(self):
+        """Test a retry only downloads the bytes that were missing."""
+        with StubServer({"/bun.lock": self.body}) as server:
+            server.truncate["/bun.lock"] = 1
+            self.assertTrue(self._fetch(server))
+
+        half = len(self.body) // 2
+        self.assertEqual(self.dest.read_bytes(), self.body)
+        self.assertEqual(server.range_requests, [f"bytes={half}-"])
+        self.assertEqual(server.bytes_sent, len(self.body))
+        self.assertEqual(os.listdir(self.dest.parent), ["bun.lock"])
+
+    def test_next_run_resumes_partial(self):
+        """Test a partial left by a failed run is resumed by the next one."""
+        no_retries = NetworkPolicy(retries=0, read_timeout=0.5)
+        with StubServer({"/bun.lock": self.body}) as server:
+            server.truncate["/bun.lock"] = 1
+            self.assertFalse(self._fetch(server, no_retries))
+            partial = PartialDownload.path_for(self.dest)
+            self.assertEqual(partial.stat().st_size, len(self.body) // 2)
+
+            self.assertTrue(self._fetch(server, no_retries))
+
+        self.assertEqual(self.dest.read_bytes(), self.body)
+        self.assertEqual(len(server.range_requests), 1)
+        self.assertFalse(partial.exists())
+
+    def test_changed_file_restarts(self):
+        """Test If-Range makes the server send the whole new file."""
+        files = {"/bun.lock": self.body}
+        no_retries = NetworkPolicy(retries=0, read_timeout=0.5)
+        with StubServer(files) as server:
+            server.truncate["/bun.lock"] = 1
+            self.assertFalse(self._fetch(server, no_retries))
+            files["/bun.lock"] = b"new lockfile\n"
+            self.assertTrue(self._fetch(server, no_retries))
+
+        self.assertEqual(self.dest.read_bytes(), b"new lockfile\n")
+        self.assertEqual(len(server.range_requests), 1)
+
+    def test_transformed_download_resumes(self):
+        """Test a transformed download resumes from its partial and is transformed once."""
+        body = b"See @.opencode/context/core.md\n" * 20000
+        transform = content_transform("/opt/opencode")
+        no_retries = NetworkPolicy(retries=0, read_timeout=0.5)
+        with StubServer({"/bun.lock": body}) as server:
+            server.truncate["/bun.lock"] = 1
+
+            def fetch():
+                return fetch_url(
+                    server.url + "/bun.lock",
+                    self.dest,
+                    self.pool,
+                    policy=no_retries,
+                    transform=transform,
+                )
+
+            self.assertFalse(fetch())
+            self.assertTrue(fetch())
+
+        self.assertEqual(server.range_requests, [f"bytes={len(body) // 2}-"])
+        self.assertEqual(self.dest.read_bytes(), transform(body))
+        self.assertEqual(os.listdir(self.dest.parent), ["bun.lock"])
+
+    def test_server_without_ranges(self):
+        """Test a server that ignores Range gets a clean full download."""
+        with StubServer({"/bun.lock": self.body}) as server:
+            server.ranges = False
+            server.truncate["/bun.lock"] = 1
+            self.assertTrue(self._fetch(server))
+
+        self.assertEqual(self.dest.read_bytes(), self.body)
+        self.assertEqual(os.listdir(self.dest.parent), ["bun.lock"])
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """Test timeouts and retries for transient failures."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dest = Path(self.tmp.name) / "a.md"
+        self.pool = ConnectionPool()
+
+    def tearDown(self):
+        self.pool.close()
+        self.tmp.cleanup()
+
+    def test_transient_errors_are_retried(self):
+        """Test 503s are retried and every attempt is timed."""
+        with StubServer({"/a.md": b"ok"}) as server:
+            server.inject["/a.md"] = [503, 502]
+            self.assertTrue(
+                fetch_url(server.url + "/a.md", self.dest, self.pool, policy=FAST_RETRIES)
+            )
+
+        self.assertEqual(self.dest.read_bytes(), b"ok")
+        self.assertEqual([a.status for a in self.pool.attempts], [503, 502, None])
+        self.assertTrue(all(a.elapsed >= 0 for a in self.pool.attempts))
+
+    def test_client_errors_are_not_retried(self):
+        """Test a 404 fails on the first attempt."""
+        with StubServer({}) as server:
+            self.assertFalse(
+                fetch_url(server.url + "/a.md", self.dest, self.pool, policy=FAST_RETRIES)
+            )
+        self.assertEqual(server.requests, 1)
+
+    def test_retries_are_bounded(self):
+        """Test a persistently failing URL gives up after policy.retries."""
+        policy = NetworkPolicy(retries=2, backoff_base=0.01)
+        with StubServer({"/a.md": b"ok"}) as server:
+            server.inject["/a.md"] = [500] * 5
+            self.assertIsNone(fetch_text(server.url + "/a.md", self.pool, policy))
+        self.assertEqual(server.requests, 3)
+
+    def test_backoff_honours_retry_after(self):
+        """Test backoff grows exponentially and respects Retry-After."""
+        policy = NetworkPolicy(backoff_base=1, backoff_max=8, jitter=0)
+        self.assertEqual([policy.backoff(n) for n in (1, 2, 3, 5)], [1, 2, 4, 8])
+        self.assertEqual(policy.backoff(1, retry_after=3), 3)
+        self.assertEqual(policy.backoff(1, retry_after=60), 8)
+
+
+class TestRateGovernor(unittest.TestCase):
+    """Test pool-wide AIMD throttling."""
+
+    def test_throttle_halves_once_per_pause(self):
+        """Test a burst of 429s shrinks the window once, successes regrow it."""
+        governor = RateGovernor(max_concurrency=8, max_rate=40)
+        governor.on_throttle(retry_after=5)
+        governor.on_throttle(retry_after=5)
+
+        self.assertEqual(governor.limit, 4)
+        self.assertEqual(governor.rate, 20)
+        self.assertEqual(governor.throttled, 2)
+
+        for _ in range(4):
+            governor.on_success()
+        self.assertGreater(governor.limit, 4.9)
+        self.assertEqual(governor.rate, 24)
+
+    def test_pause_blocks_all_requests(self):
+        """Test acquire waits out the Retry-After of an earlier request."""
+        governor = RateGovernor()
+        governor.on_throttle(retry_after=0.2)
+        start = time.monotonic()
+        with governor.slot():
+            pass
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+
+    def test_concurrent_downloads_survive_429s(self):
+        """Test 429s slow the shared pool down instead of failing components."""
+        pool = ConnectionPool(governor=RateGovernor(max_concurrency=8))
+        with tempfile.TemporaryDirectory() as tmp, StubServer(FILES) as server:
+            server.retry_after = 0
+            for path in list(FILES)[:6]:
+                server.inject[path] = [429]
+
+            def fetch(path):
+                dest = Path(tmp) / path.lstrip("/")
+                return fetch_url(server.url + path, dest, pool, policy=FAST_RETRIES)
+
+            with ThreadPoolExecutor(max_workers=6) as executor:
+                results = list(executor.map(fetch, FILES))
+        pool.close()
+
+        self.assertTrue(all(results))
+        self.assertEqual(pool.governor.throttled, 6)
+        self.assertLess(pool.governor.limit, 8)
+
+
+class TestDownloadCache(unittest.TestCase):
+    """Test conditional GETs served from the download cache."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.pool = ConnectionPool()
+
+    def tearDown(self):
+        self.pool.close()
+        self.tmp.cleanup()
+
+    def test_not_modified_served_from_cache(self):
+        """Test a second fetch revalidates with ETag and copies the blob."""
+        cache = DownloadCache(self.root / "cache")
+        files = {"/a.md": b"alpha\n"}
+        with StubServer(files) as server:
+            first = self.root / "one" / "a.md"
+            second = self.root / "two" / "a.md"
+            self.assertTrue(fetch_url(server.url + "/a.md", first, self.pool, cache))
+            self.assertTrue(fetch_url(server.url + "/a.md", second, self.pool, cache))
+
+        self.assertEqual(server.not_modified, 1)
+        self.assertEqual(second.read_bytes(), b"alpha\n")
+
+    def test_transform_keeps_cache_raw(self):
+        """Test transformed downloads and cache hits while the blob stays as served."""
+        cache = DownloadCache(self.root / "cache")
+        files = {"/a.md": b"alpha\n"}
+        first, second = self.root / "one" / "a.md", self.root / "two" / "a.md"
+        with StubServer(files) as server:
+            with mock.patch.object(
+                network, "atomic_replace", wraps=network.atomic_replace
+            ) as replace, mock.patch.object(
+                network, "_stream_to_file", wraps=network._stream_to_file
+            ) as stream:
+                self.assertTrue(
+                    fetch_url(server.url + "/a.md", first, self.pool, cache, transform=bytes.upper)
+                )
+            self.assertTrue(
+                fetch_url(server.url + "/a.md", second, self.pool, cache, transform=bytes.upper)
+            )
+            entry = cache.lookup(server.url + "/a.md")
+
+        # Streamed as served, then rewritten once with the transformed content
+        replace.assert_called_once_with(first)
+        stream.assert_called_once()
+        self.assertEqual((first.read_bytes(), second.read_bytes()), (b"ALPHA\n", b"ALPHA\n"))
+        self.assertEqual(server.not_modified, 1)
+        self.assertEqual(cache.blob_path(entry.sha256).read_bytes(), b"alpha\n")
+
+    def test_blob_evicted_before_not_modified(self):
+        """Test a 304 for a blob evicted meanwhile refetches the body instead of failing."""
+        cache = DownloadCache(self.root / "cache")
+        files = {"/a.md": b"alpha\n"}
+        dest = self.root / "a.md"
+        lookup = cache.lookup
+
+        def lookup_then_evict(url):
+            entry = lookup(url)
+            if entry is not None:
+                cache.blob_path(entry.sha256).unlink()
+            return entry
+
+        with StubServer(files) as server:
+            self.assertTrue(fetch_url(server.url + "/a.md", dest, self.pool, cache))
+            dest.unlink()
+            with mock.patch.object(cache, "lookup", side_effect=lookup_then_evict):
+                self.assertTrue(fetch_url(server.url + "/a.md", dest, self.pool, cache))
+
+        self.assertEqual((server.requests, server.not_modified), (3, 1))
+        self.assertEqual(dest.read_bytes(), b"alpha\n")
+        self.assertIsNotNone(cache.lookup(server.url + "/a.md"))
+
+    def test_changed_content_replaces_entry(self):
+        """Test a changed upstream file is downloaded and re-cached."""
+        cache = DownloadCache(self.root / "cache")
+        files = {"/a.md": b"v1"}
+        dest = self.root / "a.md"
+        with StubServer(files) as server:
+            fetch_url(server.url + "/a.md", dest, self.pool, cache)
+            files["/a.md"] = b"v2"
+            fetch_url(server.url + "/a.md", dest, self.pool, cache)
+            entry = cache.lookup(server.url + "/a.md")
+
+        self.assertEqual(server.not_modified, 0)
+        self.assertEqual(dest.read_bytes(), b"v2")
+        self.assertEqual(cache.blob_path(entry.sha256).read_bytes(), b"v2")
+
+    def test_lru_eviction(self):
+        """Test least recently used blobs are evicted past the size cap."""
+        cache = DownloadCache(self.root / "cache", max_bytes=25)
+        old = cache.store("http://x/old", b"o" * 10)
+        recent = cache.store("http://x/recent", b"r" * 10)
+        os.utime(cache.blob_path(old.sha256), (1, 1))
+        cache.touch(recent)
+        cache.store("http://x/new", b"n" * 10)
+
+        self.assertIsNone(cache.lookup("http://x/old"))
+        self.assertIsNotNone(cache.lookup("http://x/recent"))
+        self.assertIsNotNone(cache.lookup("http://x/new"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,7 @@
 
 import os
 import sys
+import tempfile
 from pathlib import Path
 import unittest
 
@@ -12,6 +13,7 @@ from installer_py.paths import (
     validate_install_path,
     get_install_path,
     ensure_parent_dir,
+    atomic_replace,
 )
 from installer_py.transform import transform_context_paths, should_transform
 
@@ -57,6 +59,35 @@ class TestPathHandling(unittest.TestCase):
         expected = "/custom/install/config/test.json"
         self.assertEqual(result, expected)
 
+    def test_atomic_replace_keeps_mode(self):
+        """Test atomic_replace swaps content in and keeps the file mode."""
+        with tempfile.TemporaryDirectory() as tmp:
+            target = Path(tmp) / "tool" / "run.sh"
+            target.parent.mkdir()
+            target.write_text("old")
+            target.chmod(0o755)
+
+            with atomic_replace(target) as tmp_path:
+                tmp_path.write_text("new")
+
+            self.assertEqual(target.read_text(), "new")
+            self.assertEqual(target.stat().st_mode & 0o777, 0o755)
+            self.assertEqual(os.listdir(target.parent), ["run.sh"])
+
+    def test_atomic_replace_error_leaves_target(self):
+        """Test a failed write leaves the original file untouched."""
+        with tempfile.TemporaryDirectory() as tmp:
+            target = Path(tmp) / "agent.md"
+            target.write_text("old")
+
+            with self.assertRaises(RuntimeError):
+                with atomic_replace(target) as tmp_path:
+                    tmp_path.write_text("partial")
+                    raise RuntimeError("disk full")
+
+            self.assertEqual(target.read_text(), "old")
+            self.assertEqual(os.listdir(tmp), ["agent.md"])
+
 
 class TestPathTransforms(unittest.TestCase):
     """Test path transformation logic."""
@@ -1,10 +1,12 @@
 """Tests for registry parsing and component lookup."""
 
+import gzip
 import json
 import sys
 from pathlib import Path
 import unittest
 import tempfile
+from unittest import mock
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
@@ -14,8 +16,12 @@ from installer_py.registry import (
     parse_profiles,
     find_component,
     get_registry_key,
+    index_for,
 )
-from installer_py.types import ComponentType
+from installer_py.deps import resolve_dependencies
+from installer_py.cache import DownloadCache
+from installer_py.types import Component, ComponentType
+from tests_installer.stub_server import StubServer
 
 
 # Minimal test registry
@@ -98,6 +104,22 @@ class TestRegistryParsing(unittest.TestCase):
         if dest_path.exists():
             dest_path.unlink()
 
+    def test_load_compressed_local_registry(self):
+        """Test a registry.json.gz is used when registry.json is missing."""
+        with tempfile.TemporaryDirectory() as tmp:
+            compressed = Path(tmp) / "registry.json.gz"
+            compressed.write_bytes(gzip.compress(json.dumps(TEST_REGISTRY).encode()))
+
+            reg_data = load_registry(
+                Path(tmp) / "out.json",
+                use_local=True,
+                local_path=Path(tmp) / "registry.json",
+            )
+
+        self.assertIsNotNone(reg_data)
+        if reg_data is not None:
+            self.assertEqual(reg_data["version"], "1.0.0")
+
     def test_parse_components(self):
         """Test parsing components from registry."""
         components = parse_components(TEST_REGISTRY)
@@ -147,5 +169,119 @@ class TestRegistryParsing(unittest.TestCase):
         self.assertEqual(get_registry_key(ComponentType.CONFIG), "config")
 
 
+class TestRegistryIndex(unittest.TestCase):
+    """Test hash lookups built by parse_components."""
+
+    def setUp(self):
+        registry = json.loads(json.dumps(TEST_REGISTRY))
+        registry["components"]["agents"][0]["tags"] = ["core"]
+        registry["components"]["contexts"] = [
+            {"id": "dup", "name": "First", "path": "a.md", "category": "docs"},
+            {"id": "dup", "name": "Second", "path": "b.md", "category": "docs"},
+        ]
+        self.components = parse_components(registry)
+        self.index = self.components.index
+
+    def test_lookups(self):
+        """Test lookup by type:id, path, tag and category."""
+        self.assertEqual(self.index.get("subagent:helper").name, "Helper")
+        self.assertIsNone(self.index.get("helper"))
+        self.assertIsNone(self.index.get("widget:helper"))
+        self.assertEqual([c.id for c in self.index.by_path("env.example")], ["env-example"])
+        self.assertEqual([c.id for c in self.index.by_tag("core")], ["test-agent"])
+        self.assertEqual([c.name for c in self.index.by_category("docs")], ["First", "Second"])
+
+    def test_first_duplicate_wins(self):
+        """Test duplicate IDs resolve to the first entry, like the old scan."""
+        self.assertEqual(self.index.get("context:dup").name, "First")
+
+    def test_plain_dict_gets_an_index(self):
+        """Test hand-built component dicts are still searchable."""
+        plain = dict(self.components)
+        self.assertEqual(index_for(plain).get("agent:test-agent").id, "test-agent")
+        self.assertEqual(find_component(plain, "config:env-example").path, "env.example")
+
+    def test_compact_components(self):
+        """Test repeated strings are shared and sequences are tuples."""
+        first, second = self.components[ComponentType.CONTEXT]
+        self.assertIs(first.category, second.category)
+        self.assertIsInstance(self.index.get("agent:test-agent").dependencies, tuple)
+        self.assertIsInstance(self.components.index.get("agent:test-agent").tags, tuple)
+        if sys.version_info >= (3, 10):
+            self.assertFalse(hasattr(first, "__dict__"))
+
+    def test_null_lists_are_empty(self):
+        """Test null tags and dependencies load as empty tuples."""
+        comp = Component.from_dict(
+            {"id": "a", "type": "agent", "path": "a.md", "tags": None, "dependencies": None},
+            ComponentType.AGENT,
+        )
+        self.assertEqual((comp.tags, comp.dependencies), ((), ()))
+
+    def test_components_are_built_on_demand(self):
+        """Test parsing builds nothing and a lookup builds only its component."""
+        registry = json.loads(json.dumps(TEST_REGISTRY))
+        with mock.patch.object(Component, "from_dict", wraps=Component.from_dict) as build:
+            components = parse_components(registry)
+            self.assertEqual(build.call_count, 0)
+
+            agent = components.index.get("agent:test-agent")
+            self.assertIs(components.index.get("agent:test-agent"), agent)
+            self.assertEqual(build.call_count, 1)
+
+            self.assertIs(components[ComponentType.AGENT][0], agent)
+            self.assertEqual(len(components[ComponentType.CONFIG]), 1)
+            self.assertEqual(build.call_count, 2)
+        # The registry dict itself is left as it was
+        self.assertEqual(registry, TEST_REGISTRY)
+
+    def test_resolve_dependencies(self):
+        """Test dependency resolution uses the index and orders deps first."""
+        self.assertEqual(
+            resolve_dependencies(["agent:test-agent"], self.components),
+            ["subagent:helper", "agent:test-agent"],
+        )
+
+
+class TestRegistryCache(unittest.TestCase):
+    """Test TTL caching of the remote registry."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.cache = DownloadCache(self.root / "cache")
+        self.files = {"/registry.json": json.dumps(TEST_REGISTRY).encode()}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _load(self, server, **kwargs):
+        return load_registry(
+            self.root / "registry.json",
+            registry_url=server.url + "/registry.json",
+            cache=self.cache,
+            **kwargs,
+        )
+
+    def test_fresh_registry_skips_network(self):
+        """Test a registry within its TTL is loaded without a request."""
+        with StubServer(self.files) as server:
+            self.assertIsNotNone(self._load(server))
+            reg_data = self._load(server, ttl=60)
+
+        self.assertEqual(reg_data["version"], "1.0.0")
+        self.assertEqual(server.requests, 1)
+
+    def test_expired_registry_revalidates(self):
+        """Test an expired or refreshed registry is revalidated with a 304."""
+        with StubServer(self.files) as server:
+            self._load(server)
+            self.assertIsNotNone(self._load(server, ttl=0))
+            self.assertIsNotNone(self._load(server, ttl=60, refresh=True))
+
+        self.assertEqual(server.requests, 3)
+        self.assertEqual(server.not_modified, 2)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,119 @@
+"""Tests for precompiled registry snapshots."""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+import unittest
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from installer_py import snapshot
+from installer_py.snapshot import MAX_SNAPSHOTS, SnapshotStore, load_parsed_registry
+from tests_installer.test_registry import TEST_REGISTRY
+
+
+class TestSnapshotStore(unittest.TestCase):
+    """Test snapshots are reused only for identical registry bytes."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = SnapshotStore(Path(self.tmp.name) / "snapshots")
+        self.data = json.dumps(TEST_REGISTRY).encode()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_second_load_skips_parsing(self):
+        """Test an unchanged registry is loaded without parsing JSON."""
+        first = load_parsed_registry(self.data, self.store)
+        with mock.patch.object(snapshot, "parse_registry_bytes") as parse:
+            second = load_parsed_registry(self.data, self.store)
+
+        parse.assert_not_called()
+        self.assertEqual(second.sha256, first.sha256)
+        self.assertEqual(second.profiles, first.profiles)
+        self.assertEqual(second.components.index.get("agent:test-agent").name, "Test Agent")
+        self.assertEqual(
+            second.closures["test"].order,
+            ["subagent:helper", "agent:test-agent", "config:env-example"],
+        )
+
+    def test_snapshot_decodes_entries_on_demand(self):
+        """Test a snapshot hit decodes only the components looked up."""
+        load_parsed_registry(self.data, self.store)
+        parsed = load_parsed_registry(self.data, self.store)
+        with mock.patch.object(json, "loads", wraps=json.loads) as loads:
+            self.assertEqual(parsed.components.index.get("config:env-example").path, "env.example")
+            self.assertIn("subagent:helper", parsed.components.index)
+
+        self.assertEqual(loads.call_count, 1)
+
+    def test_changed_registry_is_reparsed(self):
+        """Test different bytes get their own snapshot."""
+        load_parsed_registry(self.data, self.store)
+        changed = json.loads(self.data)
+        changed["components"]["agents"][0]["name"] = "Renamed"
+        parsed = load_parsed_registry(json.dumps(changed).encode(), self.store)
+
+        self.assertEqual(parsed.components.index.get("agent:test-agent").name, "Renamed")
+        self.assertEqual(len(list(self.store.root.glob("*.snap"))), 2)
+
+    def test_unreadable_snapshot_is_rebuilt(self):
+        """Test a corrupt or old-format snapshot counts as a miss."""
+        parsed = load_parsed_registry(self.data, self.store)
+        path = self.store.path_for(parsed.sha256)
+        for content in (snapshot.MAGIC + b"garbage", b"OCSNAP00" + path.read_bytes()[8:]):
+            path.write_bytes(content)
+            self.assertIsNone(self.store.load(parsed.sha256))
+            self.assertIsNotNone(load_parsed_registry(self.data, self.store))
+            self.assertIsNotNone(self.store.load(parsed.sha256))
+
+    def test_shared_snapshot_is_refused(self):
+        """Test a snapshot others could have written is never unpickled."""
+        parsed = load_parsed_registry(self.data, self.store)
+        path = self.store.path_for(parsed.sha256)
+        self.assertEqual(path.stat().st_mode & 0o777, 0o600)
+
+        path.chmod(0o666)
+        with mock.patch.object(snapshot.pickle, "load") as load:
+            self.assertIsNone(self.store.load(parsed.sha256))
+            with mock.patch.object(snapshot.os, "getuid", return_value=path.stat().st_uid + 1):
+                path.chmod(0o600)
+                self.assertIsNone(self.store.load(parsed.sha256))
+        load.assert_not_called()
+        self.assertIsNotNone(self.store.load(parsed.sha256))
+
+    def test_closures_are_resolved_on_demand(self):
+        """Test only the profiles looked up are resolved, once each."""
+        registry = {**TEST_REGISTRY, "profiles": {**TEST_REGISTRY["profiles"], "other": {}}}
+        parsed = load_parsed_registry(json.dumps(registry).encode(), self.store)
+        with mock.patch.object(
+            snapshot.DependencyResolver,
+            "resolve",
+            autospec=True,
+            side_effect=snapshot.DependencyResolver.resolve,
+        ) as resolve:
+            first = parsed.closures["test"]
+            self.assertIs(parsed.closures["test"], first)
+
+        self.assertEqual(resolve.call_count, 1)
+        self.assertEqual(sorted(parsed.closures), ["other", "test"])
+        self.assertIsNone(parsed.closures.get("missing"))
+
+    def test_invalid_registry(self):
+        """Test bytes that aren't a registry give None and no snapshot."""
+        self.assertIsNone(load_parsed_registry(b"not json", self.store))
+        self.assertFalse(self.store.root.exists())
+
+    def test_old_snapshots_are_pruned(self):
+        """Test only the most recent snapshots are kept."""
+        for version in range(MAX_SNAPSHOTS + 2):
+            data = json.dumps({**TEST_REGISTRY, "version": str(version)}).encode()
+            load_parsed_registry(data, self.store)
+        self.assertEqual(len(list(self.store.root.glob("*.snap"))), MAX_SNAPSHOTS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""Tests for context path rewriting on global installs."""
+
+import re
+import sys
+from pathlib import Path
+import unittest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from installer_py.transform import (
+    content_transform,
+    transform_context_paths,
+    transform_file_content,
+)
+
+
+def two_pass(content, install_dir):
+    """The original two re.sub passes, for comparison."""
+    content = re.sub(r"@\.opencode/context/", f"@{install_dir}/context/", content)
+    return re.sub(r"\.opencode/context", f"{install_dir}/context", content)
+
+
+class TestTransform(unittest.TestCase):
+    """Test the single-pass rewrite and its fast paths."""
+
+    install_dir = "/home/user/.config/opencode"
+
+    def test_matches_two_pass_rewrite(self):
+        """Test one pass gives what the two regex passes gave."""
+        content = (
+            "Load @.opencode/context/core/standards.md first.\n"
+            "See .opencode/context and `.opencode/context/x.md`.\n"
+            "Not .opencode/agent, nor opencode/context.\n"
+            "Ünïcödé @.opencode/context/ü.md\n"
+        )
+        expected = two_pass(content, self.install_dir)
+
+        self.assertEqual(transform_context_paths(content, self.install_dir), expected)
+        self.assertEqual(
+            transform_file_content(content.encode("utf-8"), self.install_dir),
+            expected.encode("utf-8"),
+        )
+
+    def test_untouched_content(self):
+        """Test content without a match, binary or non-UTF-8 comes back as is."""
+        for data in (
+            b'{"name": "agent"}\n',
+            b"\x89PNG\r\n\x1a\n\0\0.opencode/context",
+            "café .opencode/context".encode("latin-1"),
+        ):
+            self.assertIs(transform_file_content(data, self.install_dir), data)
+
+    def test_local_installs(self):
+        """Test local installs get no transform at all."""
+        data = b"@.opencode/context/a.md"
+        for install_dir in (".opencode", "/project/.opencode"):
+            self.assertIsNone(content_transform(install_dir))
+            self.assertIs(transform_file_content(data, install_dir), data)
+        self.assertEqual(
+            content_transform(self.install_dir)(data),
+            f"@{self.install_dir}/context/a.md".encode(),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()